@@ -0,0 +1,146 @@
+"""Simulated cluster worker for `python cluster.py --simulate`.
+
+Stands in for bot.py in one cluster process: brings its shards up one by one, then serves synthetic
+guilds, writing watchlist entries and welcome messages through the real shared stores and sending
+heartbeats like a real cluster. Nothing connects to Discord.
+
+The launcher plays the gateway: `assign` puts every guild on a shard, independently of
+services.cluster, and each worker comes up with the guilds of its shards. Traffic for every guild
+reaches every worker, and `owns()` decides which to serve. `verify` then checks, against the
+launcher's assignment, that each guild was served, and only by the cluster holding its shard.
+"""
+import asyncio
+import itertools
+import json
+import os
+import time
+
+SHARD_STARTUP = 0.1  # seconds a simulated shard takes to log in
+TICK = 0.05  # seconds between rounds of simulated traffic
+SNOWFLAKE_BASE = 1420070400000  # guild ids are spread over consecutive timestamps, like real ones
+
+
+def guild_ids(count):
+    return [(SNOWFLAKE_BASE + n) << 22 for n in range(count)]
+
+
+def assign(guild_count, shard_count):
+    """The gateway's side: shard -> guild ids, per Discord's documented (guild_id >> 22) % num_shards."""
+    shards = {shard: [] for shard in range(shard_count)}
+    for guild_id in guild_ids(guild_count):
+        shards[(guild_id >> 22) % shard_count].append(guild_id)
+    return shards
+
+
+class SimulatedCluster:
+    """What the heartbeat and ownership checks read from a bot: its shards, guilds and latency."""
+
+    def __init__(self, shard_ids, shard_count):
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.guilds = []
+        self.latency = float("nan")
+        self.ready = False
+
+    def is_ready(self):
+        return self.ready
+
+
+async def worker():
+    from config import CLUSTER_ID, SHARD_COUNT, SHARD_IDS
+    from services.cluster import Heartbeat, owns
+    from services.storage import ClusterStore, Database, WatchlistStore, WelcomeStore
+    from services.watchlists import WatchlistManager
+
+    duration = float(os.getenv("SIM_DURATION", 5))
+    crash = os.getenv("SIM_CRASH") == str(CLUSTER_ID) and os.getenv("CLUSTER_RESTARTS") == "0"
+    db = Database()
+    await db.open()
+    cluster = SimulatedCluster(SHARD_IDS, SHARD_COUNT)
+    heartbeat = Heartbeat(cluster, ClusterStore(db), CLUSTER_ID)
+    await heartbeat.start()
+    watchlists = WatchlistManager(WatchlistStore(db))
+    await watchlists.start()
+    welcome = WelcomeStore(db)
+    await welcome.setup()
+    with open(os.environ["SIM_GATEWAY_FILE"]) as f:
+        gateway = {int(shard): guilds for shard, guilds in json.load(f).items()}
+    everyone = guild_ids(int(os.getenv("SIM_GUILDS", 200)))
+
+    try:
+        for shard in SHARD_IDS:
+            await asyncio.sleep(SHARD_STARTUP)
+            cluster.guilds += gateway[shard]  # the guilds Discord sends this shard
+            cluster.latency = 0.04
+        cluster.ready = True
+
+        ids = itertools.count(int(time.time() * 1000))
+        deadline = time.monotonic() + duration
+        while time.monotonic() < deadline:
+            for guild_id in everyone:
+                if not owns(cluster, guild_id):
+                    continue  # another cluster's guild
+                partition = await watchlists.get(guild_id)
+                title = f"Show {next(ids)}"
+                partition.entries[title] = {"type": "tv", "current_season": 1, "current_episode": 1, "cluster": CLUSTER_ID}
+                watchlists.save(partition, title)
+                member_id = next(ids)
+                await welcome.add(guild_id, [member_id], 1, next(ids))
+                if member_id % 2:
+                    await welcome.pop(guild_id, member_id)
+            if crash and time.monotonic() > deadline - duration / 2:
+                await watchlists.store.flush()
+                os._exit(1)  # die without the clean shutdown below, like a real crash
+            await asyncio.sleep(TICK)
+    finally:
+        await watchlists.close()
+        await heartbeat.close()
+        await db.close()
+
+
+def verify(conn, clusters, gateway):
+    """Runs on the launcher's database thread once every simulated cluster has exited."""
+    owner = {}  # guild_id -> cluster holding its shard
+    for cluster in clusters:
+        for shard in cluster.shards:
+            for guild_id in gateway[shard]:
+                owner[guild_id] = cluster.cluster_id
+    served, misrouted = {}, 0
+    for guild_id, data in conn.execute("SELECT guild_id, data FROM watchlists"):
+        cluster_id = json.loads(data)["cluster"]
+        served.setdefault(guild_id, set()).add(cluster_id)
+        if cluster_id != owner.get(guild_id):
+            misrouted += 1
+    entries = dict(conn.execute("SELECT json_extract(data, '$.cluster'), COUNT(*) FROM watchlists GROUP BY 1"))
+    welcomes = dict(conn.execute("SELECT guild_id, COUNT(*) FROM welcome_messages GROUP BY guild_id"))
+    health = {row[0]: row[1:] for row in conn.execute("SELECT cluster_id, status, guilds FROM clusters")}
+
+    report_clusters = []
+    for cluster in clusters:
+        status, guilds = health.get(cluster.cluster_id, (None, 0))
+        report_clusters.append({
+            "cluster": cluster.cluster_id,
+            "shards": cluster.shards,
+            "restarts": cluster.restarts,
+            "status": status,
+            "guilds": guilds,
+            "entries": entries.get(cluster.cluster_id, 0),
+            "welcome_rows": sum(n for guild_id, n in welcomes.items() if owner.get(guild_id) == cluster.cluster_id),
+        })
+    missing = len(owner) - len(served.keys() & owner.keys())
+    shared = sum(1 for clusters_seen in served.values() if len(clusters_seen) > 1)
+    return {
+        "ok": not (missing or misrouted or shared) and all(c["status"] == "stopped" for c in report_clusters),
+        "guilds": len(owner),
+        "missing_guilds": missing,
+        "misrouted_entries": misrouted,
+        "guilds_served_by_several_clusters": shared,
+        "clusters": report_clusters,
+    }
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(worker())
+    except KeyboardInterrupt:
+        pass  # stopped by the launcher; the worker's own cleanup has already run
@@ -0,0 +1,140 @@
+import asyncio
+import itertools
+import discord
+
+_ids = itertools.count(10**17)
+
+
+class FakeChannel:
+    def __init__(self, channel_id=None, name="general"):
+        self.id = channel_id or next(_ids)
+        self.name = name
+        self.mention = f"<#{self.id}>"
+        self.sent = 0
+
+    async def send(self, content=None, **kwargs):
+        self.sent += 1
+        return FakeMessage(self)
+
+
+class FakeMessage:
+    def __init__(self, channel):
+        self.id = next(_ids)
+        self.channel = channel
+
+    async def delete(self):
+        pass
+
+
+class FakeEvent:
+    def __init__(self, guild, **fields):
+        self.id = next(_ids)
+        self.guild = guild
+        self.guild_id = guild.id
+        self.creator_id = None
+        self.status = discord.EventStatus.scheduled
+        self.start_time = fields.get("start_time")
+        self.url = f"https://discord.com/events/{guild.id}/{self.id}"
+        self.fields = fields
+
+    async def edit(self, **fields):
+        self.fields.update(fields)
+        self.start_time = fields.get("start_time", self.start_time)
+        return self
+
+    async def delete(self):
+        self.guild.events.pop(self.id, None)
+
+
+class FakeGuild:
+    """Just enough of discord.Guild for the watch party and gif commands."""
+
+    def __init__(self, guild_id=None, name="Bench Guild"):
+        self.id = guild_id or next(_ids)
+        self.name = name
+        self.voice_channel = FakeChannel(name="watch-party")
+        self.text_channel = FakeChannel(name="general")
+        self.channels = {c.id: c for c in (self.voice_channel, self.text_channel)}
+        self.events = {}
+        self.unavailable = False
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+    async def create_scheduled_event(self, **fields):
+        event = FakeEvent(self, **fields)
+        self.events[event.id] = event
+        return event
+
+    @property
+    def scheduled_events(self):
+        return list(self.events.values())
+
+    def get_scheduled_event(self, event_id):
+        return self.events.get(event_id)
+
+    async def fetch_scheduled_event(self, event_id):
+        await asyncio.sleep(0)
+        return self.events[event_id]
+
+
+class FakeResponse:
+    def __init__(self, interaction):
+        self.interaction = interaction
+        self._done = False
+
+    def is_done(self):
+        return self._done
+
+    async def send_message(self, content=None, **kwargs):
+        if self._done:
+            raise RuntimeError("interaction already responded to")
+        self._done = True
+        self.interaction.messages.append(content if content is not None else kwargs)
+
+    async def defer(self, **kwargs):
+        if self._done:
+            raise RuntimeError("interaction already responded to")
+        self._done = True
+
+
+class FakeFollowup:
+    def __init__(self, interaction):
+        self.interaction = interaction
+
+    async def send(self, content=None, **kwargs):
+        self.interaction.messages.append(content if content is not None else kwargs)
+        return FakeMessage(self.interaction.channel)
+
+
+class FakeUser:
+    def __init__(self, user_id=None, name="bench"):
+        self.id = user_id or next(_ids)
+        self.name = name
+        self.mention = f"<@{self.id}>"
+
+
+class FakeInteraction:
+    """Stand-in for discord.Interaction as seen by app command callbacks."""
+
+    def __init__(self, guild):
+        self.guild = guild
+        self.guild_id = guild.id
+        self.channel = guild.text_channel
+        self.user = FakeUser()
+        self.messages = []
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+
+
+class FakeContext:
+    """Stand-in for commands.Context as seen by prefix command callbacks."""
+
+    def __init__(self, guild):
+        self.guild = guild
+        self.channel = guild.text_channel
+        self.messages = []
+
+    async def send(self, content=None, **kwargs):
+        self.messages.append(content)
+        return FakeMessage(self.channel)
@@ -0,0 +1,185 @@
+"""Offline memory and startup benchmark for the cache profiles in config.py.
+
+Feeds synthetic gateway payloads (GUILD_CREATE, GUILD_MEMBERS_CHUNK for profiles that chunk, then
+a stream of member joins and messages) straight into discord.py's connection state, and reports
+how much memory each profile holds and how long the startup parsing took. Nothing talks to Discord;
+the network round trips chunking costs are reported as a request count instead.
+
+    python -m bench.memory --sizes 1000 10000 100000 --guilds 3 --output memory.json
+"""
+import argparse
+import asyncio
+import gc
+import itertools
+import json
+import math
+import sys
+import time
+import tracemalloc
+
+import discord
+from discord.state import ChunkRequest
+
+from config import CACHE_PROFILES, cache_options
+
+CHUNK_SIZE = 1000  # members per GUILD_MEMBERS_CHUNK, as Discord sends them
+BOT_ID = 1
+
+_ids = itertools.count(10**17)
+
+
+def user_payload(user_id):
+    return {"id": str(user_id), "username": f"user{user_id % 100000}", "discriminator": "0",
+            "global_name": None, "avatar": None}
+
+
+def member_fields():
+    return {"roles": [], "joined_at": "2024-01-01T00:00:00+00:00", "deaf": False, "mute": False, "flags": 0}
+
+
+def member_payload(user_id, guild_id=None):
+    payload = {"user": user_payload(user_id), **member_fields()}
+    if guild_id is not None:
+        payload["guild_id"] = str(guild_id)
+    return payload
+
+
+def guild_payload(guild_id, size, voice):
+    """A GUILD_CREATE for a large guild: only the bot and members in voice are included."""
+    text_id, voice_id = next(_ids), next(_ids)
+    voice_members = [next(_ids) for _ in range(voice)]
+    return {
+        "id": str(guild_id), "name": f"guild {guild_id}", "owner_id": str(BOT_ID), "member_count": size,
+        "large": size > 250, "features": [], "emojis": [], "stickers": [],
+        "roles": [{"id": str(guild_id), "name": "@everyone", "permissions": "0", "position": 0, "color": 0,
+                   "hoist": False, "managed": False, "mentionable": False}],
+        "channels": [
+            {"id": str(text_id), "type": 0, "name": "general", "position": 0, "permission_overwrites": []},
+            {"id": str(voice_id), "type": 2, "name": "watch party", "position": 1, "permission_overwrites": [],
+             "bitrate": 64000, "user_limit": 0},
+        ],
+        "members": [member_payload(BOT_ID)] + [member_payload(user_id) for user_id in voice_members],
+        "voice_states": [{"user_id": str(user_id), "channel_id": str(voice_id), "session_id": "bench",
+                          "deaf": False, "mute": False, "self_deaf": False, "self_mute": False,
+                          "self_video": False, "suppress": False, "request_to_speak_timestamp": None}
+                         for user_id in voice_members],
+        "threads": [], "stage_instances": [], "guild_scheduled_events": [],
+    }, text_id
+
+
+def message_payload(guild_id, channel_id, author_id):
+    return {"id": str(next(_ids)), "channel_id": str(channel_id), "guild_id": str(guild_id),
+            "author": user_payload(author_id), "member": member_fields(),
+            "content": "!ping", "timestamp": "2024-01-01T00:00:00+00:00", "edited_timestamp": None,
+            "tts": False, "mention_everyone": False, "mentions": [], "mention_roles": [], "attachments": [],
+            "embeds": [], "pinned": False, "type": 0}
+
+
+def load_guilds(state, guilds, size, voice):
+    """Parses GUILD_CREATE for every guild, then the member chunks if the profile chunks at startup."""
+    channels = []
+    for _ in range(guilds):
+        guild_id = next(_ids)
+        data, text_id = guild_payload(guild_id, size, voice)
+        state._add_guild_from_data(data)
+        channels.append((guild_id, text_id))
+        if not state._chunk_guilds:
+            continue
+        request = ChunkRequest(guild_id, 0, asyncio.get_running_loop(), state._get_guild, cache=True)
+        state._chunk_requests[request.nonce] = request
+        count = math.ceil(size / CHUNK_SIZE)
+        for index in range(count):
+            members = [member_payload(next(_ids)) for _ in range(min(CHUNK_SIZE, size - index * CHUNK_SIZE))]
+            state.parse_guild_members_chunk({"guild_id": str(guild_id), "members": members, "nonce": request.nonce,
+                                             "chunk_index": index, "chunk_count": count})
+    return channels
+
+
+def traffic(state, channels, joins, messages):
+    for guild_id, channel_id in channels:
+        for _ in range(joins):
+            state.parse_guild_member_add(member_payload(next(_ids), guild_id))
+        for _ in range(messages):
+            state.parse_message_create(message_payload(guild_id, channel_id, next(_ids)))
+
+
+def new_state(profile):
+    intents = discord.Intents.default()
+    intents.message_content = True
+    intents.members = True
+    client = discord.Client(intents=intents, **cache_options(intents, profile))
+    state = client._connection
+    state.user = discord.ClientUser(state=state, data=user_payload(BOT_ID) | {"bot": True})
+    return client, state
+
+
+async def measure(profile, size, args):
+    # Timed without tracemalloc, whose bookkeeping would dominate the parse times
+    client, state = new_state(profile)
+    gc.collect()
+    start = time.perf_counter()
+    channels = load_guilds(state, args.guilds, size, args.voice)
+    startup = time.perf_counter() - start
+    await client.close()
+    del client, state, channels
+    gc.collect()
+
+    tracemalloc.start()
+    client, state = new_state(profile)
+    baseline = tracemalloc.get_traced_memory()[0]
+    channels = load_guilds(state, args.guilds, size, args.voice)
+    gc.collect()
+    after_startup = tracemalloc.get_traced_memory()[0]
+    traffic(state, channels, args.joins, args.messages)
+    gc.collect()
+    after_traffic = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    result = {
+        "profile": profile,
+        "guild_size": size,
+        "cached_members": sum(len(guild._members) for guild in state.guilds),
+        "cached_messages": len(state._messages or ()),
+        "chunk_requests": args.guilds * math.ceil(size / CHUNK_SIZE) if state._chunk_guilds else 0,
+        "startup_parse_ms": round(startup * 1000, 1),
+        "startup_mb": round((after_startup - baseline) / 2**20, 2),
+        "after_traffic_mb": round((after_traffic - baseline) / 2**20, 2),
+    }
+    await client.close()
+    return result
+
+
+async def main(args):
+    results = []
+    for size in args.sizes:
+        for profile in args.profiles:
+            results.append(await measure(profile, size, args))
+            print(json.dumps(results[-1]), file=sys.stderr)
+
+    report = {
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "python": sys.version.split()[0],
+        "discord.py": discord.__version__,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline memory/startup benchmark of the cache profiles")
+    parser.add_argument("--profiles", nargs="+", choices=list(CACHE_PROFILES), default=list(CACHE_PROFILES))
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 10000, 50000], help="members per guild")
+    parser.add_argument("--guilds", type=int, default=3)
+    parser.add_argument("--voice", type=int, default=10, help="members in voice per guild")
+    parser.add_argument("--joins", type=int, default=500, help="member joins per guild after startup")
+    parser.add_argument("--messages", type=int, default=2000, help="messages per guild after startup")
+    parser.add_argument("--output", help="write the JSON report here as well as stdout")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
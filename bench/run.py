@@ -0,0 +1,234 @@
+"""Offline latency benchmark for the bot's hot paths.
+
+Loads the real cogs against fake interactions and a local stand-in for TMDB/Tenor, then drives
+commands at a fixed concurrency. Nothing talks to Discord or the real upstream APIs.
+
+    python -m bench.run --ops 500 --concurrency 20 --latency-ms 50 --output bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from bench.fakes import FakeContext, FakeGuild, FakeInteraction
+from bench.upstream import FakeUpstream
+from services.metrics import LoopLagSampler
+
+SCENARIOS = ["schedule", "editschedule", "gif", "watchlist", "autocomplete"]
+TITLE_WORDS = ["the", "walking", "dead", "breaking", "bad", "dark", "office", "crown", "lost", "friends",
+               "house", "dragon", "stranger", "things", "wire", "boys", "ozark", "succession", "fargo", "bear"]
+
+
+def percentile(samples, pct):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def random_title(rng, n):
+    return f"{' '.join(rng.sample(TITLE_WORDS, 2))} {n}".title()
+
+
+async def build_bot(upstream, workdir):
+    # Services read their configuration at import time, so point them at the stand-in first
+    os.environ.update({
+        "TMDB_API_KEY": "bench",
+        "TMDB_API_URL": f"{upstream.base_url}/3",
+        "TENOR_API_KEY": "bench",
+        "TENOR_API_URL": f"{upstream.base_url}/v2",
+        "POSTER_BASE_URL": f"{upstream.base_url}/t/p/w780",
+        "POSTER_CACHE_DIR": os.path.join(workdir, "posters"),
+        "DATABASE_FILE": os.path.join(workdir, "bench.db"),
+        "LEGACY_WATCHLIST_FILE": os.path.join(workdir, "watchlist.json"),
+        "STORE_FLUSH_DELAY": "0.5",
+    })
+    import discord
+    from discord.ext import commands
+    from services.events import EventIndex
+    from services.http import create_session
+    from services.posters import PosterService
+    from services.seasons import SeasonCatalog
+    from services.storage import Database, SeasonStore
+    from services.tenor import TenorClient
+    from services.tmdb import TMDBClient
+
+    bot = commands.Bot(command_prefix="!", intents=discord.Intents.default())
+    bot.handoff = {}
+    bot.session = create_session()
+    bot.tmdb = TMDBClient(bot.session)
+    bot.tenor = TenorClient(bot.session)
+    bot.posters = PosterService(bot.session)
+    bot.db = Database()
+    await bot.db.open()
+    bot.events = EventIndex(bot)
+    bot.seasons = SeasonCatalog(bot.tmdb, SeasonStore(bot.db))
+    await bot.seasons.start()
+    for name in ("cogs.gif", "cogs.watchparty"):
+        await bot.load_extension(name)
+    return bot
+
+
+async def close_bot(bot):
+    await bot.close()
+    bot.tenor.close()
+    bot.posters.close()
+    bot.seasons.close()
+    await bot.tmdb.close()
+    await bot.db.close()
+    await bot.session.close()
+
+
+async def seed(bot, guilds, titles, rng):
+    watchparty = bot.get_cog("WatchParty")
+    seeded = {}
+    for guild in guilds:
+        watchlist = await watchparty.watchlists.get(guild.id)
+        watchlist.settings["voice_channel_id"] = guild.voice_channel.id
+        names = []
+        for n in range(titles):
+            title = random_title(rng, n)
+            interaction = FakeInteraction(guild)
+            await watchparty.add_show.callback(watchparty, interaction, title=title, is_movie=(n % 5 == 0))
+            names.append(title)
+        seeded[guild.id] = names
+    return seeded
+
+
+def make_op(bot, scenario, guilds, seeded, rng):
+    watchparty = bot.get_cog("WatchParty")
+    gif = bot.get_cog("Gif")
+
+    async def op():
+        guild = rng.choice(guilds)
+        title = rng.choice(seeded[guild.id])
+        if scenario == "schedule":
+            interaction = FakeInteraction(guild)
+            await watchparty.schedule_session.callback(watchparty, interaction, title=title, time="Sunday 8pm", timezone="UK")
+        elif scenario == "editschedule":
+            interaction = FakeInteraction(guild)
+            await watchparty.edit_schedule.callback(watchparty, interaction, title=title, new_time="tomorrow 9pm", timezone="NL")
+        elif scenario == "gif":
+            ctx = FakeContext(guild)
+            await gif.gif.callback(gif, ctx, args=rng.choice(["funny", "cat", "dance", "hello"]))
+        elif scenario == "watchlist":
+            interaction = FakeInteraction(guild)
+            await watchparty.show_watchlist.callback(watchparty, interaction)
+        elif scenario == "autocomplete":
+            interaction = FakeInteraction(guild)
+            await watchparty.watchlist_autocomplete(interaction, title[: rng.randint(1, 6)].lower())
+    return op
+
+
+async def run_scenario(bot, upstream, sampler, scenario, ops, concurrency, guilds, seeded, rng):
+    op = make_op(bot, scenario, guilds, seeded, rng)
+    latencies = []
+    errors = Counter()  # exception type -> count
+    remaining = ops
+    before = dict(upstream.requests)
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            start = time.perf_counter()
+            try:
+                await op()
+            except Exception as e:
+                errors[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - start)
+
+    sampler.reset()
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    outbound = {route: count - before.get(route, 0) for route, count in upstream.requests.items() if count - before.get(route, 0)}
+
+    def ms(value):
+        return None if value is None else round(value * 1000, 3)
+
+    return {
+        "scenario": scenario,
+        "ops": ops,
+        "concurrency": concurrency,
+        "errors": sum(errors.values()),
+        "error_types": dict(errors),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_ops_s": round(ops / elapsed, 1) if elapsed else None,
+        "latency_ms": {
+            "mean": ms(statistics.fmean(latencies)) if latencies else None,
+            "p50": ms(percentile(latencies, 50)),
+            "p95": ms(percentile(latencies, 95)),
+            "p99": ms(percentile(latencies, 99)),
+            "max": ms(max(latencies)) if latencies else None,
+        },
+        "outbound_requests": outbound,
+        "outbound_total": sum(outbound.values()),
+        "loop_blocked_ms": ms(sampler.blocked),
+        "loop_max_lag_ms": ms(sampler.max_lag),
+    }
+
+
+async def main(args):
+    rng = random.Random(args.seed)
+    upstream = FakeUpstream(latency=args.latency_ms / 1000)
+    await upstream.start()
+    with tempfile.TemporaryDirectory() as workdir:
+        bot = await build_bot(upstream, workdir)
+        sampler = LoopLagSampler(interval=0.005)
+        sampler.start()
+        try:
+            guilds = [FakeGuild() for _ in range(args.guilds)]
+            by_id = {guild.id: guild for guild in guilds}
+            bot.get_guild = by_id.get  # never logged in, so the fake guilds stand in for the gateway's cache
+            for guild in guilds:
+                await bot.events.seed(guild)
+            seeded = await seed(bot, guilds, args.titles, rng)
+            results = []
+            for scenario in args.scenarios:
+                if scenario == "editschedule":
+                    # Every title needs an event to edit
+                    for guild in guilds:
+                        watchparty = bot.get_cog("WatchParty")
+                        for title in seeded[guild.id]:
+                            await watchparty.schedule_session.callback(watchparty, FakeInteraction(guild), title=title, time="Sunday 8pm", timezone="UK")
+                results.append(await run_scenario(bot, upstream, sampler, scenario, args.ops, args.concurrency, guilds, seeded, rng))
+        finally:
+            sampler.stop()
+            await close_bot(bot)
+            await upstream.stop()
+
+    report = {
+        "config": {k: v for k, v in vars(args).items() if k != "output"},
+        "python": sys.version.split()[0],
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text)
+    print(text)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline command latency benchmark")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=SCENARIOS)
+    parser.add_argument("--ops", type=int, default=200, help="operations per scenario")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency-ms", type=float, default=50, help="simulated upstream latency")
+    parser.add_argument("--guilds", type=int, default=2)
+    parser.add_argument("--titles", type=int, default=50, help="watchlist titles per guild")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write the JSON report here as well as stdout")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -0,0 +1,104 @@
+import asyncio
+import hashlib
+import io
+from collections import Counter
+from aiohttp import web
+
+
+def _poster_bytes():
+    from PIL import Image
+
+    out = io.BytesIO()
+    Image.new("RGB", (780, 1170), (40, 40, 60)).save(out, format="PNG")
+    return out.getvalue()
+
+
+def _stable_id(text):
+    return int(hashlib.sha1(text.lower().encode()).hexdigest()[:8], 16)
+
+
+class FakeUpstream:
+    """Local aiohttp server standing in for TMDB, the TMDB image CDN and Tenor."""
+
+    def __init__(self, latency=0.05, host="127.0.0.1", port=0):
+        self.latency = latency
+        self.host = host
+        self.port = port
+        self.requests = Counter()  # route name -> count
+        self.poster = _poster_bytes()
+        self.runner = None
+
+    @property
+    def base_url(self):
+        return f"http://{self.host}:{self.port}"
+
+    async def _respond(self, route, request, payload=None, body=None):
+        self.requests[route] += 1
+        await asyncio.sleep(self.latency)
+        etag = f'"{hashlib.sha1(repr(payload).encode()).hexdigest()}"' if payload is not None else None
+        if etag and request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304)
+        if payload is not None:
+            return web.json_response(payload, headers={"ETag": etag})
+        return web.Response(body=body, content_type="image/png")
+
+    async def search(self, request):
+        kind = request.match_info["kind"]
+        query = request.query.get("query", "")
+        show_id = _stable_id(query)
+        result = {"id": show_id, "name": query.title(), "title": query.title(), "overview": f"About {query}.", "poster_path": f"/{show_id}.png"}
+        return await self._respond(f"tmdb_search_{kind}", request, {"results": [result]})
+
+    async def movie(self, request):
+        movie_id = int(request.match_info["id"])
+        return await self._respond("tmdb_movie", request, {"id": movie_id, "title": f"Movie {movie_id}", "runtime": 118, "overview": "A movie.", "poster_path": f"/{movie_id}.png"})
+
+    async def tv(self, request):
+        show_id = int(request.match_info["id"])
+        payload = {"id": show_id, "name": f"Show {show_id}", "number_of_seasons": 3, "poster_path": f"/{show_id}.png", "overview": "A show.",
+                   "seasons": [{"season_number": n, "episode_count": 10} for n in range(1, 4)]}
+        for key in request.query.get("append_to_response", "").split(","):
+            if key.startswith("season/"):
+                season = int(key.split("/")[1])
+                payload[key] = {"season_number": season, "episodes": [
+                    {"episode_number": e, "runtime": 42, "overview": f"Episode {e}.", "name": f"Episode {e}"} for e in range(1, 11)
+                ]}
+        return await self._respond("tmdb_tv", request, payload)
+
+    async def season(self, request):
+        season = int(request.match_info["season"])
+        episodes = [{"episode_number": e, "runtime": 42, "overview": f"Episode {e}.", "name": f"Episode {e}"} for e in range(1, 11)]
+        return await self._respond("tmdb_season", request, {"season_number": season, "episodes": episodes})
+
+    async def episode(self, request):
+        episode = int(request.match_info["episode"])
+        return await self._respond("tmdb_episode", request, {"episode_number": episode, "runtime": 42, "overview": f"Episode {episode}."})
+
+    async def image(self, request):
+        return await self._respond("tmdb_image", request, body=self.poster)
+
+    async def tenor(self, request):
+        pos = int(request.query.get("pos") or 0)
+        limit = int(request.query.get("limit", 8))
+        query = request.query.get("q", "")
+        results = [{"media_formats": {"gif": {"url": f"https://media.example/{_stable_id(query)}/{pos + i}.gif"}}} for i in range(limit)]
+        return await self._respond("tenor_search", request, {"results": results, "next": str(pos + limit) if pos + limit < 500 else ""})
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/3/search/{kind}", self.search)
+        app.router.add_get("/3/movie/{id}", self.movie)
+        app.router.add_get("/3/tv/{id}", self.tv)
+        app.router.add_get("/3/tv/{id}/season/{season}", self.season)
+        app.router.add_get("/3/tv/{id}/season/{season}/episode/{episode}", self.episode)
+        app.router.add_get("/t/p/w780/{path}", self.image)
+        app.router.add_get("/v2/search", self.tenor)
+        self.runner = web.AppRunner(app, access_log=None)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
@@ -1,29 +1,218 @@
 import discord
 from discord.ext import commands
-from config import TOKEN
+from config import TOKEN, CACHE_PROFILE, CLUSTER_ID, PRIMARY_CLUSTER, SHARD_COUNT, SHARD_IDS, cache_options
+from services.http import create_session
+from services.tmdb import TMDBClient
+from services.tenor import TenorClient
+from services.posters import PosterService
+from services.storage import ClusterStore, Database, SeasonStore, TMDBCacheStore
+from services.seasons import SeasonCatalog
+from services.events import EventIndex
+from services.cluster import Heartbeat
+from services.metrics import Metrics, MetricsCommandTree, instrument
+from services.logs import LogPipeline, get_logger
+import hashlib
+import json
 import os
 import asyncio
+import time
+
+COMMAND_TREE_FILE = "data/command_tree.json"
+log = get_logger("bot")
 
 intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
 
-bot = commands.Bot(command_prefix="!", intents=intents)
+# The members intent is for join/leave events; how many members are kept in memory is up to the profile
+options = dict(command_prefix="!", intents=intents, tree_cls=MetricsCommandTree, **cache_options(intents))
+if SHARD_IDS:
+    # One cluster of a multi-process deployment (see cluster.py), running its range of shards
+    bot = commands.AutoShardedBot(shard_ids=SHARD_IDS, shard_count=SHARD_COUNT, **options)
+else:
+    bot = commands.Bot(**options)
+bot.metrics = Metrics()
+bot.handoff = {}  # extension name -> state the unloading cog passes to its reloaded replacement
+instrument(bot)
+cog_sources = {}  # extension name -> hash of the source it was loaded from
+
+def command_hashes():
+    # Stable hash per global command of everything Discord stores about it
+    return {
+        payload["name"]: hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+        for payload in (command.to_dict(bot.tree) for command in bot.tree.get_commands())
+    }
+
+def read_synced_tree():
+    if not os.path.exists(COMMAND_TREE_FILE):
+        return {}
+    with open(COMMAND_TREE_FILE, "r") as f:
+        return json.load(f)
+
+def write_synced_tree(state):
+    with open(COMMAND_TREE_FILE, "w") as f:
+        json.dump(state, f)
+
+async def sync_commands():
+    """Pushes only the global commands that changed since the last sync. Returns how many did."""
+    hashes = command_hashes()
+    synced = await asyncio.to_thread(read_synced_tree)
+    if synced.get("application_id") != bot.application_id or "commands" not in synced:
+        await bot.tree.sync()
+        await asyncio.to_thread(write_synced_tree, {"application_id": bot.application_id, "commands": hashes})
+        log.info("Synced command tree")
+        return len(hashes)
+
+    changed = [name for name, digest in hashes.items() if synced["commands"].get(name) != digest]
+    removed = [name for name in synced["commands"] if name not in hashes]
+    if not changed and not removed:
+        log.info("Command tree unchanged, skipping sync")
+        return 0
+    for name in changed:
+        # Creates the command, or overwrites the existing one with the same name
+        await bot.http.upsert_global_command(bot.application_id, bot.tree.get_command(name).to_dict(bot.tree))
+    if removed:
+        for command in await bot.tree.fetch_commands():
+            if command.name in removed:
+                await command.delete()
+    await asyncio.to_thread(write_synced_tree, {"application_id": bot.application_id, "commands": hashes})
+    log.info("Synced changed commands: %s", ", ".join(changed + removed))
+    return len(changed) + len(removed)
+
+@bot.event
+async def setup_hook():
+    # Runs once per process after login, unlike on_ready which fires on every reconnect.
+    # Commands are global, so with several clusters only the first one syncs them.
+    if PRIMARY_CLUSTER:
+        await sync_commands()
 
 @bot.event
 async def on_ready():
-    await bot.tree.sync()
-    print(f"{bot.user} is online!")
+    log.info("%s is online! (cache profile: %s)", bot.user, CACHE_PROFILE, extra={"cluster": CLUSTER_ID, "shards": SHARD_IDS})
+
+def cog_names():
+    return [f"cogs.{filename[:-3]}" for filename in sorted(os.listdir("./cogs")) if filename.endswith(".py")]
+
+def source_hash(name):
+    with open(os.path.join(*name.split(".")) + ".py", "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+async def load_cog(name):
+    start = time.perf_counter()
+    await bot.load_extension(name)
+    cog_sources[name] = source_hash(name)
+    return time.perf_counter() - start
+
+async def reload_cog(name):
+    """Reloads an extension in place. The old cog leaves its live state in bot.handoff for the new one."""
+    start = time.perf_counter()
+    bot.handoff[name] = {}
+    try:
+        if name in bot.extensions:
+            await bot.reload_extension(name)
+        else:
+            await bot.load_extension(name)
+    finally:
+        bot.handoff.pop(name, None)
+    cog_sources[name] = source_hash(name)
+    return time.perf_counter() - start
 
 async def load_cogs():
-    for filename in os.listdir("./cogs"):
-        if filename.endswith(".py"):
-             print(f"Loading cog: {filename}")
-             await bot.load_extension(f"cogs.{filename[:-3]}")
+    start = time.perf_counter()
+    names = cog_names()
+    results = await asyncio.gather(*(load_cog(name) for name in names), return_exceptions=True)
+    for name, result in zip(names, results):
+        if isinstance(result, BaseException):
+            log.error("Failed to load cog: %s (%s)", name, result, extra={"cog": name})
+        else:
+            log.info("Loaded cog: %s", name, extra={"cog": name, "latency_ms": round(result * 1000, 1)})
+    log.info("Loaded %d cogs", len(names), extra={"latency_ms": round((time.perf_counter() - start) * 1000, 1)})
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+
+@bot.command(name="reload")
+@commands.is_owner()
+async def reload_cogs(ctx, *names):
+    """Reloads changed cogs (or the named ones, or `all`) without restarting, then syncs changed commands."""
+    if SHARD_IDS:
+        # Only this process would pick up the new code while Discord got the new commands for every cluster
+        await ctx.send("❌ `!reload` only works in a single-process bot. Restart the clusters to deploy changes.")
+        return
+    available = cog_names()
+    if "all" in names:
+        targets = available
+    elif names:
+        targets = [name if name.startswith("cogs.") else f"cogs.{name}" for name in names]
+        unknown = [name for name in targets if name not in available]
+        if unknown:
+            await ctx.send(f"❌ No such cog: {', '.join(unknown)}")
+            return
+    else:
+        targets = [name for name in available if cog_sources.get(name) != source_hash(name)]
+    removed = [name for name in bot.extensions if name.startswith("cogs.") and name not in available]
+    if not targets and not removed:
+        await ctx.send("Nothing changed since the last load.")
+        return
+
+    lines = []
+    for name in removed:
+        await bot.unload_extension(name)
+        cog_sources.pop(name, None)
+        lines.append(f"🗑️ Unloaded `{name}`")
+    for name in targets:
+        try:
+            elapsed = await reload_cog(name)
+            lines.append(f"♻️ Reloaded `{name}` ({elapsed * 1000:.0f}ms)")
+        except commands.ExtensionError as e:
+            # reload_extension rolls back, so the previous version keeps running
+            lines.append(f"❌ `{name}` failed to load, kept the running version: {e}")
+    synced = await sync_commands()
+    lines.append(f"Synced {synced} changed command(s)." if synced else "Slash commands unchanged.")
+    await ctx.send("\n".join(lines)[:2000])
 
 async def main():
-    async with bot:
-        await load_cogs()
-        await bot.start(TOKEN)
+    # Shared clients for Tenor/TMDB/storage, kept alive for the bot's lifetime
+    bot.logs = LogPipeline()
+    bot.logs.start()
+    bot.metrics.collectors["logging"] = bot.logs.stats
+    await bot.metrics.start()
+    bot.session = create_session(trace_configs=[bot.metrics.trace_config()])
+    bot.db = Database()
+    await bot.db.open()
+    bot.tmdb = TMDBClient(bot.session, TMDBCacheStore(bot.db))
+    await bot.tmdb.load()
+    bot.tenor = TenorClient(bot.session)
+    bot.posters = PosterService(bot.session)
+    bot.metrics.collectors["tmdb_cache"] = bot.tmdb.stats
+    bot.metrics.collectors["poster_cache"] = bot.posters.stats
+    bot.metrics.collectors["tmdb_upstream"] = bot.tmdb.upstream.stats
+    bot.metrics.collectors["tenor_upstream"] = bot.tenor.upstream.stats
+    bot.events = EventIndex(bot)
+    bot.seasons = SeasonCatalog(bot.tmdb, SeasonStore(bot.db))
+    await bot.seasons.start(refresh=PRIMARY_CLUSTER)
+    bot.cluster = None
+    if SHARD_IDS:
+        bot.cluster = Heartbeat(bot, ClusterStore(bot.db), CLUSTER_ID)
+        await bot.cluster.start()
+    bot.metrics.collectors["seasons"] = bot.seasons.stats
+    bot.metrics.collectors["scheduled_events"] = lambda: {"tracked": len(bot.events)}
+    try:
+        async with bot:
+            await load_cogs()
+            await bot.start(TOKEN)
+    finally:
+        # Cogs are unloaded (and flush their state) when the bot closes above
+        if bot.cluster:
+            await bot.cluster.close()
+        bot.tenor.close()
+        bot.posters.close()
+        bot.seasons.close()
+        await bot.tmdb.close()
+        log.info("TMDB cache: %s", bot.tmdb.stats())
+        await bot.db.close()
+        await bot.session.close()
+        await bot.metrics.close()
+        bot.logs.close()
 
-asyncio.run(main())
\ No newline at end of file
+asyncio.run(main())
@@ -0,0 +1,213 @@
+"""Runs the bot as several processes ("clusters"), each an AutoShardedBot over its own range of shards.
+
+All clusters share the SQLite database (watchlists, welcome messages, season tables, TMDB responses,
+heartbeats), so whichever process Discord routes a guild to serves it from the same state. The
+launcher restarts clusters that crash and warns about any whose heartbeat stops.
+
+    python cluster.py --clusters 4                 # as many shards as Discord recommends
+    python cluster.py --clusters 2 --shards 8
+    python cluster.py --simulate --clusters 3 --shards 6 --guilds 300 --crash 1
+"""
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import time
+
+IDENTIFY_INTERVAL = 5  # seconds Discord wants between shard logins
+RESTART_DELAY = 5  # seconds before restarting a crashed cluster, doubled while it keeps crashing
+RESTART_DELAY_MAX = 300
+RESTART_RESET_AFTER = 600  # a cluster that ran this long starts over from RESTART_DELAY
+SHUTDOWN_TIMEOUT = 30
+GATEWAY_URL = "https://discord.com/api/v10/gateway/bot"
+
+
+async def recommended_shards(token):
+    import aiohttp
+    async with aiohttp.ClientSession() as session:
+        async with session.get(GATEWAY_URL, headers={"Authorization": f"Bot {token}"}) as resp:
+            resp.raise_for_status()
+            return (await resp.json())["shards"]
+
+
+async def prepare_storage():
+    """Creates the tables (and runs any legacy migration) once, before the clusters would race to."""
+    from services.storage import ClusterStore, Database, SeasonStore, TMDBCacheStore, WatchlistStore, WelcomeStore
+
+    db = Database()
+    await db.open()
+    try:
+        for store in (WatchlistStore(db), WelcomeStore(db), SeasonStore(db), TMDBCacheStore(db), ClusterStore(db)):
+            await store.setup()
+    finally:
+        await db.close()
+
+
+class Cluster:
+    """One worker process and its restart policy."""
+
+    def __init__(self, cluster_id, shards, shard_count, command, restart_delay=RESTART_DELAY):
+        self.cluster_id = cluster_id
+        self.shards = shards
+        self.shard_count = shard_count
+        self.command = command
+        self.restart_delay = restart_delay
+        self.delay = restart_delay
+        self.restarts = 0
+        self.process = None
+
+    def env(self):
+        env = dict(os.environ, CLUSTER_ID=str(self.cluster_id), SHARD_COUNT=str(self.shard_count),
+                   SHARD_IDS=",".join(map(str, self.shards)), CLUSTER_RESTARTS=str(self.restarts))
+        metrics_port = int(os.getenv("METRICS_PORT", 9108))
+        if metrics_port:
+            env["METRICS_PORT"] = str(metrics_port + self.cluster_id)
+        return env
+
+    async def run(self, stop, log):
+        """Runs the worker until it exits cleanly or the launcher stops, restarting it after crashes."""
+        while True:
+            started = time.monotonic()
+            # Own session, so a terminal Ctrl+C reaches only the launcher, which then stops workers in order
+            self.process = await asyncio.create_subprocess_exec(*self.command, env=self.env(), start_new_session=True)
+            log.info("Started cluster %d", self.cluster_id,
+                     extra={"cluster": self.cluster_id, "pid": self.process.pid, "shards": self.shards})
+            code = await self.process.wait()
+            if code == 0 or stop.is_set():
+                return code
+            if time.monotonic() - started > RESTART_RESET_AFTER:
+                self.delay = self.restart_delay
+            log.warning("Cluster %d exited with %d, restarting in %.1fs", self.cluster_id, code, self.delay,
+                        extra={"cluster": self.cluster_id})
+            self.restarts += 1
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=self.delay)
+                return code
+            except asyncio.TimeoutError:
+                pass
+            self.delay = min(self.delay * 2, RESTART_DELAY_MAX)
+
+    async def stop(self):
+        if self.process is None or self.process.returncode is not None:
+            return
+        # SIGINT lets bot.py run its shutdown: flush watchlists, final heartbeat, close the database
+        self.process.send_signal(signal.SIGINT)
+        try:
+            await asyncio.wait_for(self.process.wait(), timeout=SHUTDOWN_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.process.kill()
+
+
+async def monitor(store, stop, log, interval):
+    """Logs each cluster's health and warns about clusters that stopped sending heartbeats."""
+    from services.cluster import stale
+
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+            return
+        except asyncio.TimeoutError:
+            pass
+        now = time.time()
+        for row in await store.all():
+            fields = {key: row[key] for key in ("cluster_id", "pid", "status", "guilds", "latency_ms")}
+            if stale(row, now):
+                log.warning("Cluster %d sent no heartbeat for %.0fs", row["cluster_id"], now - row["updated_at"],
+                            extra=fields)
+            else:
+                log.debug("Cluster %d is %s", row["cluster_id"], row["status"], extra=fields)
+
+
+async def main(args):
+    if args.simulate:
+        # Simulated clusters get a throwaway database and never touch the real data directory
+        workdir = tempfile.mkdtemp(prefix="akari-cluster-")
+        os.environ.update({
+            "DATABASE_FILE": os.path.join(workdir, "cluster.db"),
+            "LEGACY_WATCHLIST_FILE": os.path.join(workdir, "watchlist.json"),
+            "METRICS_PORT": "0",
+            "CLUSTER_HEARTBEAT_INTERVAL": str(args.heartbeat),
+            "SIM_GUILDS": str(args.guilds),
+            "SIM_DURATION": str(args.duration),
+            "SIM_CRASH": "" if args.crash is None else str(args.crash),
+            "SIM_GATEWAY_FILE": os.path.join(workdir, "gateway.json"),
+        })
+    from config import TOKEN
+    from services.cluster import CLUSTER_HEARTBEAT_INTERVAL, shard_ranges
+    from services.logs import LogPipeline, get_logger
+    from services.storage import ClusterStore, Database
+
+    logs = LogPipeline()
+    logs.start()
+    log = get_logger("cluster")
+    shard_count = args.shards or (args.clusters if args.simulate else await recommended_shards(TOKEN))
+    ranges = shard_ranges(shard_count, args.clusters)
+    if args.simulate:
+        from bench.cluster import assign
+        gateway = assign(args.guilds, shard_count)
+        with open(os.environ["SIM_GATEWAY_FILE"], "w") as f:
+            json.dump(gateway, f)
+    command = [sys.executable, "-m", "bench.cluster"] if args.simulate else [sys.executable, "bot.py"]
+    clusters = [Cluster(cluster_id, shards, shard_count, command, restart_delay=0.5 if args.simulate else RESTART_DELAY)
+                for cluster_id, shards in enumerate(ranges)]
+    log.info("Running %d shards across %d clusters", shard_count, len(clusters), extra={"shards": ranges})
+
+    await prepare_storage()
+    db = Database()
+    await db.open()
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    started = time.monotonic()
+    health = asyncio.create_task(monitor(ClusterStore(db), stop, log, CLUSTER_HEARTBEAT_INTERVAL))
+    runs = []
+    for cluster in clusters:
+        runs.append(asyncio.create_task(cluster.run(stop, log)))
+        if not args.simulate and cluster is not clusters[-1]:
+            # Only one cluster logs its shards in at a time
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=IDENTIFY_INTERVAL * len(cluster.shards))
+            except asyncio.TimeoutError:
+                pass
+
+    finished = asyncio.ensure_future(asyncio.gather(*runs))
+    await asyncio.wait([finished, asyncio.ensure_future(stop.wait())], return_when=asyncio.FIRST_COMPLETED)
+    stop.set()
+    await asyncio.gather(*(cluster.stop() for cluster in clusters))
+    await finished
+    await health
+
+    if args.simulate:
+        from bench.cluster import verify
+        report = await db.run(verify, clusters, gateway)
+        report["elapsed_s"] = round(time.monotonic() - started, 2)
+        print(json.dumps(report, indent=2))
+    await db.close()
+    if args.simulate:
+        shutil.rmtree(workdir, ignore_errors=True)
+    logs.close()
+    if args.simulate and not report["ok"]:
+        sys.exit(1)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the bot as several sharded processes")
+    parser.add_argument("--clusters", type=int, default=int(os.getenv("CLUSTER_COUNT", 2)), help="worker processes")
+    parser.add_argument("--shards", type=int, default=int(os.getenv("SHARD_COUNT", 0)),
+                        help="total shards (default: Discord's recommendation)")
+    parser.add_argument("--simulate", action="store_true", help="run simulated shards locally instead of connecting")
+    parser.add_argument("--guilds", type=int, default=200, help="simulated guilds")
+    parser.add_argument("--duration", type=float, default=5, help="seconds each simulated cluster runs")
+    parser.add_argument("--heartbeat", type=float, default=0.5, help="simulated heartbeat interval")
+    parser.add_argument("--crash", type=int, help="simulated cluster that crashes once midway, to exercise restarts")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    asyncio.run(main(parse_args()))
@@ -1,5 +1,7 @@
 import discord
+import time
 from discord.ext import commands
+from services.cluster import stale
 
 class General(commands.Cog):
     def __init__(self, bot):
@@ -12,5 +14,28 @@ class General(commands.Cog):
         latency = round(self.bot.latency * 1000)
         await ctx.send(f"Pong! 🏓 '{latency}ms'")
 
+    @commands.command(name="stats")
+    async def stats(self, ctx):
+        """Shows command latency, upstream API timings and event loop lag."""
+        latency = round(self.bot.latency * 1000)
+        message = f"📊 Gateway latency: {latency}ms\n{self.bot.metrics.summary()}"
+        await ctx.send(message[:2000])  # Discord message limit
+
+    @commands.command(name="clusters")
+    async def clusters(self, ctx):
+        """Shows every cluster's shards, guilds, latency and last heartbeat."""
+        if not self.bot.cluster:
+            await ctx.send("Running as a single process, not clustered.")
+            return
+        now = time.time()
+        lines = [f"🧩 Answering from cluster {self.bot.cluster.cluster_id}"]
+        for row in await self.bot.cluster.store.all():
+            shards = f"{row['shards'][0]}-{row['shards'][-1]}" if row["shards"] else "-"
+            latency = "-" if row["latency_ms"] is None else f"{row['latency_ms']:.0f}ms"
+            status = "⚠️ no heartbeat" if stale(row, now) else row["status"]
+            lines.append(f"`#{row['cluster_id']}` shards {shards} · {row['guilds']} guilds · {latency} · "
+                         f"{status} · seen {now - row['updated_at']:.0f}s ago")
+        await ctx.send("\n".join(lines)[:2000])
+
 async def setup(bot):
     await bot.add_cog(General(bot))
\ No newline at end of file
@@ -1,11 +1,15 @@
 import discord
 from discord.ext import commands
-from services.tenor import fetch_gif
+from services.http import UpstreamUnavailable
 
 class Gif(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
 
+    async def cog_load(self):
+        # Fill the pools for popular queries before anyone asks for them
+        self.bot.tenor.warm()
+
     @commands.command(name="gif")
     async def gif(self, ctx, *, args: str = "funny"):
         """Sends a GIF to the mentioned channel (or current) based on the search term."""
@@ -28,7 +32,11 @@ class Gif(commands.Cog):
                 except ValueError:
                     pass  # Invalid mention format
 
-        gif_url = await fetch_gif(search_term)
+        try:
+            gif_url = await self.bot.tenor.fetch_gif(search_term)
+        except UpstreamUnavailable as e:
+            await ctx.send(str(e))
+            return
         if not gif_url:
             await ctx.send("Couldn't find a GIF for that 😔")
             return
@@ -1,109 +1,468 @@
 import discord
-import aiohttp
-from PIL import Image
 from discord.ext import commands
 from discord import app_commands
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone as dt_timezone
 from dotenv import load_dotenv
-import dateparser
-import pytz
-import json
-import os
+from services.storage import WatchlistStore
+from services.watchlists import WatchlistManager
+from services.timeparse import TIMEZONES, parse_time
+from services.enrichment import DEFAULT_RUNTIME, enrich, next_episode, resolve, season_plan
+from services.http import TokenBucket, UpstreamUnavailable
+from services.events import FINISHED
+from services.scheduler import SessionScheduler
+from services.cluster import owns
+from services.pages import PageView, cached_pages
+from services.logs import get_logger
+from services import timeparse
+import asyncio
+import csv
 import io
+import os
+import re
+from collections import OrderedDict
 
 load_dotenv()
-WATCHLIST_FILE = "data/watchlist.json"
-VOICE_CHANNEL_ID = int(os.getenv("VOICE_CHANNEL_ID"))
-TMDB_API_KEY = os.getenv("TMDB_API_KEY")
+log = get_logger("watchparty")
+VOICE_CHANNEL_ID = int(os.getenv("VOICE_CHANNEL_ID", 0))  # fallback when a guild has no /setvoice
+# Minutes before a session that reminders go out, unless a guild sets its own with /setreminders
+SESSION_REMINDERS = [int(m) for m in os.getenv("SESSION_REMINDERS", "60,10").split(",") if m.strip()]
+# Bulk commands
+BULK_CONCURRENCY = int(os.getenv("BULK_CONCURRENCY", 5))  # TMDB lookups in flight per bulk command
+BULK_MAX_SESSIONS = 25  # Discord allows 100 scheduled events per guild
+IMPORT_MAX_TITLES = 200
+IMPORT_MAX_BYTES = 256 * 1024
+EVENT_CREATE_RATE = float(os.getenv("EVENT_CREATE_RATE", 1))  # bulk-created scheduled events per second, per guild
+EVENT_CREATE_BURST = int(os.getenv("EVENT_CREATE_BURST", 5))
+PICKED_RESULTS = 1000  # TMDB search results remembered between /addshow autocomplete and the command
+PICKED = re.compile(r"^tmdb:(tv|movie):(\d+)$")
+
+def parse_import(text, is_movie):
+    """(title, is_movie) rows from CSV text: a title column and an optional type column ('movie'/'tv'), header optional."""
+    rows = []
+    for row in csv.reader(io.StringIO(text)):
+        if not row or not row[0].strip() or row[0].strip().lower() == "title":
+            continue
+        kind = row[1].strip().lower() if len(row) > 1 else ""
+        rows.append((row[0], kind in ("movie", "film") if kind else is_movie))
+    return rows
+
+
+async def respond(interaction, content, ephemeral=False):
+    """Replies whether or not the interaction was already deferred."""
+    if interaction.response.is_done():
+        await interaction.followup.send(content, ephemeral=ephemeral)
+    else:
+        await interaction.response.send_message(content, ephemeral=ephemeral)
+
+
+def result_label(result):
+    name = result.get("name") or result.get("title") or "?"
+    year = (result.get("first_air_date") or result.get("release_date") or "")[:4]
+    return f"{name} ({year})" if year else name
+
 
 class WatchParty(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.watchlist = self.load_watchlist()
-
-    def load_watchlist(self):
-        if not os.path.exists(WATCHLIST_FILE):
-            return {}
-        with open(WATCHLIST_FILE, "r") as f:
-            return json.load(f)
-        
-    def save_watchlist(self):
-        with open(WATCHLIST_FILE, "w") as f:
-            json.dump(self.watchlist, f, indent=4)
+        # After a !reload the previous instance hands over its live state instead of it being rebuilt
+        state = bot.handoff.get(__name__) or {}
+        self.adopted = bool(state)
+        self.watchlists = state["watchlists"] if self.adopted else WatchlistManager(WatchlistStore(bot.db))
+        self.watchlists.on_load = self.reconcile_events
+        self.scheduler = state["scheduler"] if self.adopted else SessionScheduler(self.remind)
+        self.scheduler.callback = self.remind
+        self.event_buckets = state.get("event_buckets", {})  # guild_id -> TokenBucket pacing bulk event creation
+        self.picked = state.get("picked", OrderedDict())  # (kind, tmdb_id) -> search result offered by /addshow autocomplete
+
+    async def cog_load(self):
+        if not self.adopted:
+            await self.watchlists.start()
+            await self.rebuild_schedule()
+            self.scheduler.start()
+        # Load dateparser in the background so the first unusual phrasing isn't slow
+        self._warm_task = asyncio.create_task(timeparse.warm())
+
+    async def cog_unload(self):
+        handoff = self.bot.handoff.get(__name__)
+        if handoff is not None:
+            # Being reloaded: keep the watchlists and reminders running for the next instance
+            handoff.update(watchlists=self.watchlists, scheduler=self.scheduler,
+                           event_buckets=self.event_buckets, picked=self.picked)
+            return
+        self.scheduler.stop()
+        await self.watchlists.close()
+
+    async def interaction_check(self, interaction: discord.Interaction):
+        if interaction.guild_id is None:
+            await interaction.response.send_message("❌ Watch parties only work inside a server.", ephemeral=True)
+            return False
+        return True
+
+    # Scheduled events
+    async def reconcile_events(self, watchlist):
+        """Brings every linked entry in line with the event index, dropping ids of events that are gone."""
+        if not self.bot.events.seeded(watchlist.guild_id):
+            return  # checked again once the guild's events are seeded
+        for title, entry in list(watchlist.entries.items()):
+            queue = entry.get("queue")
+            if queue:
+                entry["queue"] = [q for q in queue if self.bot.events.get(watchlist.guild_id, q["event_id"])]
+                if len(entry["queue"]) != len(queue):
+                    self.watchlists.save(watchlist, title)
+            if entry.get("event_id"):
+                await self.apply_event_state(watchlist, title, self.bot.events.get(watchlist.guild_id, entry["event_id"]))
+
+    async def apply_event_state(self, watchlist, title, event):
+        entry = watchlist[title]
+        if event is None:
+            # Finished events drop out of Discord's list, so a vanished event whose time has passed was watched
+            completed = entry.get("next_session") and self.session_start(entry) < datetime.now(dt_timezone.utc)
+        else:
+            completed = event.status == discord.EventStatus.completed
+        if completed:
+            await self.advance(watchlist, title)
+            return
+        if event is None or event.status in FINISHED:
+            # Deleted or cancelled: the stored session no longer means anything
+            entry["event_id"] = None
+            entry["next_session"] = None
+            self.watchlists.save(watchlist, title)
+            self.scheduler.cancel(watchlist.guild_id, title)
+            return
+        next_session = timeparse.localize(event.start_time, entry.get("timezone", "UK")).isoformat()
+        if entry.get("next_session") != next_session:
+            # Rescheduled from the Discord UI
+            entry["next_session"] = next_session
+            self.watchlists.save(watchlist, title)
+            await self.plan_reminders(watchlist, title)
+
+    async def advance(self, watchlist, title):
+        """Moves an entry past the session that just happened: the next episode (or season), or watched for a movie."""
+        entry = watchlist[title]
+        # Sessions booked with /scheduleseason take over one after another
+        upcoming = entry["queue"].pop(0) if entry.get("queue") else {}
+        if entry.get("type", "tv") == "movie":
+            entry["watched"] = True
+        elif upcoming.get("episode"):
+            # The queued event says which episode it is, even if sessions before it were skipped or never created
+            entry["current_season"] = upcoming["season"]
+            entry["current_episode"] = upcoming["episode"]
+        else:
+            try:
+                season, episode = await next_episode(self.bot.seasons, entry)
+            except UpstreamUnavailable:
+                season, episode = entry.get("current_season", 1), entry.get("current_episode", 1) + 1
+            entry["current_season"] = season
+            entry["current_episode"] = episode
+        entry["event_id"] = upcoming.get("event_id")
+        entry["next_session"] = upcoming.get("session")
+        self.watchlists.save(watchlist, title)
+        await self.plan_reminders(watchlist, title)
+
+    async def sync_event(self, event, deleted=False):
+        if event.creator_id is not None and self.bot.user and event.creator_id != self.bot.user.id:
+            return  # not one of ours
+        watchlist = await self.watchlists.get(event.guild_id)
+        for title, entry in watchlist.entries.items():
+            if entry.get("event_id") == event.id:
+                await self.apply_event_state(watchlist, title, None if deleted else event)
+                return
+            queued = next((q for q in entry.get("queue") or () if q["event_id"] == event.id), None)
+            if queued:
+                if deleted or event.status in FINISHED:
+                    entry["queue"].remove(queued)
+                else:
+                    queued["session"] = timeparse.localize(event.start_time, entry.get("timezone", "UK")).isoformat()
+                self.watchlists.save(watchlist, title)
+                return
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        store = self.watchlists.store
+        if store.legacy_guild or getattr(self.bot, "shard_ids", None) or len(self.bot.guilds) != 1:
+            return  # with several guilds (or clusters) only LEGACY_GUILD_ID can say whose the legacy entries are
+        guild_id = self.bot.guilds[0].id
+        if await store.claim_legacy(guild_id):
+            self.watchlists.partitions.pop(guild_id, None)  # loaded again, with the claimed entries, on next use
+
+    @commands.Cog.listener()
+    async def on_guild_available(self, guild):
+        try:
+            await self.bot.events.seed(guild)
+        except discord.HTTPException as e:
+            log.warning("Failed to load scheduled events: %s", e, extra={"guild": guild.id})
+            return
+        watchlist = self.watchlists.partitions.get(guild.id)
+        if watchlist:
+            await self.reconcile_events(watchlist)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild):
+        self.bot.events.forget(guild.id)
+
+    @commands.Cog.listener()
+    async def on_scheduled_event_update(self, before, after):
+        if before.status != after.status or before.start_time != after.start_time:
+            await self.sync_event(after)
+
+    @commands.Cog.listener()
+    async def on_scheduled_event_delete(self, event):
+        await self.sync_event(event, deleted=True)
+
+    # Reminders
+    def session_start(self, entry):
+        return timeparse.to_utc(datetime.fromisoformat(entry["next_session"]), entry.get("timezone", "UK"))
+
+    def reminder_offsets(self, settings):
+        if not settings.get("reminder_channel_id"):
+            return []
+        return settings.get("reminder_offsets", SESSION_REMINDERS)
+
+    async def plan_reminders(self, watchlist, title):
+        entry = watchlist.entries.get(title)
+        offsets = self.reminder_offsets(watchlist.settings)
+        if not entry or not entry.get("next_session") or not offsets:
+            self.scheduler.cancel(watchlist.guild_id, title)
+            return
+        start = self.session_start(entry)
+        self.scheduler.schedule(watchlist.guild_id, title, start.timestamp(), offsets)
+
+    async def rebuild_schedule(self):
+        """Queues reminders for every upcoming session in the guilds this process serves, straight from the store."""
+        for guild_id, title, entry, settings in await self.watchlists.store.scheduled():
+            if not owns(self.bot, guild_id):
+                continue  # another cluster's guild; it sends those reminders
+            offsets = self.reminder_offsets(settings)
+            if offsets:
+                start = self.session_start(entry)
+                self.scheduler.schedule(guild_id, title, start.timestamp(), offsets)
+        log.info("Scheduled reminders for %d upcoming sessions", len(self.scheduler))
+
+    async def remind(self, guild_id, title, minutes):
+        watchlist = await self.watchlists.get(guild_id)
+        channel = self.bot.get_channel(watchlist.settings.get("reminder_channel_id"))
+        if title not in watchlist or not channel:
+            return
+        entry = watchlist[title]
+        when = "now" if minutes == 0 else f"in {minutes} minutes"
+        if entry.get("type", "tv") == "movie":
+            message = f"⏰ **{title}** starts {when}!"
+        else:
+            message = f"⏰ **{title}** S{entry.get('current_season', 1)} E{entry.get('current_episode', 1)} starts {when}!"
+        event = self.bot.events.get(guild_id, entry.get("event_id"))
+        if event:
+            message += f"\n{event.url}"
+        await channel.send(message)
+
+    async def create_event(self, guild, **fields):
+        """Creates a scheduled event, paced so bulk commands don't run into Discord's rate limits."""
+        bucket = self.event_buckets.get(guild.id)
+        if bucket is None:
+            bucket = self.event_buckets[guild.id] = TokenBucket(EVENT_CREATE_RATE, EVENT_CREATE_BURST)
+        await bucket.acquire()
+        return await guild.create_scheduled_event(**fields)
+
+    async def drop_orphaned_events(self, interaction, title, events, command):
+        """Deletes events made for an entry that /removeshow took away while they were being created."""
+        for event in events:
+            try:
+                await event.delete()
+            except discord.HTTPException as e:
+                log.warning("Failed to delete orphaned scheduled event: %s", e,
+                            extra={"guild": interaction.guild_id, "command": command, "title": title})
+        await interaction.followup.send(f"❌ '{title}' was removed from the watchlist in the meantime, so nothing was scheduled.")
+
+    def get_voice_channel(self, guild, watchlist):
+        channel_id = watchlist.settings.get("voice_channel_id") or VOICE_CHANNEL_ID
+        return guild.get_channel(channel_id)
 
     # Autocomplete function
-    async def watchlist_autocomplete(self, interaction: discord.Interaction, current: str):
-        return[
+    async def watchlist_autocomplete(self, interaction: discord.Interaction, current: str, tv_only=False, scheduled=None):
+        watchlist = await self.watchlists.get(interaction.guild_id)
+        return [
             app_commands.Choice(name=title, value=title)
-            for title in self.watchlist
-            if current.lower() in title.lower()
-        ][:25]  # Discord limits to 25 choices
-
-    # TMDB functions
-    async def tmdb_search_show(self, title):
-        url = f"https://api.themoviedb.org/3/search/tv"
-        params = {"api_key": TMDB_API_KEY, "query": title}
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as resp:
-                data = await resp.json()
-                if data["results"]:
-                    return data["results"][0] #returns top match
-                return None
-            
-    async def tmdb_get_episode_info(self, show_id, season, episode):
-        url = f"https://api.themoviedb.org/3/tv/{show_id}/season/{season}/episode/{episode}"
-        params = {"api_key": TMDB_API_KEY}
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url, params=params) as resp:
-                if resp.status == 200:
-                    return await resp.json()
-                return None
-    
-    async def get_image_bytes(self, url):
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                if response.status == 200:
-                    image_data = await response.read()
-
-                    # Use Pillow to verify image and get format
-                    image = Image.open(io.BytesIO(image_data))
-                    format = image.format.lower()  # e.g. 'png', 'jpeg'
-
-                    # Optional: reject unsupported formats
-                    if format not in ["jpeg", "jpg", "png"]:
-                        raise ValueError(f"Unsupported image format: {format}")
+            for title in watchlist.index.search(current, limit=25, tv_only=tv_only, scheduled=scheduled)
+        ]  # Discord limits to 25 choices
+
+    # /setvoice
+    @app_commands.command(name="setvoice", description="Set the voice channel used for this server's watch parties.")
+    @app_commands.describe(channel="Voice channel for scheduled watch sessions")
+    @app_commands.default_permissions(manage_guild=True)
+    async def set_voice(self, interaction: discord.Interaction, channel: discord.VoiceChannel):
+        watchlist = await self.watchlists.get(interaction.guild_id)
+        watchlist.settings["voice_channel_id"] = channel.id
+        self.watchlists.save_settings(watchlist)
+        await interaction.response.send_message(f"🔊 Watch parties will now use {channel.mention}.")
+
+    # /setreminders
+    @app_commands.command(name="setreminders", description="Post reminders before scheduled watch sessions.")
+    @app_commands.describe(channel="Channel for reminders", minutes="Minutes before a session, comma separated (e.g. '60,10')")
+    @app_commands.default_permissions(manage_guild=True)
+    async def set_reminders(self, interaction: discord.Interaction, channel: discord.TextChannel, minutes: str = ""):
+        try:
+            offsets = sorted({int(m) for m in minutes.split(",") if m.strip()}, reverse=True) or SESSION_REMINDERS
+        except ValueError:
+            await interaction.response.send_message("❌ Minutes should be numbers separated by commas, like '60,10'.", ephemeral=True)
+            return
+        if any(m < 0 for m in offsets):
+            await interaction.response.send_message("❌ Reminders can't be sent after a session starts.", ephemeral=True)
+            return
+        watchlist = await self.watchlists.get(interaction.guild_id)
+        watchlist.settings["reminder_channel_id"] = channel.id
+        watchlist.settings["reminder_offsets"] = offsets
+        self.watchlists.save_settings(watchlist)
+        for title, entry in watchlist.entries.items():
+            if entry.get("next_session"):
+                await self.plan_reminders(watchlist, title)
+        await interaction.response.send_message(
+            f"⏰ Reminders will be posted in {channel.mention} {', '.join(str(m) for m in offsets)} minutes before each session."
+        )
 
-                    return image_data
-                else:
-                    raise ValueError(f"Failed to fetch image: {url}")
-            
     # /addshow
     @app_commands.command(name="addshow", description="Add a new show or movie to the server's watchlist.")
-    @app_commands.describe(title="Title of the show or movie", is_movie="Check if it's a movie instead of a TV show")
+    @app_commands.describe(title="Title of the show or movie (pick a TMDB match to be sure it's the right one)", is_movie="Check if it's a movie instead of a TV show")
     async def add_show(self, interaction: discord.Interaction, title: str, is_movie: bool = False):
+        kind = "movie" if is_movie else "tv"
+        picked = PICKED.match(title)
+        if picked:
+            # Chosen from the TMDB matches offered by autocomplete
+            kind, tmdb_id = picked[1], int(picked[2])
+            result = self.picked.get((kind, tmdb_id))
+            if result is None:
+                await interaction.response.defer(thinking=True)
+                try:
+                    result = await self.bot.tmdb.details(kind, tmdb_id)
+                except UpstreamUnavailable as e:
+                    await respond(interaction, str(e))
+                    return
+                if not result or not (result.get("name") or result.get("title")):
+                    await respond(interaction, "❌ Could not find that on TMDB.")
+                    return
+            title = result.get("name") or result.get("title")
         title = title.strip().title()
-        if title in self.watchlist:
-            await interaction.response.send_message(f"❌ '{title}' is already in the watchlist.", ephemeral=True)
+        watchlist = await self.watchlists.get(interaction.guild_id)
+        if title in watchlist:
+            await respond(interaction, f"❌ '{title}' is already in the watchlist.", ephemeral=True)
             return
-        self.watchlist[title] = {
-            "type": "movie" if is_movie else "tv",
+        entry = {
+            "type": kind,
             "current_season": 1,
             "current_episode": 1,
             "next_session": None
         }
-        self.save_watchlist()
-        await interaction.response.send_message(f"✅ '{title}' has been added to the watchlist as a {'movie' if is_movie else 'TV show'}!")
+        if picked:
+            entry["tmdb_id"] = tmdb_id
+            entry["poster_path"] = result.get("poster_path")
+        else:
+            # Typed by hand: best guess now, so later commands don't each search again
+            if not interaction.response.is_done():
+                await interaction.response.defer(thinking=True)
+            try:
+                await resolve(self.bot.tmdb, title, entry)
+            except UpstreamUnavailable:
+                pass  # resolved on first /schedule instead
+        if title in watchlist:
+            await respond(interaction, f"❌ '{title}' is already in the watchlist.", ephemeral=True)
+            return
+        watchlist.entries[title] = entry
+        self.watchlists.save(watchlist, title)
+        if kind == "tv" and entry.get("tmdb_id"):
+            self.bot.seasons.prefetch(entry["tmdb_id"], 1)
+        await respond(interaction, f"✅ '{title}' has been added to the watchlist as a {'movie' if kind == 'movie' else 'TV show'}!")
+
+    @add_show.autocomplete("title")
+    async def add_show_autocomplete(self, interaction: discord.Interaction, current: str):
+        if len(current.strip()) < 2:
+            return []
+        kind = "movie" if getattr(interaction.namespace, "is_movie", False) else "tv"
+        try:
+            results = await self.bot.tmdb.search_results(kind, current)
+        except UpstreamUnavailable:
+            return []
+        choices = []
+        for result in results[:25]:
+            self.picked[(kind, result["id"])] = result
+            self.picked.move_to_end((kind, result["id"]))
+            choices.append(app_commands.Choice(name=result_label(result)[:100], value=f"tmdb:{kind}:{result['id']}"))
+        while len(self.picked) > PICKED_RESULTS:
+            self.picked.popitem(last=False)
+        return choices
+
+    # /importshows
+    @app_commands.command(name="importshows", description="Add many shows or movies to the watchlist at once.")
+    @app_commands.describe(
+        titles="Titles separated by commas or semicolons",
+        file="CSV file: a title column and an optional type column (movie/tv)",
+        is_movie="Treat titles without a type as movies"
+    )
+    async def import_shows(self, interaction: discord.Interaction, titles: str = "", file: discord.Attachment = None, is_movie: bool = False):
+        if not titles.strip() and file is None:
+            await interaction.response.send_message("❌ Paste some titles or attach a CSV file.", ephemeral=True)
+            return
+        if file is not None and file.size > IMPORT_MAX_BYTES:
+            await interaction.response.send_message("❌ That file is too large to import.", ephemeral=True)
+            return
+        await interaction.response.defer(thinking=True)
+
+        rows = [(title, is_movie) for title in re.split(r"[;,]", titles)]
+        if file is not None:
+            try:
+                rows += parse_import((await file.read()).decode("utf-8-sig", errors="replace"), is_movie)
+            except discord.HTTPException:
+                await interaction.followup.send("❌ Couldn't download the attached file.")
+                return
+
+        watchlist = await self.watchlists.get(interaction.guild_id)
+        new = {}
+        skipped = 0
+        for title, movie in rows:
+            title = title.strip().title()
+            if not title:
+                continue
+            if title in watchlist or title in new or len(new) >= IMPORT_MAX_TITLES:
+                skipped += 1
+                continue
+            new[title] = {
+                "type": "movie" if movie else "tv",
+                "current_season": 1,
+                "current_episode": 1,
+                "next_session": None
+            }
+        if not new:
+            await interaction.followup.send("❌ Nothing new to import.")
+            return
+
+        # Resolve everything on TMDB now, a few lookups at a time, so scheduling later skips the search
+        limit = asyncio.Semaphore(BULK_CONCURRENCY)
+
+        async def lookup(title, entry):
+            async with limit:
+                try:
+                    return await resolve(self.bot.tmdb, title, entry)
+                except UpstreamUnavailable:
+                    return False
+
+        matched = sum(await asyncio.gather(*(lookup(title, entry) for title, entry in new.items())))
+
+        new = {title: entry for title, entry in new.items() if title not in watchlist}  # added meanwhile
+        watchlist.entries.update(new)
+        self.watchlists.save_many(watchlist, new)
+        message = f"✅ Imported {len(new)} titles into the watchlist ({matched} found on TMDB)."
+        if skipped:
+            message += f" Skipped {skipped} that were already listed, repeated or over the {IMPORT_MAX_TITLES} title limit."
+        await interaction.followup.send(message)
 
     # /removeshow
     @app_commands.command(name="removeshow", description="Remove a show from the watchlist.")
     @app_commands.describe(title="Select a show")
     async def remove_show(self, interaction: discord.Interaction, title: str):
         title = title.strip().title()
-        if title not in self.watchlist:
+        watchlist = await self.watchlists.get(interaction.guild_id)
+        if title not in watchlist:
             await interaction.response.send_message(f"❌ '{title}' is not in the watchlist.", ephemeral=True)
             return
-        del self.watchlist[title]
-        self.save_watchlist()
+        self.watchlists.delete(watchlist, title)
+        self.scheduler.cancel(interaction.guild_id, title)
         await interaction.response.send_message(f"🗑️ '{title}' has been removed from the watchlist.")
 
     @remove_show.autocomplete("title")
@@ -115,53 +474,46 @@ class WatchParty(commands.Cog):
     @app_commands.describe(title="Select a show")
     async def set_episode(self, interaction: discord.Interaction, title: str, season: int, episode: int):
         title = title.strip().title()
-        if title not in self.watchlist:
+        watchlist = await self.watchlists.get(interaction.guild_id)
+        if title not in watchlist:
             await interaction.response.send_message(f"❌ '{title}' is not in the watchlist.", ephemeral=True)
             return
         
-        show = self.watchlist[title]
+        show = watchlist[title]
         if show.get("type", "tv") != "tv":
             await interaction.response.send_message(f"🎬 '{title}' is a movie and does not have episodes.", ephemeral=True)
             return
         
         show["current_season"] = season
         show["current_episode"] = episode
-        self.save_watchlist()
+        self.watchlists.save(watchlist, title)
         await interaction.response.send_message(f"📺 '{title}' is now set to Season {season}, Episode {episode}.")
         
     @set_episode.autocomplete("title")
     async def set_episode_autocomplete(self, interaction: discord.Interaction, current: str):
-        return [
-            app_commands.Choice(name=title, value=title)
-            for title, data in self.watchlist.items()
-            if (data.get("type", "tv") == "tv") and current.lower() in title.lower()
-        ][:25]
+        return await self.watchlist_autocomplete(interaction, current, tv_only=True)
 
     # /watched
     @app_commands.command(name="watched", description="Mark the next episode as watched.")
     async def watched(self, interaction: discord.Interaction, title: str):
         title = title.strip().title()
-        if title not in self.watchlist:
+        watchlist = await self.watchlists.get(interaction.guild_id)
+        if title not in watchlist:
             await interaction.response.send_message(f"❌ '{title}' is not in the watchlist.", ephemeral=True)
             return
         
-        entry = self.watchlist[title]
-        content_type = entry.get("type", "tv")
-
-
-        if content_type == "movie":
-            # Just clear the session and optionally mark it somehow
-            entry["next_session"] = None
-            entry["watched"] = True
+        entry = watchlist[title]
+        if entry.get("type", "tv") == "movie":
+            await self.advance(watchlist, title)
             await interaction.response.send_message(f"🎬 You've marked **{title}** as watched.")
-        else:
-            current_episode = entry.get("current_episode", 1)
-            entry["current_episode"] = current_episode + 1
-            entry["next_session"] = None
-            await interaction.response.send_message(
-                f"✅ Marked episode {current_episode} of **{title}** as watched. Now set to episode {entry['current_episode']}."
-            )
-        self.save_watchlist()
+            return
+
+        current_episode = entry.get("current_episode", 1)
+        await self.advance(watchlist, title)
+        await interaction.response.send_message(
+            f"✅ Marked episode {current_episode} of **{title}** as watched. "
+            f"Now set to season {entry['current_season']}, episode {entry['current_episode']}."
+        )
 
     @watched.autocomplete("title")
     async def watched_autocomplete(self, interaction: discord.Interaction, current: str):
@@ -169,30 +521,37 @@ class WatchParty(commands.Cog):
 
     # /watchlist
     @app_commands.command(name="watchlist", description="View the current server watchlist.")
-    async def show_watchlist(self, interaction: discord.Interaction):
-        if not self.watchlist:
+    @app_commands.describe(sort="Order of the list", show="Only show some titles")
+    @app_commands.choices(
+        sort=[app_commands.Choice(name="Title", value="title"), app_commands.Choice(name="Next session", value="next")],
+        show=[app_commands.Choice(name=name, value=value) for name, value in
+              (("Everything", "all"), ("TV shows", "tv"), ("Movies", "movie"), ("Scheduled", "scheduled"), ("Not scheduled", "unscheduled"))]
+    )
+    async def show_watchlist(self, interaction: discord.Interaction, sort: str = "title", show: str = "all"):
+        watchlist = await self.watchlists.get(interaction.guild_id)
+        if not watchlist:
             await interaction.response.send_message("📭 The watchlist is currently empty.")
             return
-        message = "🎬 **Watchlist:**\n"
-        for title, data in self.watchlist.items():
-            if data.get("type") == "movie":
-                message += f"- 🎬 **{title}** (Movie)\n"
-            else:
-                ep = data.get("current_episode", "?")
-                season = data.get("current_season", "?")
-                message += f"- 📺 **{title}** (S{season} E{ep})\n"
-        await interaction.response.send_message(message)
+        pages = cached_pages(watchlist, sort, show)
+        if not pages:
+            await interaction.response.send_message("📭 Nothing in the watchlist matches that.", ephemeral=True)
+            return
+        if len(pages) == 1:
+            await interaction.response.send_message(embed=pages[0])
+            return
+        await interaction.response.send_message(embed=pages[0], view=PageView(pages, interaction.user.id))
 
     # /status
     @app_commands.command(name="status", description="Show the current status of a show or movie.")
     @app_commands.describe(title="Select a show or movie")
     async def show_status(self, interaction: discord.Interaction, title: str):
         title = title.strip().title()
-        if title not in self.watchlist:
+        watchlist = await self.watchlists.get(interaction.guild_id)
+        if title not in watchlist:
             await interaction.response.send_message(f"❌ '{title}' is not in the watchlist.", ephemeral=True)
             return
         
-        show = self.watchlist[title]
+        show = watchlist[title]
         content_type = show.get("type", "tv")  #Default to "tv" for backward compatibility
         session = show.get("next_session")
 
@@ -208,6 +567,9 @@ class WatchParty(commands.Cog):
             ep = show.get("current_episode", 1)
             season = show.get("current_season", 1)
             status_message = f"📺 **{title}**\nNext Episode: S{season} E{ep}\nNext Watch Session: {formatted}"
+        event = self.bot.events.get(interaction.guild_id, show.get("event_id"))
+        if event:
+            status_message += f"\nEvent: {event.url} ({event.status.name})"
         await interaction.response.send_message(status_message)
 
     @show_status.autocomplete("title")
@@ -222,112 +584,84 @@ class WatchParty(commands.Cog):
     @app_commands.describe(title="Select a show or movie", time="Time for the session (e.g. 'Sunday 8pm')", timezone="Timezone (UK or NL)")
     async def schedule_session(self, interaction: discord.Interaction, title: str, time: str, timezone: str):
         title = title.strip().title()
-        if title not in self.watchlist:
+        watchlist = await self.watchlists.get(interaction.guild_id)
+        if title not in watchlist:
             await interaction.response.send_message(f"❌ '{title}' is not in the watchlist.", ephemeral=True)
             return
         
-        # Timezone mapping
-        timezone_map = {
-            "UK": "Europe/London",
-            "NL": "Europe/Amsterdam"
-        }
-        tz_name = timezone_map.get(timezone.upper())
-        if not tz_name:
+        # Parse and localise the time
+        if timezone.upper() not in TIMEZONES:
             await interaction.response.send_message("❌ Invalid timezone. Choose either 'UK' or 'NL'.", ephemeral=True)
             return
-        
-        # Parse and localise the time
-        parsed_time = dateparser.parse(time)
-        if not parsed_time:
+        localized_time = await parse_time(time, timezone)
+        if not localized_time:
             await interaction.response.send_message("❌ I couldn't understand that time. Try something like 'Sunday 8pm'.", ephemeral=True)
             return
-        
-        local_tz = pytz.timezone(tz_name)
-        localized_time = local_tz.localize(parsed_time)
-        parsed_time_utc = localized_time.astimezone(pytz.UTC)
-        
-        # Save session time
-        self.watchlist[title]["next_session"] = parsed_time.isoformat()
-        self.save_watchlist()
+        parsed_time_utc = localized_time.astimezone(dt_timezone.utc)
 
         # Get voice channel
-        voice_channel = interaction.guild.get_channel(VOICE_CHANNEL_ID)
+        voice_channel = self.get_voice_channel(interaction.guild, watchlist)
         if not voice_channel:
-            await interaction.response.send_message("❌ Could not find the voice channel.", ephemeral=True)
+            await interaction.response.send_message("❌ Could not find the voice channel. Set one with /setvoice.", ephemeral=True)
             return
 
-        # Get information for show or movie
-        content_type = self.watchlist[title].get("type", "tv")
-        season = self.watchlist[title].get("current_season", 1)
-        ep = self.watchlist[title].get("current_episode", 1)
-        runtime = 25  # default fallback
-        overview = "no description available."
-        image_bytes = None
-
-        # Determine search endpoint
-        search_url = f"https://api.themoviedb.org/3/search/{'movie' if content_type == 'movie' else 'tv'}"
-        params = {"api_key": TMDB_API_KEY, "query": title}
-        
-        async with aiohttp.ClientSession() as session:
-            async with session.get(search_url, params=params) as resp:
-                tmdb_data = await resp.json()
-                if not tmdb_data.get("results"):
-                    await interaction.response.send_message("❌ Could not find anything on TMDB.", ephemeral=True)
-                    return
-                result = tmdb_data["results"][0]
-                tmdb_id = result["id"]
-
-                if result.get("poster_path"):
-                    poster_url = f"https://image.tmdb.org/t/p/w780{result['poster_path']}"
-                    try:
-                        image_bytes = await self.get_image_bytes(poster_url)
-                    except Exception as e:
-                        print(f"[Warning] Failed to fetch poster image: {e}")
+        # Everything from here waits on TMDB or Discord, so acknowledge before the 3 second deadline
+        await interaction.response.defer(thinking=True)
 
-                overview = result.get("overview", overview)
+        entry = watchlist[title]
 
-                # Additional fetch for movie runtime
-                if content_type == "movie":
-                    async with session.get(f"https://api.themoviedb.org/3/movie/{tmdb_id}", params={"api_key": TMDB_API_KEY}) as movie_resp:
-                        movie_data = await movie_resp.json()
-                        runtime = movie_data.get("runtime", runtime)
+        # Runtime, overview and poster for the show or movie, fetched concurrently
+        try:
+            info = await enrich(self.bot.tmdb, self.bot.seasons, self.bot.posters, title, entry)
+        except UpstreamUnavailable as e:
+            await interaction.followup.send(str(e))
+            return
+        if not info:
+            await interaction.followup.send("❌ Could not find anything on TMDB.")
+            return
 
-        
-        # If TV, override with episode info
-        if content_type == "tv":
-            episode_info = await self.tmdb_get_episode_info(tmdb_id, season, ep)
-            if episode_info:
-                runtime = episode_info.get("runtime", runtime)
-                overview = episode_info.get("overview", overview)
-        
         # Format event name
-        event_name = f"🎬 {title}" if content_type == "movie" else f"📺 {title} - Season {season} Ep {ep}"
+        if entry.get("type", "tv") == "movie":
+            event_name = f"🎬 {title}"
+        else:
+            event_name = f"📺 {title} - Season {entry.get('current_season', 1)} Ep {entry.get('current_episode', 1)}"
 
         # Create scheduled event
         try:
             event = await interaction.guild.create_scheduled_event(
                 name=event_name,
-                description=overview,
+                description=info.overview,
                 start_time=parsed_time_utc,
-                end_time=parsed_time_utc + timedelta(minutes=runtime),
+                end_time=parsed_time_utc + timedelta(minutes=info.runtime),
                 channel=voice_channel,
                 entity_type=discord.EntityType.voice,
                 privacy_level=discord.PrivacyLevel.guild_only,
-                image=image_bytes
+                image=info.image
             )
-            self.watchlist[title]["event_id"] = event.id  # 💾 Store event ID
-            self.save_watchlist()
+            self.bot.events.put(event)  # only needed without the gateway intent
         except Exception as e:
-            print("Failed to create scheduled event", e)
-            await interaction.response.send_message("❌ Failed to create the scheduled event.", ephemeral=True)
+            log.warning("Failed to create scheduled event: %s", e,
+                        extra={"guild": interaction.guild_id, "command": "schedule", "title": title})
+            await interaction.followup.send("❌ Failed to create the scheduled event.")
+            return
+
+        if watchlist.entries.get(title) is not entry:
+            await self.drop_orphaned_events(interaction, title, [event], "schedule")
             return
 
+        # Only a session that has its event is saved and gets reminders
+        entry["event_id"] = event.id  # 💾 Store event ID
+        entry["next_session"] = localized_time.replace(tzinfo=None).isoformat()
+        entry["timezone"] = timezone.upper()
+        self.watchlists.save(watchlist, title)
+        await self.plan_reminders(watchlist, title)
+
         formatted_time = localized_time.strftime('%A, %d %B %Y at %I:%M %p')
-        await interaction.response.send_message(f"📅 Next session for **{title}** scheduled on `{formatted_time}` ({timezone}) and a Discord event has been created!")
+        await interaction.followup.send(f"📅 Next session for **{title}** scheduled on `{formatted_time}` ({timezone}) and a Discord event has been created!")
     
     @schedule_session.autocomplete("title")
     async def schedule_title_autocomplete(self, interaction: discord.Interaction, current: str):
-        return await self.watchlist_autocomplete(interaction, current)
+        return await self.watchlist_autocomplete(interaction, current, scheduled=False)
     
 
     # /editschedule
@@ -340,83 +674,185 @@ class WatchParty(commands.Cog):
     )
     async def edit_schedule(self, interaction: discord.Interaction, title: str, new_time: str, timezone: str):
         title = title.strip().title()
-        if title not in self.watchlist:
+        watchlist = await self.watchlists.get(interaction.guild_id)
+        if title not in watchlist:
             await interaction.response.send_message(f"❌ '{title}' is not in the watchlist.", ephemeral=True)
             return
         
-        await interaction.response.defer(thinking=True)
-
-        event_id = self.watchlist[title].get("event_id")
-        if not event_id:
+        if not watchlist[title].get("event_id"):
             await interaction.response.send_message("❌ No scheduled event found for this title.", ephemeral=True)
             return
 
-        # Timezone handling
-        timezone_map = {
-            "UK": "Europe/London",
-            "NL": "Europe/Amsterdam"
-        }
-        tz_name = timezone_map.get(timezone.upper())
-        if not tz_name:
+        if timezone.upper() not in TIMEZONES:
             await interaction.response.send_message("❌ Invalid timezone. Choose either 'UK' or 'NL'.", ephemeral=True)
             return
 
-        parsed_time = dateparser.parse(new_time)
-        if not parsed_time:
+        localized_time = await parse_time(new_time, timezone)
+        if not localized_time:
             await interaction.response.send_message("❌ I couldn't understand that time. Try something like 'Sunday 8pm'.", ephemeral=True)
             return
+        new_start_utc = localized_time.astimezone(dt_timezone.utc)
 
-        local_tz = pytz.timezone(tz_name)
-        localized_time = local_tz.localize(parsed_time)
-        new_start_utc = localized_time.astimezone(pytz.UTC)
-
-        # Estimate end time using runtime
-        content_type = self.watchlist[title].get("type", "tv")
-        season = self.watchlist[title].get("current_season", 1)
-        ep = self.watchlist[title].get("current_episode", 1)
-        runtime = 25  # default fallback
-
-        # Try refetching runtime
-        if content_type == "tv":
-            tmdb_data = await self.tmdb_search_show(title)
-            if tmdb_data:
-                show_id = tmdb_data["id"]
-                episode_info = await self.tmdb_get_episode_info(show_id, season, ep)
-                if episode_info:
-                    runtime = episode_info.get("runtime", runtime)
-        else:
-            # Fetch movie runtime
-            async with aiohttp.ClientSession() as session:
-                movie_url = f"https://api.themoviedb.org/3/search/movie"
-                params = {"api_key": TMDB_API_KEY, "query": title}
-                async with session.get(movie_url, params=params) as resp:
-                    tmdb_data = await resp.json()
-                    if tmdb_data["results"]:
-                        movie_id = tmdb_data["results"][0]["id"]
-                        async with session.get(f"https://api.themoviedb.org/3/movie/{movie_id}", params={"api_key": TMDB_API_KEY}) as m_resp:
-                            movie_data = await m_resp.json()
-                            runtime = movie_data.get("runtime", runtime)
+        # Settling a stale event below can advance the entry, which may ask TMDB for the next episode
+        await interaction.response.defer(thinking=True)
+
+        entry = watchlist[title]
+        event = self.bot.events.get(interaction.guild_id, entry["event_id"])
+        if self.bot.events.seeded(interaction.guild_id) and (event is None or event.status in FINISHED):
+            # Deleted or finished in the Discord UI. A finished session advances, possibly to the next queued one
+            await self.apply_event_state(watchlist, title, event)
+            event = self.bot.events.get(interaction.guild_id, entry.get("event_id"))
+        event_id = entry.get("event_id")
+        if not event_id:
+            await interaction.followup.send("❌ No scheduled event found for this title.")
+            return
+
+        # Estimate end time using runtime (the poster isn't needed to move an event)
+        try:
+            info = await enrich(self.bot.tmdb, self.bot.seasons, self.bot.posters, title, entry, with_poster=False)
+        except UpstreamUnavailable:
+            info = None  # moving the event matters more than an exact end time
+        runtime = info.runtime if info else DEFAULT_RUNTIME
 
         # Attempt to edit the event
         try:
-            event = await interaction.guild.fetch_scheduled_event(event_id)
-            await event.edit(
+            if event is None:
+                # Only before the guild's events have been seeded
+                event = await interaction.guild.fetch_scheduled_event(event_id)
+            event = await event.edit(
                 start_time=new_start_utc,
                 end_time=new_start_utc + timedelta(minutes=runtime)
             )
-            self.watchlist[title]["next_session"] = parsed_time.isoformat()
-            self.save_watchlist()
+            self.bot.events.put(event)
         except Exception as e:
-            print("❌ Failed to edit scheduled event:", e)
-            await interaction.response.send_message("❌ Failed to edit the scheduled event.", ephemeral=True)
+            log.warning("Failed to edit scheduled event: %s", e,
+                        extra={"guild": interaction.guild_id, "command": "editschedule", "title": title})
+            await interaction.followup.send("❌ Failed to edit the scheduled event.")
             return
+        if watchlist.entries.get(title) is not entry:
+            # Removed while the event was being moved; the event itself was already there before this command
+            await interaction.followup.send(f"❌ '{title}' was removed from the watchlist in the meantime, so only the Discord event was moved.")
+            return
+        entry["next_session"] = localized_time.replace(tzinfo=None).isoformat()
+        entry["timezone"] = timezone.upper()
+        self.watchlists.save(watchlist, title)
+        await self.plan_reminders(watchlist, title)
 
         formatted_time = localized_time.strftime('%A, %d %B %Y at %I:%M %p')
         await interaction.followup.send(f"📝 Updated the session for **{title}** to `{formatted_time}` ({timezone}).")
 
     @edit_schedule.autocomplete("title")
     async def edit_schedule_autocomplete(self, interaction: discord.Interaction, current: str):
-        return await self.watchlist_autocomplete(interaction, current)
+        return await self.watchlist_autocomplete(interaction, current, scheduled=True)
+
+    # /scheduleseason
+    @app_commands.choices(timezone=[app_commands.Choice(name="UK", value="UK"), app_commands.Choice(name="NL", value="NL")])
+    @app_commands.command(name="scheduleseason", description="Schedule the next episodes of a show as recurring watch sessions.")
+    @app_commands.describe(
+        title="Select a show",
+        time="First session (e.g. 'Sunday 8pm')",
+        timezone="Timezone (UK or NL)",
+        episodes="How many episodes to schedule",
+        every_days="Days between sessions"
+    )
+    async def schedule_season(self, interaction: discord.Interaction, title: str, time: str, timezone: str,
+                              episodes: app_commands.Range[int, 1, BULK_MAX_SESSIONS], every_days: app_commands.Range[int, 1, 30] = 7):
+        title = title.strip().title()
+        watchlist = await self.watchlists.get(interaction.guild_id)
+        if title not in watchlist:
+            await interaction.response.send_message(f"❌ '{title}' is not in the watchlist.", ephemeral=True)
+            return
+        entry = watchlist[title]
+        if entry.get("type", "tv") != "tv":
+            await interaction.response.send_message(f"🎬 '{title}' is a movie, use /schedule instead.", ephemeral=True)
+            return
+        if entry.get("event_id"):
+            await interaction.response.send_message(f"❌ '{title}' already has a session scheduled. Use /editschedule, or delete its event first.", ephemeral=True)
+            return
+        if timezone.upper() not in TIMEZONES:
+            await interaction.response.send_message("❌ Invalid timezone. Choose either 'UK' or 'NL'.", ephemeral=True)
+            return
+        localized_time = await parse_time(time, timezone)
+        if not localized_time:
+            await interaction.response.send_message("❌ I couldn't understand that time. Try something like 'Sunday 8pm'.", ephemeral=True)
+            return
+        voice_channel = self.get_voice_channel(interaction.guild, watchlist)
+        if not voice_channel:
+            await interaction.response.send_message("❌ Could not find the voice channel. Set one with /setvoice.", ephemeral=True)
+            return
+
+        await interaction.response.defer(thinking=True)
+
+        # One poster and one details request per season cover every session
+        try:
+            info = await enrich(self.bot.tmdb, self.bot.seasons, self.bot.posters, title, entry)
+            plan = await season_plan(self.bot.seasons, entry, episodes) if info else []
+        except UpstreamUnavailable as e:
+            await interaction.followup.send(str(e))
+            return
+        if not info:
+            await interaction.followup.send("❌ Could not find anything on TMDB.")
+            return
+        if not plan:
+            await interaction.followup.send(f"❌ TMDB has no more episodes of **{title}** to schedule.")
+            return
+
+        # Same local time each week, whatever the clocks do in between
+        first = localized_time.replace(tzinfo=None)
+        local_times = [first + timedelta(days=every_days * i) for i in range(len(plan))]
+        starts = [timeparse.to_utc(local, timezone) for local in local_times]
+
+        async def create(start, season, ep, runtime, overview):
+            return await self.create_event(
+                interaction.guild,
+                name=f"📺 {title} - Season {season} Ep {ep}",
+                description=overview,
+                start_time=start,
+                end_time=start + timedelta(minutes=runtime),
+                channel=voice_channel,
+                entity_type=discord.EntityType.voice,
+                privacy_level=discord.PrivacyLevel.guild_only,
+                image=info.image
+            )
+
+        results = await asyncio.gather(*(create(start, *session) for start, session in zip(starts, plan)), return_exceptions=True)
+        sessions = []
+        for local, (season, ep, *_), result in zip(local_times, plan, results):
+            if isinstance(result, Exception):
+                log.warning("Failed to create scheduled event: %s", result,
+                            extra={"guild": interaction.guild_id, "command": "scheduleseason", "title": title})
+                continue
+            self.bot.events.put(result)
+            sessions.append({"event_id": result.id, "session": local.isoformat(), "season": season, "episode": ep})
+        if not sessions:
+            await interaction.followup.send("❌ Failed to create the scheduled events.")
+            return
+        if watchlist.entries.get(title) is not entry:
+            created = [result for result in results if not isinstance(result, Exception)]
+            await self.drop_orphaned_events(interaction, title, created, "scheduleseason")
+            return
+
+        # One save for the whole season; later sessions wait in the queue until the current one completes
+        entry["event_id"] = sessions[0]["event_id"]
+        entry["next_session"] = sessions[0]["session"]
+        entry["current_season"] = sessions[0]["season"]  # moves on if the first event couldn't be created
+        entry["current_episode"] = sessions[0]["episode"]
+        entry["timezone"] = timezone.upper()
+        entry["queue"] = sessions[1:]
+        self.watchlists.save(watchlist, title)
+        await self.plan_reminders(watchlist, title)
+
+        (first_season, first_ep, *_), (last_season, last_ep, *_) = plan[0], plan[-1]
+        formatted_time = localized_time.strftime('%A, %d %B %Y at %I:%M %p')
+        message = (f"📅 Scheduled {len(sessions)} sessions of **{title}** (S{first_season} E{first_ep} to S{last_season} E{last_ep}) "
+                   f"every {every_days} days from `{formatted_time}` ({timezone}).")
+        if len(sessions) < len(plan):
+            message += f" {len(plan) - len(sessions)} events couldn't be created."
+        await interaction.followup.send(message)
+
+    @schedule_season.autocomplete("title")
+    async def schedule_season_autocomplete(self, interaction: discord.Interaction, current: str):
+        return await self.watchlist_autocomplete(interaction, current, tv_only=True, scheduled=False)
 
 async def setup(bot):
-    await bot.add_cog(WatchParty(bot))
\ No newline at end of file
+    await bot.add_cog(WatchParty(bot))
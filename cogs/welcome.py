@@ -1,19 +1,91 @@
+import asyncio
 import discord
 import os
+import sqlite3
+import time
+from collections import defaultdict, deque
 from discord.ext import commands
 from dotenv import load_dotenv
+from services.http import TokenBucket
+from services.storage import WelcomeStore
+from services.logs import get_logger
 
 load_dotenv()
+log = get_logger("welcome")
+# Sampled separately (LOG_SAMPLE_RATES) so a join flood doesn't flood the logs too
+join_log = get_logger("welcome.join")
+role_log = get_logger("welcome.role")
+leave_log = get_logger("welcome.leave")
 WELCOME_CHANNEL_ID = int(os.getenv("WELCOME_CHANNEL_ID"))
 SUPPORT_CHANNEL_ID = int(os.getenv("SUPPORT_CHANNEL_ID"))
 ROLE_ID = int(os.getenv("ROLE_ID"))
 
-# TEMPORARY in-memory storage
-welcome_messages = {}
+# Join floods: past WELCOME_BURST_JOINS joins in WELCOME_BURST_WINDOW seconds, welcomes are combined
+WELCOME_BURST_JOINS = int(os.getenv("WELCOME_BURST_JOINS", 5))
+WELCOME_BURST_WINDOW = float(os.getenv("WELCOME_BURST_WINDOW", 10))
+WELCOME_BATCH_DELAY = float(os.getenv("WELCOME_BATCH_DELAY", 5))  # seconds of joins gathered into one message
+WELCOME_BATCH_MAX = 40  # mentions per combined message, well inside the 2000 character limit
+ROLE_GRANT_RATE = float(os.getenv("ROLE_GRANT_RATE", 2))  # role grants per second
+WELCOME_PRUNE_INTERVAL = 3600
+
+
+def welcome_text(mentions, guild, support_channel):
+    panda_emoji = "<a:PandaKissesLove:1269770132129841155>"
+    lyzz_emoji = "<:ACozyBlanketLyzz:1237365594219610224>"
+    myra_emoji = "<:MyraKissHeart:1241845943943299153>"
+    return (
+        f"Welcome {mentions} to **{guild.name}**! {panda_emoji}\n\n"
+        f"Our aisles are stocked with fun, and the shelves are full of great company. Feel free to browse, chat, and make yourself at home! {lyzz_emoji}\n\n"
+        f"Need help? Visit {support_channel.mention} to open a ticket. Otherwise, enjoy your stay and happy shopping—I mean, chatting! {myra_emoji}"
+    )
+
 
 class Welcome(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.store = WelcomeStore(bot.db)
+        # After a !reload, pending batches and role grants carry over from the previous instance
+        state = bot.handoff.get(__name__) or {}
+        self.recent_joins = state.get("recent_joins", defaultdict(deque))  # guild_id -> join times inside the burst window
+        self.batches = state.get("batches", {})  # guild_id -> members waiting for a combined welcome
+        self.role_queue = state.get("role_queue", asyncio.Queue())  # (member, role) waiting to be granted
+        self.role_bucket = state.get("role_bucket", TokenBucket(ROLE_GRANT_RATE, max(1, int(ROLE_GRANT_RATE))))
+        # Queued grants by (guild_id, member_id); leaving drops the member here, since with a minimal
+        # member cache guild.get_member can't tell who is still around
+        self.pending_roles = state.get("pending_roles", set())
+        self._tasks = []
+        self._batch_tasks = set()  # every running _send_batch, so unloading can wait for them
+        self._batch_timers = {}  # guild_id -> _send_batch still waiting for more joins
+
+    async def cog_load(self):
+        await self.store.setup()
+        self._tasks = [asyncio.create_task(self._grant_roles()), asyncio.create_task(self._prune_loop())]
+        for guild_id in self.batches:
+            self._start_batch(guild_id)  # handed over mid-gathering; the previous instance's timer was cancelled
+
+    async def cog_unload(self):
+        for task in self._tasks:
+            task.cancel()
+        for task in self._batch_timers.values():
+            task.cancel()  # the members stay in self.batches
+        # Combined welcomes already going out are let finish, so nobody is popped from a batch and never welcomed
+        await asyncio.gather(*self._batch_tasks, return_exceptions=True)
+        handoff = self.bot.handoff.get(__name__)
+        if handoff is not None:
+            handoff.update(recent_joins=self.recent_joins, batches=self.batches,
+                           role_queue=self.role_queue, role_bucket=self.role_bucket,
+                           pending_roles=self.pending_roles)
+            return
+        # Shutting down: send the batches that were still gathering now rather than drop them
+        await asyncio.gather(*(self._send_batch(guild_id, delay=0) for guild_id in list(self.batches)))
+
+    def _in_burst(self, guild_id):
+        now = time.monotonic()
+        joins = self.recent_joins[guild_id]
+        joins.append(now)
+        while joins and joins[0] < now - WELCOME_BURST_WINDOW:
+            joins.popleft()
+        return len(joins) >= WELCOME_BURST_JOINS or guild_id in self.batches
 
     @commands.Cog.listener()
     async def on_member_join(self, member):
@@ -21,35 +93,97 @@ class Welcome(commands.Cog):
         support_channel = member.guild.get_channel(SUPPORT_CHANNEL_ID)
         role = member.guild.get_role(ROLE_ID)
 
+        if role:
+            # Granted at a steady pace by _grant_roles, however many people join at once
+            self.pending_roles.add((member.guild.id, member.id))
+            self.role_queue.put_nowait((member, role))
 
-        panda_emoji = "<a:PandaKissesLove:1269770132129841155>"
-        lyzz_emoji = "<:ACozyBlanketLyzz:1237365594219610224>"
-        myra_emoji = "<:MyraKissHeart:1241845943943299153>"
+        if not (channel and support_channel):
+            return
 
-        if role:
-            await member.add_roles(role)
-            print(f"Gave {member.name} the role {role.name}")
-
-        if channel and support_channel:
-            msg = await channel.send(
-                f"Welcome {member.mention} to **{member.guild.name}**! {panda_emoji}\n\n"
-                f"Our aisles are stocked with fun, and the shelves are full of great company. Feel free to browse, chat, and make yourself at home! {lyzz_emoji}\n\n"
-                f"Need help? Visit {support_channel.mention} to open a ticket. Otherwise, enjoy your stay and happy shopping—I mean, chatting! {myra_emoji}"
-                )
-            welcome_messages[member.id] = msg.id
-            print(f"Sent welcome for {member.name}")
+        if self._in_burst(member.guild.id):
+            batch = self.batches.get(member.guild.id)
+            if batch is None:
+                batch = self.batches[member.guild.id] = []
+                self._start_batch(member.guild.id)
+            batch.append(member)
+            return
 
-    @commands.Cog.listener()
-    async def on_member_remove(self, member):
-        channel = member.guild.get_channel(WELCOME_CHANNEL_ID)
-        if channel and member.id in welcome_messages:
+        msg = await channel.send(welcome_text(member.mention, member.guild, support_channel))
+        await self.store.add(member.guild.id, [member.id], channel.id, msg.id)
+        join_log.info("Sent welcome for %s", member.name, extra={"guild": member.guild.id, "member": member.id})
+
+    def _start_batch(self, guild_id):
+        task = self._batch_timers[guild_id] = asyncio.create_task(self._send_batch(guild_id))
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+
+    async def _send_batch(self, guild_id, delay=WELCOME_BATCH_DELAY):
+        await asyncio.sleep(delay)
+        self._batch_timers.pop(guild_id, None)  # sending now, no longer safe to cancel
+        members = self.batches.pop(guild_id, [])
+        guild = self.bot.get_guild(guild_id)
+        channel = guild and guild.get_channel(WELCOME_CHANNEL_ID)
+        support_channel = guild and guild.get_channel(SUPPORT_CHANNEL_ID)
+        if not (members and channel and support_channel):
+            return
+        for start in range(0, len(members), WELCOME_BATCH_MAX):
+            chunk = members[start:start + WELCOME_BATCH_MAX]
+            try:
+                msg = await channel.send(welcome_text(", ".join(m.mention for m in chunk), guild, support_channel))
+                await self.store.add(guild.id, [m.id for m in chunk], channel.id, msg.id)
+            except (discord.HTTPException, sqlite3.Error) as e:
+                log.warning("Failed to send combined welcome: %s", e, extra={"guild": guild.id})
+        log.info("Sent a combined welcome for %d members", len(members), extra={"guild": guild.id})
+
+    async def _grant_roles(self):
+        while True:
+            member, role = await self.role_queue.get()
+            key = (member.guild.id, member.id)
+            if key not in self.pending_roles:
+                continue  # left before their turn
+            self.pending_roles.discard(key)
+            await self.role_bucket.acquire()
+            try:
+                await member.add_roles(role)
+                role_log.info("Gave %s the role %s", member.name, role.name, extra={"guild": member.guild.id, "member": member.id})
+            except discord.HTTPException as e:
+                role_log.warning("Failed to give %s the role %s: %s", member.name, role.name, e,
+                                 extra={"guild": member.guild.id, "member": member.id})
+
+    async def _prune_loop(self):
+        while True:
             try:
-                msg = await channel.fetch_message(welcome_messages[member.id])
-                await msg.delete()
-                print(f"Deleted welcome message for {member.name}")
-            except discord.NotFound:
-                print(f"Welcome message for {member.name} not found.")
-            del welcome_messages[member.id]
+                await self.store.prune()
+            except sqlite3.Error as e:
+                log.warning("Failed to prune welcome messages: %s", e)
+            await asyncio.sleep(WELCOME_PRUNE_INTERVAL)
+
+    @commands.Cog.listener()
+    async def on_raw_member_remove(self, payload):
+        # The raw event fires whether or not the member was cached, unlike on_member_remove
+        user = payload.user
+        self.pending_roles.discard((payload.guild_id, user.id))
+        batch = self.batches.get(payload.guild_id)
+        if batch and any(m.id == user.id for m in batch):
+            batch[:] = [m for m in batch if m.id != user.id]  # not welcomed yet, just leave them out
+            return
+
+        tracked = await self.store.pop(payload.guild_id, user.id)
+        if not tracked:
+            return
+        channel_id, message_id, shared = tracked
+        if shared:
+            return  # a combined welcome still greets other members
+
+        guild = self.bot.get_guild(payload.guild_id)
+        channel = (guild and guild.get_channel(channel_id)) or self.bot.get_partial_messageable(channel_id)
+        try:
+            await channel.get_partial_message(message_id).delete()
+            leave_log.info("Deleted welcome message for %s", user.name, extra={"guild": payload.guild_id, "member": user.id})
+        except discord.NotFound:
+            leave_log.info("Welcome message for %s not found", user.name, extra={"guild": payload.guild_id, "member": user.id})
+
 
 async def setup(bot):
-    await bot.add_cog(Welcome(bot))
\ No newline at end of file
+    await bot.add_cog(Welcome(bot))
@@ -1,6 +1,62 @@
 from dotenv import load_dotenv
+import discord
 import os
 
 load_dotenv()
 
-TOKEN = os.getenv("DISCORD_TOKEN")
\ No newline at end of file
+TOKEN = os.getenv("DISCORD_TOKEN")
+
+# Set per process by cluster.py. Without SHARD_IDS the bot runs as one unsharded process.
+CLUSTER_ID = int(os.getenv("CLUSTER_ID", 0))
+SHARD_IDS = [int(shard) for shard in os.getenv("SHARD_IDS", "").split(",") if shard.strip()] or None
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", 0)) or None
+# Cluster 0 also does the once-per-deployment work: syncing slash commands, refreshing season tables
+PRIMARY_CLUSTER = CLUSTER_ID == 0
+
+# What discord.py keeps in memory. "full" (the default) is discord.py's own behaviour. The cogs only
+# need join/leave events plus role and channel lookups, which work without a member cache, so large
+# deployments can opt into "lean" or "minimal".
+CACHE_PROFILES = {
+    # discord.py's defaults, and ours: every member cached, every guild chunked at startup, 1000 messages kept
+    "full": {"members": "all", "chunk_guilds_at_startup": True, "max_messages": 1000},
+    # members currently in voice (and the bot itself), no chunking, no message cache
+    "lean": {"members": "voice", "chunk_guilds_at_startup": False, "max_messages": None},
+    # only the bot's own member
+    "minimal": {"members": "none", "chunk_guilds_at_startup": False, "max_messages": None},
+}
+CACHE_PROFILE = os.getenv("CACHE_PROFILE", "full")
+
+
+def _flag(name, default):
+    value = os.getenv(name)
+    return default if value is None else value.lower() in ("1", "true", "yes")
+
+
+def cache_options(intents, profile=None):
+    """commands.Bot keyword arguments for a cache profile (CACHE_PROFILE, "full" unless set), with
+    MEMBER_CACHE / CHUNK_GUILDS_AT_STARTUP / MAX_MESSAGES overriding single settings."""
+    profile = profile or CACHE_PROFILE
+    if profile not in CACHE_PROFILES:
+        raise ValueError(f"Unknown CACHE_PROFILE {profile!r}, expected one of {', '.join(CACHE_PROFILES)}")
+    settings = CACHE_PROFILES[profile]
+
+    members = os.getenv("MEMBER_CACHE", settings["members"])
+    if members == "all":
+        member_cache_flags = discord.MemberCacheFlags.from_intents(intents)
+    elif members == "voice":
+        member_cache_flags = discord.MemberCacheFlags.none()
+        member_cache_flags.voice = intents.voice_states
+    elif members == "none":
+        member_cache_flags = discord.MemberCacheFlags.none()
+    else:
+        raise ValueError(f"Unknown MEMBER_CACHE {members!r}, expected all, voice or none")
+
+    max_messages = os.getenv("MAX_MESSAGES")
+    max_messages = settings["max_messages"] if max_messages is None else int(max_messages) or None
+    return {
+        "member_cache_flags": member_cache_flags,
+        # Chunking needs the member cache to put the results somewhere
+        "chunk_guilds_at_startup": _flag("CHUNK_GUILDS_AT_STARTUP", settings["chunk_guilds_at_startup"])
+                                   and member_cache_flags.joined,
+        "max_messages": max_messages,
+    }
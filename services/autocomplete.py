@@ -0,0 +1,131 @@
+import bisect
+import itertools
+import re
+import unicodedata
+from collections import Counter, defaultdict
+
+FUZZY_THRESHOLD = 0.4  # share of the query's trigrams a title needs to count as a typo match
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize(text):
+    """Case-folds, strips accents and punctuation, and collapses whitespace."""
+    text = unicodedata.normalize("NFKD", text.casefold())
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+def trigrams(key):
+    padded = f" {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TitleIndex:
+    """Incrementally maintained search index over one guild's watchlist titles."""
+
+    def __init__(self, entries=()):
+        self.keys = {}  # title -> normalised key
+        self.flags = {}  # title -> (is_tv, is_scheduled)
+        self.by_key = []  # sorted (key, title), for whole-title prefix lookups
+        self.by_word = []  # sorted (word, title), for word prefix lookups
+        self.grams = defaultdict(set)  # trigram -> titles
+        # Bulk build: append everything, then sort once
+        for title in entries:
+            self.update(title, entries[title], insert=self._append)
+        self.by_key.sort()
+        self.by_word.sort()
+
+    @staticmethod
+    def _append(items, item):
+        items.append(item)
+
+    def update(self, title, entry, insert=bisect.insort):
+        is_tv = entry.get("type", "tv") == "tv"
+        self.flags[title] = (is_tv, bool(entry.get("next_session")))
+        if title in self.keys:
+            return  # titles never change, only their flags
+        key = self.keys[title] = normalize(title)
+        insert(self.by_key, (key, title))
+        for word in set(key.split()):
+            insert(self.by_word, (word, title))
+        for gram in trigrams(key):
+            self.grams[gram].add(title)
+
+    def remove(self, title):
+        key = self.keys.pop(title, None)
+        if key is None:
+            return
+        del self.flags[title]
+        self._discard(self.by_key, (key, title))
+        for word in set(key.split()):
+            self._discard(self.by_word, (word, title))
+        for gram in trigrams(key):
+            titles = self.grams[gram]
+            titles.discard(title)
+            if not titles:
+                del self.grams[gram]
+
+    @staticmethod
+    def _discard(items, item):
+        i = bisect.bisect_left(items, item)
+        if i < len(items) and items[i] == item:
+            del items[i]
+
+    @staticmethod
+    def _prefixed(items, prefix):
+        i = bisect.bisect_left(items, (prefix,))
+        while i < len(items) and items[i][0].startswith(prefix):
+            yield items[i][1]
+            i += 1
+
+    def _allowed(self, title, tv_only, scheduled):
+        is_tv, is_scheduled = self.flags[title]
+        if tv_only and not is_tv:
+            return False
+        return scheduled is None or is_scheduled == scheduled
+
+    def search(self, query, limit=25, tv_only=False, scheduled=None):
+        """Returns up to `limit` titles ranked: title prefix, word prefix, substring, then typo matches.
+
+        `scheduled` filters to scheduled (True) or unscheduled (False) titles when set.
+        """
+        q = normalize(query)
+        if not q:
+            allowed = (title for _, title in self.by_key if self._allowed(title, tv_only, scheduled))
+            return list(itertools.islice(allowed, limit))
+
+        ranked = {}
+
+        def rank(title, score):
+            if score < ranked.get(title, 4) and self._allowed(title, tv_only, scheduled):
+                ranked[title] = score
+
+        for title in self._prefixed(self.by_key, q):
+            rank(title, 0)
+        for title in self._prefixed(self.by_word, q.split()[0]):
+            if q in self.keys[title]:
+                rank(title, 1)
+
+        query_grams = trigrams(q)
+        if len(q) < 3 and len(ranked) < limit:
+            # Too short for trigrams to narrow anything down: scan for it inside words instead
+            for title, key in self.keys.items():
+                if title not in ranked and q in key:
+                    rank(title, 2)
+        elif len(ranked) < limit:
+            hits = Counter()
+            for gram in query_grams:
+                hits.update(self.grams.get(gram, ()))
+            for title, count in hits.items():
+                if title in ranked:
+                    continue
+                if q in self.keys[title]:
+                    rank(title, 2)
+                else:
+                    similarity = count / len(query_grams)
+                    if similarity >= FUZZY_THRESHOLD:
+                        rank(title, 4 - similarity)
+
+        best = sorted(ranked, key=lambda title: (ranked[title], len(self.keys[title]), self.keys[title]))
+        return best[:limit]
@@ -0,0 +1,81 @@
+import asyncio
+import math
+import os
+import sqlite3
+import time
+from dotenv import load_dotenv
+from services.logs import get_logger
+
+load_dotenv()
+log = get_logger("cluster")
+CLUSTER_HEARTBEAT_INTERVAL = float(os.getenv("CLUSTER_HEARTBEAT_INTERVAL", 15))
+CLUSTER_STALE_AFTER = 3 * CLUSTER_HEARTBEAT_INTERVAL  # no heartbeat for this long means the cluster is stuck
+
+
+def shard_ranges(shard_count, clusters):
+    """Splits shards 0..shard_count-1 into `clusters` contiguous, near-equal ranges."""
+    clusters = min(clusters, shard_count)
+    size, extra = divmod(shard_count, clusters)
+    ranges, start = [], 0
+    for cluster in range(clusters):
+        end = start + size + (cluster < extra)
+        ranges.append(list(range(start, end)))
+        start = end
+    return ranges
+
+
+def shard_for(guild_id, shard_count):
+    """The shard Discord delivers a guild's events to."""
+    return (guild_id >> 22) % shard_count
+
+
+def owns(bot, guild_id):
+    """Whether this process serves the guild. Always true when the bot isn't sharded across processes."""
+    shard_ids = getattr(bot, "shard_ids", None)
+    if not shard_ids or not bot.shard_count:
+        return True
+    return shard_for(guild_id, bot.shard_count) in shard_ids
+
+
+def stale(row, now=None):
+    return row["status"] != "stopped" and (now or time.time()) - row["updated_at"] > CLUSTER_STALE_AFTER
+
+
+class Heartbeat:
+    """Writes this cluster's health (shards, guilds, gateway latency) to the shared store on an interval."""
+
+    def __init__(self, bot, store, cluster_id, interval=CLUSTER_HEARTBEAT_INTERVAL):
+        self.bot = bot
+        self.store = store
+        self.cluster_id = cluster_id
+        self.interval = interval
+        self.started = time.time()
+        self._task = None
+
+    async def start(self):
+        await self.store.setup()
+        self._task = asyncio.create_task(self._run())
+
+    async def beat(self, status=None):
+        latency = self.bot.latency
+        await self.store.beat(
+            self.cluster_id, os.getpid(), list(self.bot.shard_ids or []),
+            status or ("ready" if self.bot.is_ready() else "starting"), len(self.bot.guilds),
+            None if math.isnan(latency) or math.isinf(latency) else round(latency * 1000, 1), self.started,
+        )
+
+    async def _run(self):
+        while True:
+            try:
+                await self.beat()
+            except sqlite3.Error as e:
+                log.warning("Failed to write heartbeat: %s", e, extra={"cluster": self.cluster_id})
+            await asyncio.sleep(self.interval)
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+        try:
+            await self.beat("stopped")
+        except sqlite3.Error as e:
+            log.warning("Failed to write final heartbeat: %s", e, extra={"cluster": self.cluster_id})
@@ -0,0 +1,114 @@
+import asyncio
+from services.logs import get_logger
+
+log = get_logger("enrichment")
+DEFAULT_RUNTIME = 25  # minutes, when TMDB doesn't know
+DEFAULT_OVERVIEW = "no description available."
+
+
+class SessionInfo:
+    """What a scheduled event needs to know about the show or movie being watched."""
+
+    def __init__(self, tmdb_id, runtime=DEFAULT_RUNTIME, overview=DEFAULT_OVERVIEW, image=None):
+        self.tmdb_id = tmdb_id
+        self.runtime = runtime
+        self.overview = overview
+        self.image = image
+
+
+async def resolve(tmdb, title, entry):
+    """Looks the entry up on TMDB once, remembering its id and poster path. Returns False if nothing matched."""
+    if entry.get("tmdb_id"):
+        return True
+    result = await tmdb.search("movie" if entry.get("type") == "movie" else "tv", title)
+    if not result:
+        return False
+    entry["tmdb_id"] = result["id"]
+    entry["poster_path"] = result.get("poster_path")
+    return True
+
+
+async def movie_info(tmdb, entry):
+    """Runtime and overview for a movie entry, fetched once and then kept on the entry."""
+    if "runtime" not in entry:
+        details = await tmdb.movie(entry["tmdb_id"]) or {}
+        entry["runtime"] = details.get("runtime") or None
+        entry["overview"] = details.get("overview") or None
+    return entry["runtime"] or DEFAULT_RUNTIME, entry["overview"] or DEFAULT_OVERVIEW
+
+
+async def episode_info(seasons, entry):
+    """Runtime and overview of the entry's current episode, from the local season table."""
+    season = await seasons.get(entry["tmdb_id"], entry.get("current_season", 1))
+    if season is None:
+        return DEFAULT_RUNTIME, DEFAULT_OVERVIEW
+    runtime, overview = season.episode(entry.get("current_episode", 1)) or (None, None)
+    return runtime or season.runtime or DEFAULT_RUNTIME, overview or DEFAULT_OVERVIEW
+
+
+async def enrich(tmdb, seasons, posters, title, entry, with_poster=True):
+    """Gathers runtime, overview and poster for a watchlist entry's next session.
+
+    Entries added with a TMDB id skip the search; episode data comes from the local season tables
+    and the poster from the disk cache, so a repeat schedule usually makes no TMDB request at all.
+    Lookups and the poster download run concurrently. Returns None if TMDB has nothing for the title.
+    """
+    if not await resolve(tmdb, title, entry):
+        return None
+
+    lookup = movie_info(tmdb, entry) if entry.get("type") == "movie" else episode_info(seasons, entry)
+    jobs = [lookup]
+    poster_path = entry.get("poster_path")
+    if with_poster and poster_path:
+        jobs.append(posters.get(poster_path))
+    details, *image = await asyncio.gather(*jobs, return_exceptions=True)
+
+    info = SessionInfo(entry["tmdb_id"])
+    if image:
+        if isinstance(image[0], BaseException):
+            log.warning("Failed to fetch poster image: %s", image[0])
+        else:
+            info.image = image[0]
+    if isinstance(details, BaseException):
+        log.warning("Failed to fetch TMDB details for '%s': %s", title, details)
+    else:
+        info.runtime, info.overview = details
+    return info
+
+
+async def next_episode(seasons, entry):
+    """The (season, episode) after the entry's current one, rolling over into the next season when the current one ended."""
+    season = entry.get("current_season", 1)
+    episode = entry.get("current_episode", 1) + 1
+    if not entry.get("tmdb_id"):
+        return season, episode
+    table = await seasons.get(entry["tmdb_id"], season)
+    if table and len(table) and episode > max(table.episodes) and season < table.seasons:
+        return season + 1, 1
+    return season, episode
+
+
+async def season_plan(seasons, entry, count):
+    """(season, episode, runtime, overview) for the entry's next `count` episodes, crossing into later seasons.
+
+    Needs entry["tmdb_id"]. Served from the local season tables.
+    """
+    season = entry.get("current_season", 1)
+    episode = entry.get("current_episode", 1)
+    plan = []
+    while len(plan) < count:
+        table = await seasons.get(entry["tmdb_id"], season)
+        default_runtime = (table.runtime if table is not None else None) or DEFAULT_RUNTIME
+        if not table or not len(table):
+            # TMDB doesn't know this season's episodes, keep counting up with defaults
+            plan.extend((season, episode + i, default_runtime, DEFAULT_OVERVIEW) for i in range(count - len(plan)))
+            break
+        while len(plan) < count and table.episode(episode):
+            runtime, overview = table.episode(episode)
+            plan.append((season, episode, runtime or default_runtime, overview or DEFAULT_OVERVIEW))
+            episode += 1
+        if len(plan) < count:
+            if season >= table.seasons:
+                break  # caught up with the show
+            season, episode = season + 1, 1
+    return plan
@@ -0,0 +1,52 @@
+import discord
+
+FINISHED = (discord.EventStatus.completed, discord.EventStatus.canceled)
+
+
+class EventIndex:
+    """Scheduled event lookups that never hit the REST API.
+
+    With the guild_scheduled_events intent (on by default) this reads discord.py's own gateway-fed
+    cache. Without it nothing would keep that cache current, so each guild's events are fetched once
+    and the ones the bot creates or edits are recorded here. Once a guild is seeded, an id that can't
+    be found is an event that no longer exists.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.fetched = {}  # guild_id -> {event_id: ScheduledEvent}, only used without the intent
+
+    @property
+    def gateway(self):
+        return self.bot.intents.guild_scheduled_events
+
+    def seeded(self, guild_id):
+        if self.gateway:
+            guild = self.bot.get_guild(guild_id)
+            return guild is not None and not guild.unavailable
+        return guild_id in self.fetched
+
+    async def seed(self, guild):
+        """Makes a guild's events available; one bulk fetch when the intent is off, nothing otherwise."""
+        if not self.gateway:
+            self.fetched[guild.id] = {event.id: event for event in await guild.fetch_scheduled_events()}
+
+    def forget(self, guild_id):
+        self.fetched.pop(guild_id, None)
+
+    def put(self, event):
+        """Records an event the bot just created or edited. The gateway does this itself when it can."""
+        events = self.fetched.get(event.guild_id)
+        if events is not None:
+            events[event.id] = event
+
+    def get(self, guild_id, event_id):
+        if self.gateway:
+            guild = self.bot.get_guild(guild_id)
+            return guild.get_scheduled_event(event_id) if guild and event_id else None
+        return self.fetched.get(guild_id, {}).get(event_id)
+
+    def __len__(self):
+        if self.gateway:
+            return sum(len(guild.scheduled_events) for guild in self.bot.guilds)
+        return sum(len(events) for events in self.fetched.values())
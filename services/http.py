@@ -0,0 +1,214 @@
+import aiohttp
+import asyncio
+import os
+import random
+import time
+from functools import partial
+from dotenv import load_dotenv
+from services.logs import get_logger
+
+load_dotenv()
+log = get_logger("upstream")
+
+# Connection pool tuning (all optional)
+HTTP_POOL_LIMIT = int(os.getenv("HTTP_POOL_LIMIT", 100))
+HTTP_POOL_LIMIT_PER_HOST = int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", 10))
+HTTP_DNS_CACHE_TTL = int(os.getenv("HTTP_DNS_CACHE_TTL", 300))
+HTTP_KEEPALIVE_TIMEOUT = float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", 60))
+HTTP_TOTAL_TIMEOUT = float(os.getenv("HTTP_TOTAL_TIMEOUT", 15))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", 10))
+
+# Upstream resilience
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", 2))  # extra attempts after a 429/5xx/connection error
+HTTP_BACKOFF_BASE = 0.25  # seconds, doubled per attempt with full jitter
+HTTP_BACKOFF_MAX = 4.0
+HTTP_MAX_RETRY_AFTER = 10.0  # don't hold a command longer than this for a Retry-After
+BREAKER_THRESHOLD = int(os.getenv("HTTP_BREAKER_THRESHOLD", 5))  # consecutive failures before failing fast
+BREAKER_COOLDOWN = float(os.getenv("HTTP_BREAKER_COOLDOWN", 30))  # seconds before a probe request is let through
+
+
+def create_session(trace_configs=None):
+    """Creates the bot-wide pooled HTTP client. Must be called from a running event loop."""
+    connector = aiohttp.TCPConnector(
+        limit=HTTP_POOL_LIMIT,
+        limit_per_host=HTTP_POOL_LIMIT_PER_HOST,
+        ttl_dns_cache=HTTP_DNS_CACHE_TTL,
+        keepalive_timeout=HTTP_KEEPALIVE_TIMEOUT,
+    )
+    timeout = aiohttp.ClientTimeout(
+        total=HTTP_TOTAL_TIMEOUT,
+        sock_connect=HTTP_CONNECT_TIMEOUT,
+        sock_read=HTTP_READ_TIMEOUT,
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=timeout, trace_configs=trace_configs)
+
+
+class UpstreamUnavailable(Exception):
+    """An upstream API is down or rate limiting us. str() is safe to show to users."""
+
+    def __init__(self, name, retry_after=None):
+        self.name = name
+        self.retry_after = retry_after
+        wait = "in a few seconds" if retry_after and retry_after <= HTTP_MAX_RETRY_AFTER else "in a minute"
+        super().__init__(f"⚠️ {name} isn't responding right now, please try again {wait}.")
+
+
+class UpstreamResponse:
+    def __init__(self, status, headers, data):
+        self.status = status
+        self.headers = headers
+        self.data = data  # parsed JSON for 200 responses, otherwise None
+
+
+class SingleFlight:
+    """Shares one in-flight call between concurrent callers asking for the same key."""
+
+    def __init__(self):
+        self.calls = {}  # key -> task
+        self.coalesced = 0
+
+    async def run(self, key, func, *args):
+        task = self.calls.get(key)
+        if task is None:
+            task = self.calls[key] = asyncio.create_task(func(*args))
+            task.add_done_callback(partial(self._done, key))
+        else:
+            self.coalesced += 1
+        # One caller being cancelled mustn't cancel the request for the others
+        return await asyncio.shield(task)
+
+    def _done(self, key, task):
+        self.calls.pop(key, None)
+        if not task.cancelled():
+            task.exception()  # retrieved here so an abandoned failure isn't logged as unhandled
+
+
+class TokenBucket:
+    """Allows `rate` requests per second on average with bursts of up to `burst`. A rate of 0 disables it."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds):
+        """Holds every caller back, e.g. after the upstream sent a Retry-After."""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        if not self.rate:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def _retry_after(value):
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        return None  # missing, or an HTTP date we don't bother parsing
+
+
+class Upstream:
+    """JSON GETs against one upstream API with request coalescing, rate limiting, retries and a circuit breaker."""
+
+    def __init__(self, session, name, rate, burst, retries=HTTP_RETRIES,
+                 breaker_threshold=BREAKER_THRESHOLD, breaker_cooldown=BREAKER_COOLDOWN):
+        self.session = session
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.retries = retries
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.flights = SingleFlight()
+        self.failures = 0  # consecutive
+        self.opened_at = None  # when the breaker tripped
+        self._probing = False
+        self.retried = 0
+        self.rejected = 0
+
+    # Circuit breaker
+    def _check_breaker(self):
+        if self.opened_at is None:
+            return
+        remaining = self.opened_at + self.breaker_cooldown - time.monotonic()
+        if remaining > 0 or self._probing:
+            self.rejected += 1
+            raise UpstreamUnavailable(self.name, max(remaining, 0))
+        # Half-open: let one request through to see if the upstream is back
+        self._probing = True
+
+    def _record(self, ok):
+        self._probing = False
+        if ok:
+            self.failures = 0
+            self.opened_at = None
+            return
+        self.failures += 1
+        if self.failures >= self.breaker_threshold or self.opened_at is not None:
+            self.opened_at = time.monotonic()
+
+    # Requests
+    async def get(self, url, params=None, headers=None):
+        """GETs url, sharing the request with identical concurrent calls. Raises UpstreamUnavailable."""
+        key = (url, tuple(sorted((params or {}).items())), tuple(sorted((headers or {}).items())))
+        return await self.flights.run(key, self._get, url, params, headers)
+
+    async def _get(self, url, params, headers):
+        self._check_breaker()
+        try:
+            return await self._attempts(url, params, headers)
+        finally:
+            self._probing = False
+
+    async def _attempts(self, url, params, headers):
+        retry_after = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                self.retried += 1
+                backoff = random.uniform(0, min(HTTP_BACKOFF_MAX, HTTP_BACKOFF_BASE * 2 ** attempt))
+                await asyncio.sleep(retry_after if retry_after is not None else backoff)
+            await self.bucket.acquire()
+            status, retry_after = None, None
+            try:
+                async with self.session.get(url, params=params, headers=headers) as resp:
+                    if resp.status != 429 and resp.status < 500:
+                        data = await resp.json() if resp.status == 200 else None
+                        self._record(True)
+                        return UpstreamResponse(resp.status, resp.headers, data)
+                    status = resp.status
+                    retry_after = _retry_after(resp.headers.get("Retry-After"))
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                log.warning("%s request failed: %r", self.name, e, extra={"upstream": self.name})
+
+            if status == 429:
+                self.bucket.pause(retry_after or HTTP_BACKOFF_BASE)
+            if retry_after is not None and retry_after > HTTP_MAX_RETRY_AFTER:
+                break
+
+        # Being throttled says nothing about the upstream's health, so only errors count towards the breaker
+        if status != 429:
+            self._record(False)
+        raise UpstreamUnavailable(self.name, retry_after)
+
+    def stats(self):
+        return {
+            "coalesced": self.flights.coalesced,
+            "retried": self.retried,
+            "rejected": self.rejected,
+            "circuit_open": int(self.opened_at is not None),
+        }
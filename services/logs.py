@@ -0,0 +1,176 @@
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from dotenv import load_dotenv
+
+load_dotenv()
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+# Per-category levels, e.g. "welcome=WARNING,upstream=DEBUG,discord=INFO"
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+# Records per second let through for high-volume categories; the rest are counted, not written
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "welcome.join=5,welcome.role=5,welcome.leave=5")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # json, or text for reading locally
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))  # records waiting for the writer before new ones are dropped
+
+ROOT = "akari"
+# Attributes every LogRecord has; anything else on a record came in through `extra=`
+_STANDARD = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "taskName"}
+
+
+def get_logger(category):
+    """Logger for a category such as "welcome" or "welcome.join". Levels and sampling are set per category."""
+    return logging.getLogger(f"{ROOT}.{category}")
+
+
+def _parse(setting):
+    pairs = (item.split("=", 1) for item in setting.split(",") if "=" in item)
+    return {key.strip(): value.strip() for key, value in pairs}
+
+
+def _category(name):
+    return name[len(ROOT) + 1:] if name.startswith(f"{ROOT}.") else name
+
+
+def _fields(record):
+    return {key: value for key, value in vars(record).items() if key not in _STANDARD}
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: time, level, category and message, plus any `extra=` fields
+    (guild, command, latency_ms, ...)."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "category": _category(record.name),
+            "msg": record.getMessage(),
+            **_fields(record),
+        }
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = _fields(record)
+        if fields:
+            line += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class SampleFilter(logging.Filter):
+    """Lets through at most `rate` records per second (with bursts of the same size) and counts the rest.
+
+    The next record that gets through carries a `suppressed` field saying how many were skipped.
+    """
+
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+        self.burst = max(1.0, rate)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self.skipped = 0
+        self.suppressed = 0  # total, for stats
+
+    def filter(self, record):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            self.skipped += 1
+            self.suppressed += 1
+            return False
+        self.tokens -= 1
+        if self.skipped:
+            record.suppressed = self.skipped
+            self.skipped = 0
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Hands records to the writer thread without ever waiting; if it falls behind, records are dropped."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Resolve the message and traceback now, while the arguments are still what they were
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogPipeline:
+    """Routes every logger (ours and discord.py's) through a bounded queue to a writer thread.
+
+    Logging from the event loop costs a filter check and a queue put; formatting and the write to a
+    possibly slow stdout happen on the listener thread.
+    """
+
+    def __init__(self, level=LOG_LEVEL, levels=LOG_LEVELS, sample_rates=LOG_SAMPLE_RATES, fmt=LOG_FORMAT,
+                 stream=None):
+        self.level = level
+        self.levels = _parse(levels)
+        self.sample_rates = {category: float(rate) for category, rate in _parse(sample_rates).items()}
+        self.formatter = TextFormatter() if fmt == "text" else JSONFormatter()
+        self.stream = stream or sys.stdout
+        self.handler = NonBlockingQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+        self.filters = {}  # category -> SampleFilter
+        self.listener = None
+
+    def start(self):
+        output = logging.StreamHandler(self.stream)
+        output.setFormatter(self.formatter)
+        self.listener = QueueListener(self.handler.queue, output)
+        self.listener.start()
+
+        root = logging.getLogger()
+        root.addHandler(self.handler)
+        root.setLevel(logging.WARNING)
+        logging.getLogger(ROOT).setLevel(self.level.upper())
+        logging.getLogger("discord").setLevel(logging.WARNING)
+        for category, level in self.levels.items():
+            logger = logging.getLogger(category) if category.split(".")[0] == "discord" else get_logger(category)
+            logger.setLevel(level.upper())
+        for category, rate in self.sample_rates.items():
+            self.filters[category] = SampleFilter(rate)
+            get_logger(category).addFilter(self.filters[category])
+
+    def close(self):
+        """Detaches the handler and writes out whatever is still queued."""
+        logging.getLogger().removeHandler(self.handler)
+        for category, sample in self.filters.items():
+            get_logger(category).removeFilter(sample)
+        if self.listener:
+            self.listener.stop()
+
+    def stats(self):
+        return {
+            "queued": self.handler.queue.qsize(),
+            "dropped": self.handler.dropped,
+            "sampled_out": sum(sample.suppressed for sample in self.filters.values()),
+        }
@@ -0,0 +1,281 @@
+import asyncio
+import os
+import time
+from collections import Counter, defaultdict
+import aiohttp
+from aiohttp import web
+from discord import app_commands
+from dotenv import load_dotenv
+from services.logs import get_logger
+
+load_dotenv()
+log = get_logger("metrics")
+command_log = get_logger("commands")
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", 9108))  # 0 disables the /metrics endpoint
+LOOP_LAG_INTERVAL = 0.5
+
+# Latency buckets in seconds, roughly the Prometheus client defaults
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+
+def labels(**values):
+    """Prometheus label pairs, with the values escaped (they come from command names, hosts and exceptions)."""
+    def escape(value):
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    return ",".join(f'{key}="{escape(value)}"' for key, value in values.items())
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+
+    def quantile(self, q):
+        """Estimates a quantile by interpolating inside the bucket it falls in."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for bound, count in zip(BUCKETS, self.counts):
+            if seen + count >= rank and count:
+                if bound == float("inf"):
+                    return lower
+                return lower + (bound - lower) * (rank - seen) / count
+            seen += count
+            lower = bound
+        return lower
+
+
+class LoopLagSampler:
+    """Measures how late the event loop wakes a sleeping task, i.e. how long it was blocked."""
+
+    def __init__(self, interval=LOOP_LAG_INTERVAL, threshold=0.002):
+        self.interval = interval
+        self.threshold = threshold
+        self.histogram = Histogram()
+        self.blocked = 0.0
+        self.max_lag = 0.0
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - start - self.interval)
+            self.histogram.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+            if lag > self.threshold:
+                self.blocked += lag
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def reset(self):
+        self.histogram = Histogram()
+        self.blocked = 0.0
+        self.max_lag = 0.0
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+
+
+class Metrics:
+    def __init__(self):
+        self.started = time.time()
+        self.commands = defaultdict(Histogram)  # (kind, command) -> latency
+        self.command_errors = Counter()  # (kind, command, error type) -> count
+        self.http = defaultdict(Histogram)  # host -> latency
+        self.http_status = Counter()  # (host, status) -> count
+        self.http_errors = Counter()  # (host, error kind) -> count
+        self.loop_lag = LoopLagSampler()
+        self.collectors = {}  # name -> callable returning {stat: number}, e.g. cache counters
+        self._runner = None
+
+    # Recording
+    def observe_command(self, kind, name, seconds, error_type=None):
+        self.commands[(kind, name)].observe(seconds)
+        if error_type is not None:
+            self.command_errors[(kind, name, error_type)] += 1
+
+    def observe_http(self, host, status, seconds):
+        self.http[host].observe(seconds)
+        self.http_status[(host, status)] += 1
+
+    def http_error(self, host, error):
+        kind = "timeout" if isinstance(error, asyncio.TimeoutError) else type(error).__name__
+        self.http_errors[(host, kind)] += 1
+
+    def trace_config(self):
+        """aiohttp tracing hooks that time every outbound request made through the shared session."""
+        config = aiohttp.TraceConfig()
+
+        async def on_request_start(session, ctx, params):
+            ctx.start = time.perf_counter()
+
+        async def on_request_end(session, ctx, params):
+            self.observe_http(params.url.host, params.response.status, time.perf_counter() - ctx.start)
+
+        async def on_request_exception(session, ctx, params):
+            self.http_error(params.url.host, params.exception)
+
+        config.on_request_start.append(on_request_start)
+        config.on_request_end.append(on_request_end)
+        config.on_request_exception.append(on_request_exception)
+        return config
+
+    # Reporting
+    def render(self):
+        """Prometheus text exposition format."""
+        lines = []
+
+        def braces(*parts):
+            joined = ",".join(part for part in parts if part)
+            return f"{{{joined}}}" if joined else ""
+
+        def histogram(name, help_text, series):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for series_labels, hist in series:
+                cumulative = 0
+                for bound, count in zip(BUCKETS, hist.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{name}_bucket{braces(series_labels, labels(le=le))} {cumulative}")
+                lines.append(f"{name}_sum{braces(series_labels)} {hist.sum}")
+                lines.append(f"{name}_count{braces(series_labels)} {hist.count}")
+
+        def sample(name, help_text, kind, series):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for series_labels, value in series:
+                lines.append(f"{name}{braces(series_labels)} {value}")
+
+        def counter(name, help_text, series):
+            sample(name, help_text, "counter", series)
+
+        histogram("akari_command_seconds", "Command latency.",
+                  [(labels(kind=kind, command=name), h) for (kind, name), h in self.commands.items()])
+        counter("akari_command_errors_total", "Failed commands.",
+                [(labels(kind=kind, command=name, error=error), n) for (kind, name, error), n in self.command_errors.items()])
+        histogram("akari_http_request_seconds", "Outbound HTTP latency.",
+                  [(labels(host=host), h) for host, h in self.http.items()])
+        counter("akari_http_responses_total", "Outbound HTTP responses by status.",
+                [(labels(host=host, status=status), n) for (host, status), n in self.http_status.items()])
+        counter("akari_http_errors_total", "Outbound HTTP failures (timeouts, connection errors).",
+                [(labels(host=host, error=error), n) for (host, error), n in self.http_errors.items()])
+        histogram("akari_event_loop_lag_seconds", "Event loop scheduling lag.", [("", self.loop_lag.histogram)])
+        counter("akari_event_loop_blocked_seconds_total", "Time the event loop was blocked past the lag threshold.",
+                [("", self.loop_lag.blocked)])
+        for source, collect in self.collectors.items():
+            for stat, value in collect().items():
+                # Collectors mix running totals and current sizes, so all are exposed as gauges
+                sample(f"akari_{source}_{stat}", f"{stat} reported by {source}.", "gauge", [("", value)])
+        return "\n".join(lines) + "\n"
+
+    def summary(self, top=8):
+        """Short human-readable summary, slowest commands first."""
+        def ms(value):
+            return "-" if value is None else f"{value * 1000:.0f}ms"
+
+        lines = [f"Uptime: {(time.time() - self.started) / 3600:.1f}h"]
+        commands = sorted(self.commands.items(), key=lambda item: item[1].quantile(0.95) or 0, reverse=True)
+        if commands:
+            lines.append("**Commands** (count · p50 · p95 · p99)")
+            for (kind, name), h in commands[:top]:
+                errors = sum(n for (k, c, _), n in self.command_errors.items() if (k, c) == (kind, name))
+                prefix = "!" if kind == "prefix" else "/"
+                lines.append(f"`{prefix}{name}` {h.count} · {ms(h.quantile(0.5))} · {ms(h.quantile(0.95))} · {ms(h.quantile(0.99))}"
+                             + (f" · {errors} errors" if errors else ""))
+        if self.http:
+            lines.append("**Upstreams** (requests · p50 · p95 · errors)")
+            for host, h in sorted(self.http.items()):
+                errors = sum(n for (hst, _), n in self.http_errors.items() if hst == host)
+                lines.append(f"`{host}` {h.count} · {ms(h.quantile(0.5))} · {ms(h.quantile(0.95))} · {errors}")
+        lag = self.loop_lag
+        lines.append(f"**Event loop** max lag {ms(lag.max_lag)} · p99 {ms(lag.histogram.quantile(0.99))} · blocked {lag.blocked:.2f}s")
+        for source, collect in self.collectors.items():
+            lines.append(f"**{source}** " + " · ".join(f"{k} {v}" for k, v in collect().items()))
+        return "\n".join(lines)
+
+    # Lifecycle
+    async def _handle_metrics(self, request):
+        return web.Response(text=self.render(), content_type="text/plain", charset="utf-8")
+
+    async def start(self, host=METRICS_HOST, port=METRICS_PORT):
+        self.loop_lag.start()
+        if not port:
+            return
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle_metrics)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        log.info("Serving metrics on http://%s:%s/metrics", host, port)
+
+    async def close(self):
+        self.loop_lag.stop()
+        if self._runner:
+            await self._runner.cleanup()
+
+
+class MetricsCommandTree(app_commands.CommandTree):
+    """Command tree that times every app command and counts its failures."""
+
+    async def interaction_check(self, interaction):
+        interaction.extras["started"] = time.perf_counter()
+        return True
+
+    async def on_error(self, interaction, error):
+        started = interaction.extras.get("started")
+        if started is not None and interaction.command is not None:
+            error_type = type(getattr(error, "original", error)).__name__
+            elapsed = time.perf_counter() - started
+            self.client.metrics.observe_command("app", interaction.command.qualified_name, elapsed, error_type)
+            log_command("app", interaction.command.qualified_name, interaction.guild_id, elapsed, error_type)
+        await super().on_error(interaction, error)
+
+
+def log_command(kind, name, guild_id, seconds, error_type=None):
+    fields = {"kind": kind, "command": name, "guild": guild_id, "latency_ms": round(seconds * 1000, 1)}
+    if error_type is None:
+        command_log.info("Ran %s", name, extra=fields)
+    else:
+        command_log.warning("%s failed with %s", name, error_type, extra={**fields, "error": error_type})
+
+
+def instrument(bot):
+    """Registers the prefix/app command timing hooks. Use together with tree_cls=MetricsCommandTree."""
+
+    @bot.before_invoke
+    async def start_command_timer(ctx):
+        ctx.command_started = time.perf_counter()
+
+    @bot.after_invoke
+    async def record_command(ctx):
+        # After-invoke hooks run even when the command raised
+        error_type = "failed" if ctx.command_failed else None
+        elapsed = time.perf_counter() - ctx.command_started
+        bot.metrics.observe_command("prefix", ctx.command.qualified_name, elapsed, error_type)
+        log_command("prefix", ctx.command.qualified_name, ctx.guild and ctx.guild.id, elapsed, error_type)
+
+    async def on_app_command_completion(interaction, command):
+        started = interaction.extras.get("started")
+        if started is not None:
+            elapsed = time.perf_counter() - started
+            bot.metrics.observe_command("app", command.qualified_name, elapsed)
+            log_command("app", command.qualified_name, interaction.guild_id, elapsed)
+
+    bot.add_listener(on_app_command_completion)
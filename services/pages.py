@@ -0,0 +1,100 @@
+from datetime import datetime
+import discord
+from services.timeparse import to_utc
+
+PAGE_SIZE = 15  # titles per embed page
+VIEW_TIMEOUT = 300  # seconds the page buttons keep working
+
+SORTS = ("title", "next")
+FILTERS = ("all", "tv", "movie", "scheduled", "unscheduled")
+
+
+def _line(title, entry):
+    if entry.get("type") == "movie":
+        line = f"🎬 **{title}** (Movie)"
+    else:
+        line = f"📺 **{title}** (S{entry.get('current_season', '?')} E{entry.get('current_episode', '?')})"
+    if entry.get("next_session"):
+        line += f" · next {datetime.fromisoformat(entry['next_session']).strftime('%a %d %b %H:%M')}"
+    return line
+
+
+def _matches(entry, show):
+    if show == "tv":
+        return entry.get("type", "tv") == "tv"
+    if show == "movie":
+        return entry.get("type") == "movie"
+    if show == "scheduled":
+        return bool(entry.get("next_session"))
+    if show == "unscheduled":
+        return not entry.get("next_session")
+    return True
+
+
+def _session_key(entry):
+    """Sort key for an entry's next session: unscheduled last, the rest by the actual moment they start."""
+    if not entry.get("next_session"):
+        return (True, 0)
+    # Sessions are stored as naive local times, so an NL 20:00 starts before a UK 19:30
+    return (False, to_utc(datetime.fromisoformat(entry["next_session"]), entry.get("timezone", "UK")))
+
+
+def render_pages(watchlist, sort="title", show="all"):
+    """Renders a guild's watchlist as embed pages. Returns an empty list when nothing matches."""
+    titles = [title for _, title in watchlist.index.by_key if _matches(watchlist.entries[title], show)]
+    if sort == "next":
+        # Soonest session first, unscheduled titles after in alphabetical order (the sort is stable)
+        titles.sort(key=lambda title: _session_key(watchlist.entries[title]))
+    chunks = [titles[i:i + PAGE_SIZE] for i in range(0, len(titles), PAGE_SIZE)]
+    heading = "🎬 Watchlist" if show == "all" else f"🎬 Watchlist ({show})"
+    return [
+        discord.Embed(
+            title=heading,
+            description="\n".join(_line(title, watchlist.entries[title]) for title in chunk),
+        ).set_footer(text=f"Page {number} of {len(chunks)} · {len(titles)} titles")
+        for number, chunk in enumerate(chunks, 1)
+    ]
+
+
+def cached_pages(watchlist, sort="title", show="all"):
+    """Rendered pages for this view of the watchlist, re-rendered only after the watchlist changed."""
+    cached = watchlist.pages.get((sort, show))
+    if cached and cached[0] == watchlist.version:
+        return cached[1]
+    pages = render_pages(watchlist, sort, show)
+    watchlist.pages[(sort, show)] = (watchlist.version, pages)
+    return pages
+
+
+class PageView(discord.ui.View):
+    """Previous/next buttons over a fixed list of embeds, usable by whoever ran the command."""
+
+    def __init__(self, pages, user_id):
+        super().__init__(timeout=VIEW_TIMEOUT)
+        self.pages = pages
+        self.user_id = user_id
+        self.page = 0
+        self._refresh()
+
+    def _refresh(self):
+        self.previous.disabled = self.page == 0
+        self.next.disabled = self.page == len(self.pages) - 1
+
+    async def interaction_check(self, interaction):
+        if interaction.user.id != self.user_id:
+            await interaction.response.send_message("Run /watchlist yourself to browse it.", ephemeral=True)
+            return False
+        return True
+
+    async def _show(self, interaction, page):
+        self.page = page
+        self._refresh()
+        await interaction.response.edit_message(embed=self.pages[page], view=self)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def previous(self, interaction, button):
+        await self._show(interaction, max(self.page - 1, 0))
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next(self, interaction, button):
+        await self._show(interaction, min(self.page + 1, len(self.pages) - 1))
@@ -0,0 +1,171 @@
+import asyncio
+import hashlib
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from services.http import SingleFlight
+
+load_dotenv()
+POSTER_BASE_URL = os.getenv("POSTER_BASE_URL", "https://image.tmdb.org/t/p/w780")
+POSTER_CACHE_DIR = os.getenv("POSTER_CACHE_DIR", "data/posters")
+POSTER_CACHE_MAX_BYTES = int(os.getenv("POSTER_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+POSTER_WORKERS = int(os.getenv("POSTER_WORKERS", 2))
+# Discord event cover images: keep them small enough to upload quickly
+POSTER_MAX_SIZE = (800, 1200)
+POSTER_MAX_BYTES = int(os.getenv("POSTER_MAX_BYTES", 2 * 1024 * 1024))
+POSTER_MAX_DOWNLOAD = 10 * 1024 * 1024
+
+SUPPORTED_FORMATS = {"jpeg", "png", "webp", "gif"}
+
+
+def detect_format(header):
+    """Returns the image format from the first bytes of a file, or None if unknown."""
+    if header.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if header.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "webp"
+    if header[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    return None
+
+
+def prepare_poster(data):
+    """Decodes, shrinks and re-encodes a poster as JPEG within POSTER_MAX_BYTES. Runs in a worker."""
+    from PIL import Image
+
+    with Image.open(io.BytesIO(data)) as image:
+        image = image.convert("RGB")
+        image.thumbnail(POSTER_MAX_SIZE)
+        quality = 90
+        while True:
+            out = io.BytesIO()
+            image.save(out, format="JPEG", quality=quality, optimize=True)
+            if out.tell() <= POSTER_MAX_BYTES or quality <= 40:
+                return out.getvalue()
+            quality -= 10
+
+
+class PosterService:
+    def __init__(self, session, cache_dir=POSTER_CACHE_DIR, max_bytes=POSTER_CACHE_MAX_BYTES):
+        self.session = session
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.executor = ThreadPoolExecutor(max_workers=POSTER_WORKERS, thread_name_prefix="poster")
+        self.sizes = None  # cache file name -> size, built on first use
+        self.lock = threading.Lock()  # guards sizes; every change to it happens on a worker, under this lock
+        self.hits = 0
+        self.misses = 0
+        self.flights = SingleFlight()  # concurrent schedules of the same title share one download
+
+    def _file(self, poster_path):
+        return hashlib.sha256(poster_path.encode()).hexdigest() + ".jpg"
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    # Disk cache (always called from the executor)
+    def _scan(self):
+        with self.lock:
+            if self.sizes is not None:
+                return  # another first request got here first
+            os.makedirs(self.cache_dir, exist_ok=True)
+            sizes = {}
+            for entry in os.scandir(self.cache_dir):
+                if entry.is_file() and entry.name.endswith(".jpg"):
+                    sizes[entry.name] = entry.stat().st_size
+            self.sizes = sizes
+
+    def _read(self, name):
+        path = os.path.join(self.cache_dir, name)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            with self.lock:
+                self.sizes.pop(name, None)  # removed by another process
+            return None
+        os.utime(path)  # mtime doubles as last-used time for eviction
+        return data
+
+    def _write(self, name, data):
+        path = os.path.join(self.cache_dir, name)
+        tmp = f"{path}.{os.getpid()}.tmp"  # cluster processes share the directory
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        with self.lock:
+            self.sizes[name] = len(data)
+            self._evict()
+
+    def _evict(self):
+        total = sum(self.sizes.values())
+        if total <= self.max_bytes:
+            return
+        by_age = []
+        for name in self.sizes:
+            try:
+                by_age.append((os.path.getmtime(os.path.join(self.cache_dir, name)), name))
+            except FileNotFoundError:
+                by_age.append((0, name))
+        for _, name in sorted(by_age):
+            if total <= self.max_bytes:
+                break
+            total -= self.sizes.pop(name)
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+
+    # Download
+    async def _download(self, poster_path):
+        async with self.session.get(f"{POSTER_BASE_URL}{poster_path}") as response:
+            if response.status != 200:
+                raise ValueError(f"Failed to fetch image: {poster_path}")
+            if (response.content_length or 0) > POSTER_MAX_DOWNLOAD:
+                raise ValueError(f"Image too large: {poster_path}")
+            try:
+                header = await response.content.readexactly(12)
+            except asyncio.IncompleteReadError:
+                raise ValueError(f"Truncated image: {poster_path}")
+            image_format = detect_format(header)
+            if image_format not in SUPPORTED_FORMATS:
+                raise ValueError(f"Unsupported image format: {image_format}")
+            # Content-Length may be missing (chunked) or wrong, so cap what is actually read as well
+            chunks, size = [header], len(header)
+            async for chunk in response.content.iter_chunked(64 * 1024):
+                size += len(chunk)
+                if size > POSTER_MAX_DOWNLOAD:
+                    raise ValueError(f"Image too large: {poster_path}")
+                chunks.append(chunk)
+            return b"".join(chunks)
+
+    async def get(self, poster_path):
+        """Returns event-ready image bytes for a TMDB poster_path, from disk when we have it."""
+        return await self.flights.run(poster_path, self._get, poster_path)
+
+    async def _get(self, poster_path):
+        if self.sizes is None:
+            await self._run(self._scan)
+
+        name = self._file(poster_path)
+        if name in self.sizes:
+            data = await self._run(self._read, name)
+            if data is not None:
+                self.hits += 1
+                return data
+
+        self.misses += 1
+        raw = await self._download(poster_path)
+        data = await self._run(prepare_poster, raw)
+        await self._run(self._write, name, data)
+        return data
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "coalesced": self.flights.coalesced, "files": len(self.sizes or ())}
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
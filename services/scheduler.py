@@ -0,0 +1,105 @@
+import asyncio
+import heapq
+import itertools
+import time
+from services.logs import get_logger
+
+log = get_logger("scheduler")
+MAX_SLEEP = 3600  # re-check the wall clock at least this often (seconds)
+
+
+class SessionScheduler:
+    """Fires pre-session reminders from a single task that sleeps until the earliest deadline.
+
+    Deadlines live in one min-heap shared by every guild. Every (re)plan gets a new generation, so
+    entries of rescheduled or cancelled sessions are dropped lazily when they reach the top, and the
+    heap is compacted if they pile up.
+    """
+
+    def __init__(self, callback):
+        self.callback = callback  # async callback(guild_id, title, minutes_before)
+        self.heap = []  # (fire_at, seq, guild_id, title, generation, minutes_before)
+        self.sessions = {}  # (guild_id, title) -> [generation, reminders left]
+        self.live = 0  # heap entries that still belong to a current session
+        self._seq = itertools.count()
+        self._generations = itertools.count()
+        self._wake = asyncio.Event()
+        self._task = None
+        self._firing = set()
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self):
+        if self._task:
+            self._task.cancel()
+        for task in self._firing:
+            task.cancel()
+
+    def schedule(self, guild_id, title, start, offsets):
+        """(Re)plans reminders `offsets` minutes before `start` (a UNIX timestamp). Past ones are skipped."""
+        self.cancel(guild_id, title)
+        now = time.time()
+        fires = [(start - minutes * 60, minutes) for minutes in offsets if start - minutes * 60 > now]
+        if not fires:
+            return
+        earliest = self.heap[0][0] if self.heap else float("inf")
+        generation = next(self._generations)
+        self.sessions[(guild_id, title)] = [generation, len(fires)]
+        for fire_at, minutes in fires:
+            heapq.heappush(self.heap, (fire_at, next(self._seq), guild_id, title, generation, minutes))
+        self.live += len(fires)
+        if min(fire_at for fire_at, _ in fires) < earliest:
+            self._wake.set()
+        if len(self.heap) > 2 * self.live + 64:
+            self._compact()
+
+    def cancel(self, guild_id, title):
+        session = self.sessions.pop((guild_id, title), None)
+        if session:
+            self.live -= session[1]
+
+    def _compact(self):
+        self.heap = [item for item in self.heap if self._current(item)]
+        heapq.heapify(self.heap)
+
+    def _current(self, item):
+        session = self.sessions.get((item[2], item[3]))
+        return session is not None and session[0] == item[4]
+
+    async def _run(self):
+        while True:
+            self._wake.clear()
+            if not self.heap:
+                await self._wake.wait()
+                continue
+            delay = self.heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), timeout=min(delay, MAX_SLEEP))
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            item = heapq.heappop(self.heap)
+            if not self._current(item):
+                continue  # rescheduled or cancelled since
+            _, _, guild_id, title, _, minutes = item
+            session = self.sessions[(guild_id, title)]
+            session[1] -= 1
+            self.live -= 1
+            if not session[1]:
+                del self.sessions[(guild_id, title)]
+            # A slow send mustn't hold up the deadlines behind it
+            task = asyncio.create_task(self._fire(guild_id, title, minutes))
+            self._firing.add(task)
+            task.add_done_callback(self._firing.discard)
+
+    async def _fire(self, guild_id, title, minutes):
+        try:
+            await self.callback(guild_id, title, minutes)
+        except Exception as e:
+            log.warning("Reminder for '%s' failed: %s", title, e, extra={"guild": guild_id})
+
+    def __len__(self):
+        return len(self.sessions)
@@ -0,0 +1,137 @@
+import asyncio
+import os
+import sqlite3
+from collections import OrderedDict
+from dotenv import load_dotenv
+from services.http import UpstreamUnavailable
+from services.logs import get_logger
+
+load_dotenv()
+log = get_logger("seasons")
+SEASON_MAX_AGE = float(os.getenv("SEASON_MAX_AGE", 7 * 86400))  # seconds before a finished season is refetched
+SEASON_AIRING_MAX_AGE = float(os.getenv("SEASON_AIRING_MAX_AGE", 86400))  # same for a show's latest season
+SEASON_REFRESH_INTERVAL = float(os.getenv("SEASON_REFRESH_INTERVAL", 3600))
+SEASON_REFRESH_BATCH = 50  # seasons refreshed per pass
+SEASON_REFRESH_CONCURRENCY = 4
+SEASON_MEMORY_SIZE = 512  # snapshots kept in memory in front of the database
+
+
+class Season:
+    """One season's episode table. Built from the compact snapshot stored in SQLite."""
+
+    def __init__(self, data):
+        self.seasons = data["seasons"]  # seasons the show has in total
+        self.runtime = data["runtime"]  # typical episode runtime, or None
+        self.episodes = {number: (runtime, overview) for number, runtime, overview in data["episodes"]}
+
+    def __len__(self):
+        return len(self.episodes)
+
+    def episode(self, number):
+        """(runtime, overview) for an episode, either of which may be None, or None if it isn't listed."""
+        return self.episodes.get(number)
+
+
+def snapshot(details, season):
+    """Reduces a TMDB tv/{id}?append_to_response=season/N response to what scheduling needs."""
+    run_times = details.get("episode_run_time") or []
+    return {
+        "seasons": details.get("number_of_seasons") or season,
+        "runtime": run_times[0] if run_times else None,
+        "episodes": [
+            [ep.get("episode_number"), ep.get("runtime"), ep.get("overview") or None]
+            for ep in (details.get(f"season/{season}") or {}).get("episodes") or []
+        ],
+    }
+
+
+class SeasonCatalog:
+    """Season episode tables served locally, fetched from TMDB once and refreshed in the background."""
+
+    def __init__(self, tmdb, store):
+        self.tmdb = tmdb
+        self.store = store
+        self.memory = OrderedDict()  # (tmdb_id, season) -> Season
+        self.fetched = 0
+        self._refresh_task = None
+        self._prefetches = set()
+
+    async def start(self, refresh=True):
+        """`refresh=False` serves and fetches seasons without the background refresh, which one cluster runs for all."""
+        await self.store.setup()
+        if refresh:
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    def close(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+        for task in self._prefetches:
+            task.cancel()
+
+    def _remember(self, key, season):
+        self.memory[key] = season
+        self.memory.move_to_end(key)
+        while len(self.memory) > SEASON_MEMORY_SIZE:
+            self.memory.popitem(last=False)
+
+    async def fetch(self, tmdb_id, season):
+        """Refetches a season from TMDB and stores its snapshot. Returns None if TMDB doesn't have it."""
+        details = await self.tmdb.details("tv", tmdb_id, season)
+        if not details:
+            return None
+        data = snapshot(details, season)
+        await self.store.put(tmdb_id, season, data)
+        self.fetched += 1
+        result = Season(data)
+        self._remember((tmdb_id, season), result)
+        return result
+
+    async def get(self, tmdb_id, season):
+        """A season's episode table, from memory or the database; TMDB is only asked the first time."""
+        key = (tmdb_id, season)
+        result = self.memory.get(key)
+        if result is not None:
+            self.memory.move_to_end(key)
+            return result
+        data = await self.store.get(tmdb_id, season)
+        if data is None:
+            return await self.fetch(tmdb_id, season)
+        result = Season(data)
+        self._remember(key, result)
+        return result
+
+    def prefetch(self, tmdb_id, season):
+        """Loads a season in the background, e.g. right after a show is added."""
+        task = asyncio.create_task(self._prefetch(tmdb_id, season))
+        self._prefetches.add(task)
+        task.add_done_callback(self._prefetches.discard)
+
+    async def _prefetch(self, tmdb_id, season):
+        try:
+            await self.get(tmdb_id, season)
+        except (UpstreamUnavailable, sqlite3.Error) as e:
+            log.warning("Failed to prefetch season %s of TMDB show %s: %s", season, tmdb_id, e)
+
+    async def refresh(self):
+        stale = await self.store.stale(SEASON_MAX_AGE, SEASON_AIRING_MAX_AGE, SEASON_REFRESH_BATCH)
+        limit = asyncio.Semaphore(SEASON_REFRESH_CONCURRENCY)
+
+        async def refresh_one(tmdb_id, season):
+            async with limit:
+                await self.fetch(tmdb_id, season)
+
+        results = await asyncio.gather(*(refresh_one(*key) for key in stale), return_exceptions=True)
+        failed = [r for r in results if isinstance(r, Exception)]
+        if failed:
+            log.warning("%d of %d season refreshes failed: %s", len(failed), len(stale), failed[0])
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(SEASON_REFRESH_INTERVAL)
+            try:
+                await self.refresh()
+            except sqlite3.Error as e:
+                log.warning("Season refresh failed: %s", e)
+
+    def stats(self):
+        return {"in_memory": len(self.memory), "fetched": self.fetched}
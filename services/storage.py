@@ -0,0 +1,437 @@
+import asyncio
+import json
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dotenv import load_dotenv
+from services.logs import get_logger
+
+load_dotenv()
+log = get_logger("storage")
+DATABASE_FILE = os.getenv("DATABASE_FILE", "data/akari.db")
+LEGACY_WATCHLIST_FILE = os.getenv("LEGACY_WATCHLIST_FILE", "data/watchlist.json")
+LEGACY_GUILD_ID = int(os.getenv("LEGACY_GUILD_ID", 0))  # guild that inherits the pre-partition watchlist
+STORE_FLUSH_DELAY = float(os.getenv("STORE_FLUSH_DELAY", 2))  # seconds to batch writes
+STORE_COMPACT_INTERVAL = float(os.getenv("STORE_COMPACT_INTERVAL", 3600))
+STORE_BUSY_TIMEOUT = float(os.getenv("STORE_BUSY_TIMEOUT", 30))  # seconds to wait on another process's write lock
+WELCOME_TTL = float(os.getenv("WELCOME_TTL", 30 * 86400))  # seconds a welcome message stays deletable
+WELCOME_MAX_TRACKED = int(os.getenv("WELCOME_MAX_TRACKED", 50000))
+
+
+class Database:
+    """SQLite database in WAL mode. All queries run on one dedicated worker thread."""
+
+    def __init__(self, path=DATABASE_FILE):
+        self.path = path
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="db")
+        self.conn = None
+        self._compact_task = None
+
+    def _connect(self):
+        if os.path.dirname(self.path):
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        conn = sqlite3.connect(self.path, timeout=STORE_BUSY_TIMEOUT, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")  # only takes effect on a new file
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    async def open(self):
+        loop = asyncio.get_running_loop()
+        self.conn = await loop.run_in_executor(self.executor, self._connect)
+        self._compact_task = asyncio.create_task(self._compact_loop())
+
+    async def run(self, func, *args):
+        """Runs func(conn, *args) on the database thread."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, func, self.conn, *args)
+
+    def _compact(self, conn):
+        # With several cluster processes attached this may not truncate fully, which is harmless
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("PRAGMA incremental_vacuum")
+
+    async def _compact_loop(self):
+        while True:
+            await asyncio.sleep(STORE_COMPACT_INTERVAL)
+            try:
+                await self.run(self._compact)
+            except sqlite3.Error as e:
+                log.warning("Database compaction failed: %s", e)
+
+    async def close(self):
+        if self._compact_task:
+            self._compact_task.cancel()
+        if self.conn:
+            await self.run(self._compact)
+            await self.run(lambda conn: conn.close())
+            self.conn = None
+        self.executor.shutdown(wait=True)
+
+
+class WatchlistStore:
+    """Persists watchlist entries row-by-row per guild. Writes are queued and flushed in batches off the event loop."""
+
+    def __init__(self, db):
+        self.db = db
+        self.pending = {}  # (guild_id, title) -> serialised entry, or None to delete
+        self.pending_settings = {}  # guild_id -> serialised settings
+        self.legacy_guild = LEGACY_GUILD_ID or None  # guild that gets the legacy (guild 0) entries, if known
+        self._flush_task = None
+
+    def _setup(self, conn):
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS watchlists ("
+            "guild_id INTEGER NOT NULL, title TEXT NOT NULL, data TEXT NOT NULL, "
+            "PRIMARY KEY (guild_id, title))"
+        )
+        conn.execute("CREATE TABLE IF NOT EXISTS guild_settings (guild_id INTEGER PRIMARY KEY, data TEXT NOT NULL)")
+
+        # Older single-list layouts are imported as guild 0 until a guild claims them
+        legacy_table = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'watchlist'").fetchone()
+        if legacy_table:
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute("INSERT OR IGNORE INTO watchlists (guild_id, title, data) SELECT 0, title, data FROM watchlist")
+                conn.execute("DROP TABLE watchlist")
+
+        empty = conn.execute("SELECT 1 FROM watchlists LIMIT 1").fetchone() is None
+        if empty and os.path.exists(LEGACY_WATCHLIST_FILE):
+            # One-off import of the old whole-file JSON watchlist
+            with open(LEGACY_WATCHLIST_FILE, "r") as f:
+                legacy = json.load(f)
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(
+                    "INSERT OR REPLACE INTO watchlists (guild_id, title, data) VALUES (0, ?, ?)",
+                    [(title, json.dumps(entry)) for title, entry in legacy.items()],
+                )
+            os.replace(LEGACY_WATCHLIST_FILE, f"{LEGACY_WATCHLIST_FILE}.migrated")
+            log.info("Migrated %d watchlist entries from %s", len(legacy), LEGACY_WATCHLIST_FILE)
+
+        unclaimed = conn.execute("SELECT COUNT(*) FROM watchlists WHERE guild_id = 0").fetchone()[0]
+        if unclaimed and not self.legacy_guild:
+            log.warning("%d legacy watchlist entries belong to no guild yet; set LEGACY_GUILD_ID to assign them",
+                        unclaimed)
+
+    def _claim_legacy(self, conn, guild_id):
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            claimed = conn.execute(
+                "UPDATE OR IGNORE watchlists SET guild_id = ? WHERE guild_id = 0", (guild_id,)
+            ).rowcount
+        if claimed:
+            log.info("Assigned %d legacy watchlist entries", claimed, extra={"guild": guild_id})
+        return claimed
+
+    def _load(self, conn, guild_id, legacy_guild):
+        if guild_id == legacy_guild:
+            self._claim_legacy(conn, guild_id)
+        entries = {
+            title: json.loads(data)
+            for title, data in conn.execute("SELECT title, data FROM watchlists WHERE guild_id = ?", (guild_id,))
+        }
+        row = conn.execute("SELECT data FROM guild_settings WHERE guild_id = ?", (guild_id,)).fetchone()
+        return entries, json.loads(row[0]) if row else {}
+
+    def _write(self, conn, batch, settings):
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT OR REPLACE INTO watchlists (guild_id, title, data) VALUES (?, ?, ?)",
+                [(guild_id, title, data) for (guild_id, title), data in batch.items() if data is not None],
+            )
+            conn.executemany(
+                "DELETE FROM watchlists WHERE guild_id = ? AND title = ?",
+                [key for key, data in batch.items() if data is None],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO guild_settings (guild_id, data) VALUES (?, ?)",
+                list(settings.items()),
+            )
+
+    def _scheduled(self, conn):
+        rows = conn.execute(
+            "SELECT w.guild_id, w.title, w.data, s.data FROM watchlists w "
+            "LEFT JOIN guild_settings s ON s.guild_id = w.guild_id "
+            "WHERE w.guild_id != 0 AND json_extract(w.data, '$.next_session') IS NOT NULL"
+        ).fetchall()
+        return [(guild_id, title, json.loads(data), json.loads(settings) if settings else {})
+                for guild_id, title, data, settings in rows]
+
+    async def setup(self):
+        await self.db.run(self._setup)
+
+    async def scheduled(self):
+        """Returns (guild_id, title, entry, guild settings) for every entry with a next_session, across all guilds."""
+        await self.flush()
+        return await self.db.run(self._scheduled)
+
+    async def claim_legacy(self, guild_id):
+        """Gives the legacy (guild 0) entries to a guild from now on. Returns how many were moved."""
+        self.legacy_guild = guild_id
+        return await self.db.run(self._claim_legacy, guild_id)
+
+    async def load(self, guild_id):
+        """Returns (entries, settings) for a guild, including writes that are still queued."""
+        entries, settings = await self.db.run(self._load, guild_id, self.legacy_guild)
+        for (pending_guild, title), data in list(self.pending.items()):
+            if pending_guild != guild_id:
+                continue
+            if data is None:
+                entries.pop(title, None)
+            else:
+                entries[title] = json.loads(data)
+        if guild_id in self.pending_settings:
+            settings = json.loads(self.pending_settings[guild_id])
+        return entries, settings
+
+    def put(self, guild_id, title, entry):
+        self.pending[(guild_id, title)] = json.dumps(entry)
+        self._schedule_flush()
+
+    def delete(self, guild_id, title):
+        self.pending[(guild_id, title)] = None
+        self._schedule_flush()
+
+    def put_settings(self, guild_id, settings):
+        self.pending_settings[guild_id] = json.dumps(settings)
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._delayed_flush())
+
+    async def _delayed_flush(self):
+        await asyncio.sleep(STORE_FLUSH_DELAY)
+        await self.flush()
+
+    async def flush(self):
+        while self.pending or self.pending_settings:
+            batch, self.pending = self.pending, {}
+            settings, self.pending_settings = self.pending_settings, {}
+            try:
+                await self.db.run(self._write, batch, settings)
+            except sqlite3.Error as e:
+                # Keep the batch (unless newer writes replaced it) and retry on the next flush
+                log.warning("Failed to save watchlist: %s", e)
+                self.pending = {**batch, **self.pending}
+                self.pending_settings = {**settings, **self.pending_settings}
+                return
+
+    async def close(self):
+        if self._flush_task and not self._flush_task.done():
+            self._flush_task.cancel()
+        await self.flush()
+
+
+class WelcomeStore:
+    """Remembers which message welcomed which member, so it can be deleted when they leave.
+
+    Rows expire after WELCOME_TTL and the table is capped at WELCOME_MAX_TRACKED, oldest first.
+    Several members can share one (combined) welcome message.
+    """
+
+    def __init__(self, db, ttl=WELCOME_TTL, max_rows=WELCOME_MAX_TRACKED):
+        self.db = db
+        self.ttl = ttl
+        self.max_rows = max_rows
+
+    def _setup(self, conn):
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS welcome_messages ("
+            "guild_id INTEGER NOT NULL, member_id INTEGER NOT NULL, channel_id INTEGER NOT NULL, "
+            "message_id INTEGER NOT NULL, created_at REAL NOT NULL, PRIMARY KEY (guild_id, member_id))"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS welcome_messages_message ON welcome_messages (message_id)")
+        conn.execute("CREATE INDEX IF NOT EXISTS welcome_messages_created ON welcome_messages (created_at)")
+
+    def _add(self, conn, guild_id, member_ids, channel_id, message_id, now):
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT OR REPLACE INTO welcome_messages (guild_id, member_id, channel_id, message_id, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(guild_id, member_id, channel_id, message_id, now) for member_id in member_ids],
+            )
+
+    def _pop(self, conn, guild_id, member_id, now):
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT channel_id, message_id, created_at FROM welcome_messages WHERE guild_id = ? AND member_id = ?",
+                (guild_id, member_id),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("DELETE FROM welcome_messages WHERE guild_id = ? AND member_id = ?", (guild_id, member_id))
+            channel_id, message_id, created_at = row
+            if created_at < now - self.ttl:
+                return None
+            shared = conn.execute("SELECT COUNT(*) FROM welcome_messages WHERE message_id = ?", (message_id,)).fetchone()[0]
+        return channel_id, message_id, shared
+
+    def _prune(self, conn, now):
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute("DELETE FROM welcome_messages WHERE created_at < ?", (now - self.ttl,))
+            conn.execute(
+                "DELETE FROM welcome_messages WHERE rowid IN "
+                "(SELECT rowid FROM welcome_messages ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_rows,),
+            )
+
+    async def setup(self):
+        await self.db.run(self._setup)
+
+    async def add(self, guild_id, member_ids, channel_id, message_id):
+        await self.db.run(self._add, guild_id, member_ids, channel_id, message_id, time.time())
+
+    async def pop(self, guild_id, member_id):
+        """Forgets a member's welcome. Returns (channel_id, message_id, members still sharing it) or None."""
+        return await self.db.run(self._pop, guild_id, member_id, time.time())
+
+    async def prune(self):
+        await self.db.run(self._prune, time.time())
+
+
+class SeasonStore:
+    """Compact per-season episode tables (runtimes, overviews, counts) keyed by TMDB show id."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def _setup(self, conn):
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS seasons ("
+            "tmdb_id INTEGER NOT NULL, season INTEGER NOT NULL, data TEXT NOT NULL, fetched_at REAL NOT NULL, "
+            "PRIMARY KEY (tmdb_id, season))"
+        )
+
+    def _get(self, conn, tmdb_id, season):
+        row = conn.execute("SELECT data FROM seasons WHERE tmdb_id = ? AND season = ?", (tmdb_id, season)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _put(self, conn, tmdb_id, season, data, now):
+        conn.execute(
+            "INSERT OR REPLACE INTO seasons (tmdb_id, season, data, fetched_at) VALUES (?, ?, ?, ?)",
+            (tmdb_id, season, json.dumps(data, separators=(",", ":")), now),
+        )
+
+    def _stale(self, conn, before, airing_before, limit):
+        # The latest season of a show may still be airing, so it goes stale sooner
+        return conn.execute(
+            "SELECT tmdb_id, season FROM seasons "
+            "WHERE fetched_at < ? OR (fetched_at < ? AND season >= json_extract(data, '$.seasons')) "
+            "ORDER BY fetched_at LIMIT ?",
+            (before, airing_before, limit),
+        ).fetchall()
+
+    async def setup(self):
+        await self.db.run(self._setup)
+
+    async def get(self, tmdb_id, season):
+        return await self.db.run(self._get, tmdb_id, season)
+
+    async def put(self, tmdb_id, season, data):
+        await self.db.run(self._put, tmdb_id, season, data, time.time())
+
+    async def stale(self, max_age, airing_max_age, limit):
+        """(tmdb_id, season) pairs due a refresh, oldest first."""
+        now = time.time()
+        return await self.db.run(self._stale, now - max_age, now - airing_max_age, limit)
+
+
+class TMDBCacheStore:
+    """TMDB responses kept between restarts, one row per request, shared by every cluster process."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def _setup(self, conn):
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS tmdb_cache ("
+            "key TEXT PRIMARY KEY, data TEXT NOT NULL, expires REAL NOT NULL, etag TEXT, last_modified TEXT, "
+            "used_at REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS tmdb_cache_used_at ON tmdb_cache (used_at)")
+
+    def _load(self, conn, limit):
+        rows = conn.execute(
+            "SELECT key, data, expires, etag, last_modified FROM tmdb_cache ORDER BY used_at DESC LIMIT ?", (limit,)
+        ).fetchall()
+        # Oldest first, so the caller can append them to its LRU in order
+        return [(key, {"data": json.loads(data), "expires": expires, "etag": etag, "last_modified": last_modified})
+                for key, data, expires, etag, last_modified in reversed(rows)]
+
+    def _write(self, conn, rows, keep):
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT OR REPLACE INTO tmdb_cache (key, data, expires, etag, last_modified, used_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            # Keep only as many as one process holds in memory; the least recently saved go first
+            conn.execute(
+                "DELETE FROM tmdb_cache WHERE key IN "
+                "(SELECT key FROM tmdb_cache ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (keep,),
+            )
+
+    async def setup(self):
+        await self.db.run(self._setup)
+
+    async def load(self, limit):
+        """The `limit` most recently used (key, entry) pairs, oldest first."""
+        return await self.db.run(self._load, limit)
+
+    async def put_many(self, entries, keep):
+        """Writes changed (key, entry) pairs in one transaction and trims the table to `keep` rows."""
+        now = time.time()
+        rows = [(key, json.dumps(entry["data"], separators=(",", ":")), entry["expires"], entry.get("etag"),
+                 entry.get("last_modified"), now) for key, entry in entries]
+        await self.db.run(self._write, rows, keep)
+
+
+class ClusterStore:
+    """Latest heartbeat of every cluster process, shared through the database so any process can report on all."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def _setup(self, conn):
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS clusters ("
+            "cluster_id INTEGER PRIMARY KEY, pid INTEGER NOT NULL, shards TEXT NOT NULL, status TEXT NOT NULL, "
+            "guilds INTEGER NOT NULL, latency_ms REAL, started_at REAL NOT NULL, updated_at REAL NOT NULL)"
+        )
+
+    def _beat(self, conn, row):
+        conn.execute(
+            "INSERT OR REPLACE INTO clusters (cluster_id, pid, shards, status, guilds, latency_ms, started_at, updated_at) "
+            "VALUES (:cluster_id, :pid, :shards, :status, :guilds, :latency_ms, :started_at, :updated_at)",
+            row,
+        )
+
+    def _all(self, conn):
+        cursor = conn.execute("SELECT * FROM clusters ORDER BY cluster_id")
+        names = [column[0] for column in cursor.description]
+        return [dict(zip(names, row)) for row in cursor.fetchall()]
+
+    async def setup(self):
+        await self.db.run(self._setup)
+
+    async def beat(self, cluster_id, pid, shards, status, guilds, latency_ms, started_at):
+        await self.db.run(self._beat, {
+            "cluster_id": cluster_id, "pid": pid, "shards": json.dumps(shards), "status": status,
+            "guilds": guilds, "latency_ms": latency_ms, "started_at": started_at, "updated_at": time.time(),
+        })
+
+    async def all(self):
+        """Every cluster's last heartbeat as a dict, `shards` decoded back to a list."""
+        rows = await self.db.run(self._all)
+        for row in rows:
+            row["shards"] = json.loads(row["shards"])
+        return rows
@@ -1,28 +1,129 @@
-import aiohttp
+import asyncio
 import os
+from collections import OrderedDict
 from dotenv import load_dotenv
+from services.http import Upstream, UpstreamUnavailable
 import random
+from services.logs import get_logger
 
 load_dotenv()
+log = get_logger("upstream.tenor")
 TENOR_API_KEY = os.getenv("TENOR_API_KEY")
+TENOR_API_URL = os.getenv("TENOR_API_URL", "https://tenor.googleapis.com/v2")
+TENOR_PAGE_SIZE = int(os.getenv("TENOR_PAGE_SIZE", 50))  # Tenor caps a page at 50
+TENOR_REFILL_AT = int(os.getenv("TENOR_REFILL_AT", 10))  # refill when fewer unseen GIFs remain
+TENOR_POOL_MAX = int(os.getenv("TENOR_POOL_MAX", 300))  # GIFs kept per query
+TENOR_MAX_POOLS = int(os.getenv("TENOR_MAX_POOLS", 200))  # queries kept in memory
+TENOR_RATE_LIMIT = float(os.getenv("TENOR_RATE_LIMIT", 5))  # requests per second, 0 disables
+TENOR_BURST = int(os.getenv("TENOR_BURST", 10))
+TENOR_HOT_QUERIES = [q.strip() for q in os.getenv("TENOR_HOT_QUERIES", "funny").split(",") if q.strip()]
 
-async def fetch_gif(query):
-    if not TENOR_API_KEY:
-        return None
-    
-    url = "https://tenor.googleapis.com/v2/search?"
-    params = {
-        "q": query,
-        "key": TENOR_API_KEY,
-        "limit": 8,
-        "media_filter": "minimal"
-    }
-
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url, params=params) as response:
-            if response.status == 200:
-                data = await response.json()
-                results = data.get("results", [])
-                if results:
-                    return random.choice(results)["media_formats"]["gif"]["url"]
-    return None
+
+class GifPool:
+    def __init__(self):
+        self.unseen = []  # not served yet in this cycle
+        self.seen = []
+        self.pos = None  # Tenor cursor for the next page
+        self.exhausted = False  # no more pages (or pool is full)
+        self.refill = None  # in-flight refill task
+
+    def __len__(self):
+        return len(self.unseen) + len(self.seen)
+
+
+class TenorClient:
+    def __init__(self, session):
+        self.session = session
+        self.upstream = Upstream(session, "Tenor", TENOR_RATE_LIMIT, TENOR_BURST)
+        self.pools = OrderedDict()  # normalised query -> GifPool
+
+    def _pool(self, query):
+        pool = self.pools.get(query)
+        if pool is None:
+            pool = self.pools[query] = GifPool()
+            while len(self.pools) > TENOR_MAX_POOLS:
+                _, old = self.pools.popitem(last=False)
+                if old.refill:
+                    old.refill.cancel()
+        self.pools.move_to_end(query)
+        return pool
+
+    async def _fetch_page(self, query, pos):
+        params = {
+            "q": query,
+            "key": TENOR_API_KEY,
+            "limit": TENOR_PAGE_SIZE,
+            "media_filter": "minimal"
+        }
+        if pos:
+            params["pos"] = pos
+        response = await self.upstream.get(f"{TENOR_API_URL}/search", params=params)
+        if response.status != 200:
+            return None
+        data = response.data
+        urls = [r["media_formats"]["gif"]["url"] for r in data.get("results", []) if "gif" in r.get("media_formats", {})]
+        return urls, data.get("next")
+
+    async def _refill(self, query, pool):
+        try:
+            page = await self._fetch_page(query, pool.pos)
+        except UpstreamUnavailable as e:
+            return e  # handed to whoever is waiting on this refill, if anyone
+        except Exception as e:
+            log.warning("Tenor refill for '%s' failed: %s", query, e)
+            return None
+        if page is None:
+            return None
+        urls, next_pos = page
+        known = set(pool.unseen)
+        known.update(pool.seen)
+        new = [url for url in urls if url not in known]
+        pool.unseen.extend(new[:TENOR_POOL_MAX - len(pool)])
+        pool.pos = next_pos
+        if not next_pos or next_pos == "0" or not new or len(pool) >= TENOR_POOL_MAX:
+            pool.exhausted = True
+
+    def _start_refill(self, query, pool):
+        if pool.refill is None or pool.refill.done():
+            pool.refill = asyncio.create_task(self._refill(query, pool))
+        return pool.refill
+
+    def warm(self, queries=TENOR_HOT_QUERIES):
+        """Starts background fills for the given queries."""
+        if not TENOR_API_KEY:
+            return
+        for query in queries:
+            query = query.strip().lower()
+            self._start_refill(query, self._pool(query))
+
+    async def fetch_gif(self, query):
+        """Returns a random GIF URL for the query, avoiding repeats until the pool is used up.
+
+        Raises UpstreamUnavailable if there is nothing cached to serve and Tenor is down.
+        """
+        if not TENOR_API_KEY:
+            return None
+
+        query = query.strip().lower()
+        pool = self._pool(query)
+        if not pool.unseen and not pool.exhausted:
+            # Shielded: other commands may be waiting on the same refill
+            error = await asyncio.shield(self._start_refill(query, pool))
+            if error and not len(pool):
+                raise error
+        if not pool.unseen:
+            # Everything has been served once, start a new cycle
+            pool.unseen, pool.seen = pool.seen, []
+        if not pool.unseen:
+            return None
+
+        url = pool.unseen.pop(random.randrange(len(pool.unseen)))
+        pool.seen.append(url)
+        if len(pool.unseen) < TENOR_REFILL_AT and not pool.exhausted:
+            self._start_refill(query, pool)
+        return url
+
+    def close(self):
+        for pool in self.pools.values():
+            if pool.refill:
+                pool.refill.cancel()
@@ -0,0 +1,164 @@
+import asyncio
+import importlib
+import re
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone as dt_timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+from services.logs import get_logger
+
+log = get_logger("timeparse")
+TIMEZONES = {
+    "UK": "Europe/London",
+    "NL": "Europe/Amsterdam"
+}
+
+DATEPARSER_LANGUAGES = ["en"]
+FALLBACK_CACHE_SIZE = 512
+
+WEEKDAYS = {
+    "monday": 0, "mon": 0,
+    "tuesday": 1, "tue": 1, "tues": 1,
+    "wednesday": 2, "wed": 2,
+    "thursday": 3, "thu": 3, "thur": 3, "thurs": 3,
+    "friday": 4, "fri": 4,
+    "saturday": 5, "sat": 5,
+    "sunday": 6, "sun": 6,
+}
+
+_DAY = r"(?:(?P<next>next|this)\s+)?(?P<day>today|tonight|tomorrow|tmrw|" + "|".join(sorted(WEEKDAYS, key=len, reverse=True)) + r")"
+_TIME = r"(?P<hour>\d{1,2})(?:[:.](?P<minute>\d{2}))?\s*(?P<ampm>am|pm)?"
+_DAY_TIME = re.compile(rf"^{_DAY}\s+(?:at\s+)?{_TIME}$")
+_TIME_DAY = re.compile(rf"^{_TIME}\s+(?:on\s+)?{_DAY}$")
+_ISO = re.compile(r"^(?P<year>\d{4})-(?P<month>\d{2})-(?P<dom>\d{2})[ t](?P<hour>\d{2}):(?P<minute>\d{2})(?::\d{2})?$")
+# Phrases whose result depends on the current time, not just the day
+_TIME_RELATIVE = re.compile(r"\b(now|ago|in|hours?|hrs?|minutes?|mins?|seconds?|secs?)\b")
+
+_heavy_modules = {}
+_fallback_cache = OrderedDict()  # (text, timezone, reference day) -> naive datetime or None
+
+
+async def import_heavy(name):
+    """Imports a slow-loading dependency on first use, off the event loop."""
+    module = _heavy_modules.get(name)
+    if module is None:
+        module = _heavy_modules[name] = await asyncio.to_thread(importlib.import_module, name)
+    return module
+
+
+def normalize(text):
+    return " ".join(text.lower().replace(",", " ").split())
+
+
+@lru_cache(maxsize=1024)
+def fast_spec(text):
+    """Parses common phrasings into a reference-independent spec, or None to fall back to dateparser."""
+    match = _ISO.match(text)
+    if match:
+        return ("date", int(match["year"]), int(match["month"]), int(match["dom"]), int(match["hour"]), int(match["minute"]))
+
+    match = _DAY_TIME.match(text) or _TIME_DAY.match(text)
+    if not match:
+        return None
+    hour = int(match["hour"])
+    minute = int(match["minute"] or 0)
+    ampm = match["ampm"]
+    if ampm:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if ampm == "pm" else 0)
+    elif match["minute"] is None:
+        return None  # a bare "8" is ambiguous, let dateparser decide
+    if hour > 23 or minute > 59:
+        return None
+
+    day = match["day"]
+    if day in WEEKDAYS:
+        return ("weekday", WEEKDAYS[day], hour, minute, match["next"] == "next")
+    if match["next"]:
+        return None  # "next today" and friends
+    if day in ("today", "tonight"):
+        return ("offset", 0, hour, minute)
+    return ("offset", 1, hour, minute)
+
+
+def resolve_spec(spec, now):
+    """Turns a spec into a naive local datetime relative to `now` (naive, local to the timezone)."""
+    kind = spec[0]
+    if kind == "date":
+        _, year, month, dom, hour, minute = spec
+        try:
+            return datetime(year, month, dom, hour, minute)
+        except ValueError:
+            return None
+    if kind == "offset":
+        _, days, hour, minute = spec
+        return datetime.combine(now.date() + timedelta(days=days), datetime.min.time()).replace(hour=hour, minute=minute)
+    _, weekday, hour, minute, skip_today = spec
+    # Next occurrence of that weekday and time, today included if it hasn't passed yet (and not "next ...")
+    candidate = datetime.combine(now.date(), datetime.min.time()).replace(hour=hour, minute=minute)
+    candidate += timedelta(days=(weekday - now.weekday()) % 7)
+    if candidate <= now or (skip_today and candidate.date() == now.date()):
+        candidate += timedelta(days=7)
+    return candidate
+
+
+async def _fallback(text, timezone, now):
+    cacheable = not _TIME_RELATIVE.search(text)
+    key = (text, timezone, now.date())
+    if cacheable and key in _fallback_cache:
+        _fallback_cache.move_to_end(key)
+        return _fallback_cache[key]
+
+    dateparser = await import_heavy("dateparser")
+    # Sessions are always planned ahead, so "Monday 8 p.m." on a Sunday means tomorrow, not last week
+    settings = {"RELATIVE_BASE": now, "RETURN_AS_TIMEZONE_AWARE": False, "PREFER_DATES_FROM": "future"}
+    parsed = await asyncio.to_thread(dateparser.parse, text, languages=DATEPARSER_LANGUAGES, settings=settings)
+
+    if cacheable:
+        _fallback_cache[key] = parsed
+        while len(_fallback_cache) > FALLBACK_CACHE_SIZE:
+            _fallback_cache.popitem(last=False)
+    return parsed
+
+
+async def parse_time(text, timezone):
+    """Parses a user-supplied session time for a timezone code ("UK"/"NL").
+
+    Returns a timezone-aware datetime, or None if the text (or timezone) couldn't be understood.
+    """
+    if timezone.upper() not in TIMEZONES:
+        return None
+    local_tz = zone(timezone)
+    now = datetime.now(local_tz).replace(tzinfo=None)
+
+    text = normalize(text)
+    spec = fast_spec(text)
+    parsed = resolve_spec(spec, now) if spec else await _fallback(text, timezone.upper(), now)
+    if parsed is None:
+        return None
+    return parsed.replace(tzinfo=local_tz)
+
+
+def zone(timezone):
+    """The tzinfo for a timezone code ("UK"/"NL")."""
+    return ZoneInfo(TIMEZONES[timezone.upper()])
+
+
+def localize(moment, timezone):
+    """Converts an aware datetime to naive local time for a timezone code, the way watchlist entries store it."""
+    return moment.astimezone(zone(timezone)).replace(tzinfo=None)
+
+
+def to_utc(naive, timezone):
+    """The inverse of localize(): a naive local time for a timezone code as an aware UTC datetime."""
+    return naive.replace(tzinfo=zone(timezone)).astimezone(dt_timezone.utc)
+
+
+async def warm():
+    """Loads dateparser and its language data in the background so the first fallback isn't slow."""
+    try:
+        dateparser = await import_heavy("dateparser")
+        await asyncio.to_thread(dateparser.parse, "sunday 8pm", languages=DATEPARSER_LANGUAGES)
+    except Exception as e:
+        log.warning("Failed to warm up dateparser: %s", e)
@@ -0,0 +1,162 @@
+import asyncio
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from urllib.parse import urlencode
+from dotenv import load_dotenv
+from services.http import Upstream
+from services.logs import get_logger
+
+load_dotenv()
+log = get_logger("upstream.tmdb")
+TMDB_API_KEY = os.getenv("TMDB_API_KEY")
+TMDB_API_URL = os.getenv("TMDB_API_URL", "https://api.themoviedb.org/3")
+TMDB_CACHE_SIZE = int(os.getenv("TMDB_CACHE_SIZE", 1024))
+TMDB_CACHE_SAVE_DELAY = 30  # seconds to batch new entries before writing them to the database
+TMDB_RATE_LIMIT = float(os.getenv("TMDB_RATE_LIMIT", 20))  # requests per second, 0 disables
+TMDB_BURST = int(os.getenv("TMDB_BURST", 40))
+
+# How long (seconds) a cached response is served before it is revalidated
+TMDB_TTLS = {
+    "search": 6 * 3600,
+    "movie": 24 * 3600,
+    "tv": 12 * 3600,
+    "episode": 24 * 3600,
+}
+
+
+def _endpoint(path):
+    if "/episode/" in path:
+        return "episode"
+    return path.split("/", 1)[0]
+
+
+class TMDBClient:
+    def __init__(self, session, store=None, cache_size=TMDB_CACHE_SIZE):
+        self.session = session
+        self.upstream = Upstream(session, "TMDB", TMDB_RATE_LIMIT, TMDB_BURST)
+        self.store = store  # TMDBCacheStore keeping responses between restarts, or None for memory only
+        self.cache_size = cache_size
+        self.cache = OrderedDict()  # request key -> {"data", "expires", "etag", "last_modified"}
+        self.dirty = set()  # keys changed since the last save
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._save_task = None
+
+    # Cache internals
+    def _remember(self, key, entry):
+        self.cache[key] = entry
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        self._schedule_save(key)
+
+    def _schedule_save(self, key):
+        if not self.store:
+            return
+        self.dirty.add(key)
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.create_task(self._delayed_save())
+
+    async def _delayed_save(self):
+        await asyncio.sleep(TMDB_CACHE_SAVE_DELAY)
+        await self.save()
+
+    async def load(self):
+        if not self.store:
+            return
+        await self.store.setup()
+        for key, entry in await self.store.load(self.cache_size):
+            self.cache[key] = entry
+
+    async def save(self):
+        """Writes only the entries that changed since the last save, one row each."""
+        changed = [(key, self.cache[key]) for key in self.dirty if key in self.cache]
+        self.dirty = set()
+        if not changed:
+            return
+        try:
+            await self.store.put_many(changed, self.cache_size)
+        except sqlite3.Error as e:
+            log.warning("Failed to save TMDB cache: %s", e)
+            self.dirty.update(key for key, _ in changed)  # retried with the next save
+
+    async def close(self):
+        if self._save_task and not self._save_task.done():
+            self._save_task.cancel()
+        await self.save()
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revalidated": self.revalidated,
+            "entries": len(self.cache),
+        }
+
+    # Requests
+    async def get(self, path, **params):
+        """GETs a TMDB endpoint, serving from cache while fresh.
+
+        Returns None on non-200, raises UpstreamUnavailable if TMDB is down or throttling us.
+        """
+        key = f"{path}?{urlencode(sorted(params.items()))}"
+        entry = self.cache.get(key)
+        now = time.time()
+        if entry and entry["expires"] > now:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return entry["data"]
+
+        self.misses += 1
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        ttl = TMDB_TTLS.get(_endpoint(path), 3600)
+        resp = await self.upstream.get(f"{TMDB_API_URL}/{path}", params={**params, "api_key": TMDB_API_KEY}, headers=headers)
+        if resp.status == 304 and entry:
+            # Unchanged upstream, only the freshness window moves
+            self.revalidated += 1
+            entry["expires"] = now + ttl
+            self._remember(key, entry)
+            return entry["data"]
+        if resp.status != 200:
+            return None
+        data = resp.data
+        self._remember(key, {
+            "data": data,
+            "expires": now + ttl,
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+        })
+        return data
+
+    async def search_results(self, kind, query):
+        """Returns the first page of search results for a 'tv' or 'movie' query."""
+        data = await self.get(f"search/{kind}", query=query.strip().lower())
+        return (data or {}).get("results") or []
+
+    async def search(self, kind, query):
+        """Returns the top search result for a 'tv' or 'movie' query, or None."""
+        results = await self.search_results(kind, query)
+        return results[0] if results else None
+
+    async def movie(self, movie_id):
+        return await self.get(f"movie/{movie_id}")
+
+    async def details(self, kind, tmdb_id, season=None):
+        """Movie details, or show details with the given season's episode list appended (one request)."""
+        if kind == "movie":
+            return await self.movie(tmdb_id)
+        if season is None:
+            return await self.get(f"tv/{tmdb_id}")
+        return await self.get(f"tv/{tmdb_id}", append_to_response=f"season/{season}")
+
+    async def episode(self, show_id, season, episode):
+        return await self.get(f"tv/{show_id}/season/{season}/episode/{episode}")
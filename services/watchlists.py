@@ -0,0 +1,101 @@
+import asyncio
+import os
+import time
+from dotenv import load_dotenv
+from services.autocomplete import TitleIndex
+
+load_dotenv()
+WATCHLIST_IDLE_TIMEOUT = float(os.getenv("WATCHLIST_IDLE_TIMEOUT", 1800))  # seconds before an idle guild is dropped
+
+
+class GuildWatchlist:
+    """One guild's watchlist entries and settings, held in memory while the guild is active."""
+
+    def __init__(self, guild_id, entries, settings):
+        self.guild_id = guild_id
+        self.entries = entries  # title -> entry dict
+        self.settings = settings
+        self.index = TitleIndex(entries)
+        self.version = 0  # bumped on every change, invalidates rendered pages
+        self.pages = {}  # (sort, filter) -> (version, rendered embeds)
+        self.last_used = time.monotonic()
+
+    def __contains__(self, title):
+        return title in self.entries
+
+    def __getitem__(self, title):
+        return self.entries[title]
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class WatchlistManager:
+    """Loads guild partitions on first use and evicts them after WATCHLIST_IDLE_TIMEOUT of inactivity."""
+
+    def __init__(self, store, idle_timeout=WATCHLIST_IDLE_TIMEOUT):
+        self.store = store
+        self.idle_timeout = idle_timeout
+        self.partitions = {}  # guild_id -> GuildWatchlist
+        self._loading = {}  # guild_id -> in-flight load task
+        self.on_load = None  # optional coroutine function called with each freshly loaded partition
+        self._evict_task = None
+
+    async def start(self):
+        await self.store.setup()
+        self._evict_task = asyncio.create_task(self._evict_loop())
+
+    async def _load(self, guild_id):
+        entries, settings = await self.store.load(guild_id)
+        partition = self.partitions[guild_id] = GuildWatchlist(guild_id, entries, settings)
+        if self.on_load:
+            await self.on_load(partition)
+        return partition
+
+    async def get(self, guild_id):
+        partition = self.partitions.get(guild_id)
+        if partition is None:
+            # Concurrent first commands in a guild share one load
+            task = self._loading.get(guild_id)
+            if task is None:
+                task = self._loading[guild_id] = asyncio.create_task(self._load(guild_id))
+                task.add_done_callback(lambda _: self._loading.pop(guild_id, None))
+            partition = await asyncio.shield(task)
+        partition.last_used = time.monotonic()
+        return partition
+
+    def save(self, partition, title):
+        # Only this entry is queued; the store batches the actual disk write
+        entry = partition.entries[title]
+        partition.version += 1
+        partition.index.update(title, entry)
+        self.store.put(partition.guild_id, title, entry)
+
+    def save_many(self, partition, titles):
+        """Queues a batch of entries; they reach the database in one transaction with the next flush."""
+        for title in titles:
+            self.save(partition, title)
+
+    def delete(self, partition, title):
+        del partition.entries[title]
+        partition.version += 1
+        partition.index.remove(title)
+        self.store.delete(partition.guild_id, title)
+
+    def save_settings(self, partition):
+        self.store.put_settings(partition.guild_id, partition.settings)
+
+    def evict_idle(self):
+        cutoff = time.monotonic() - self.idle_timeout
+        for guild_id in [g for g, p in self.partitions.items() if p.last_used < cutoff]:
+            del self.partitions[guild_id]
+
+    async def _evict_loop(self):
+        while True:
+            await asyncio.sleep(max(self.idle_timeout / 4, 1))
+            self.evict_idle()
+
+    async def close(self):
+        if self._evict_task:
+            self._evict_task.cancel()
+        await self.store.close()
@@ -0,0 +1,10 @@
+import pytest
+
+from services import storage
+
+
+@pytest.fixture
+def db_path(tmp_path, monkeypatch):
+    """A throwaway database file. Keeps the stores away from the real legacy watchlist in data/."""
+    monkeypatch.setattr(storage, "LEGACY_WATCHLIST_FILE", str(tmp_path / "watchlist.json"))
+    return str(tmp_path / "test.db")
@@ -0,0 +1,47 @@
+from services.autocomplete import TitleIndex, normalize
+
+ENTRIES = {
+    "The Office": {"type": "tv", "next_session": "2026-01-01T20:00:00"},
+    "Office Space": {"type": "movie"},
+    "Lost": {"type": "tv"},
+    "Doctor Who": {"type": "tv"},
+    "Amélie": {"type": "movie"},
+    "Breaking Bad": {"type": "tv"},
+}
+
+
+def test_normalize():
+    assert normalize("  Amélie: Le  Fabuleux!  ") == "amelie le fabuleux"
+
+
+def test_ranking_prefix_word_substring_fuzzy():
+    index = TitleIndex(ENTRIES)
+    assert index.search("office") == ["Office Space", "The Office"]  # title prefix before word prefix
+    assert index.search("ffic") == ["The Office", "Office Space"]  # substrings, shortest first
+    assert index.search("breakng bad") == ["Breaking Bad"]  # typo
+    assert index.search("amelie") == ["Amélie"]
+
+
+def test_short_queries_match_inside_titles():
+    index = TitleIndex(ENTRIES)
+    assert index.search("lo") == ["Lost"]
+    assert index.search("ho") == ["Doctor Who"]
+    assert index.search("ff") == ["The Office", "Office Space"]
+
+
+def test_filters():
+    index = TitleIndex(ENTRIES)
+    assert index.search("office", tv_only=True) == ["The Office"]
+    assert index.search("office", scheduled=False) == ["Office Space"]
+    assert index.search("", scheduled=True) == ["The Office"]
+
+
+def test_incremental_updates():
+    index = TitleIndex(ENTRIES)
+    index.remove("Lost")
+    assert index.search("lost") == []
+    index.update("Lost Girl", {"type": "tv"})
+    assert index.search("lost") == ["Lost Girl"]
+    index.update("Lost Girl", {"type": "tv", "next_session": "2026-01-01T20:00:00"})
+    assert index.search("lost", scheduled=True) == ["Lost Girl"]
+    assert TitleIndex(ENTRIES).search("", limit=2) == ["Amélie", "Breaking Bad"]
@@ -0,0 +1,28 @@
+from types import SimpleNamespace
+
+import pytest
+
+from services.cluster import owns, shard_for, shard_ranges
+
+
+@pytest.mark.parametrize("shards, clusters", [(1, 1), (6, 3), (7, 3), (10, 4), (2, 5), (16, 1)])
+def test_shard_ranges_cover_every_shard_once(shards, clusters):
+    ranges = shard_ranges(shards, clusters)
+    assert [shard for shard_range in ranges for shard in shard_range] == list(range(shards))
+    assert len(ranges) == min(shards, clusters)
+    sizes = [len(shard_range) for shard_range in ranges]
+    assert max(sizes) - min(sizes) <= 1
+    assert sizes == sorted(sizes, reverse=True)
+
+
+def test_shard_for_matches_discord_formula():
+    guild_id = 81384788765712384
+    assert shard_for(guild_id, 1) == 0
+    assert shard_for(guild_id, 4) == (guild_id >> 22) % 4
+
+
+def test_owns():
+    guild_id = 5 << 22
+    assert owns(SimpleNamespace(), guild_id)  # plain commands.Bot, not sharded across processes
+    assert owns(SimpleNamespace(shard_ids=[1, 2], shard_count=4), guild_id)
+    assert not owns(SimpleNamespace(shard_ids=[0, 2], shard_count=4), guild_id)
@@ -0,0 +1,63 @@
+import asyncio
+
+from services.enrichment import DEFAULT_OVERVIEW, DEFAULT_RUNTIME, next_episode, season_plan
+from services.seasons import Season
+
+
+class FakeCatalog:
+    """Season tables keyed by season number, all for one show."""
+
+    def __init__(self, tables, seasons=3):
+        self.tables = tables
+        self.seasons = seasons
+
+    async def get(self, tmdb_id, season):
+        episodes = self.tables.get(season)
+        if episodes is None:
+            return None
+        return Season({"seasons": self.seasons, "runtime": 45, "episodes": episodes})
+
+
+CATALOG = FakeCatalog({
+    1: [[1, 50, "Pilot"], [2, None, "Second"], [3, 42, None]],
+    2: [[1, 60, "Premiere"], [2, 44, "Twist"]],
+    3: [],  # announced, no episodes listed yet
+})
+
+
+def test_next_episode_rolls_into_the_next_season():
+    def after(season, episode, tmdb_id=7):
+        entry = {"tmdb_id": tmdb_id, "current_season": season, "current_episode": episode}
+        return asyncio.run(next_episode(CATALOG, entry))
+
+    assert after(1, 1) == (1, 2)
+    assert after(1, 3) == (2, 1)
+    assert after(2, 2) == (3, 1)
+    assert after(3, 4) == (3, 5)  # unknown episodes keep counting
+    assert after(1, 3, tmdb_id=None) == (1, 4)  # no TMDB match, nothing to roll over by
+
+
+def test_season_plan_crosses_seasons_and_fills_gaps():
+    entry = {"tmdb_id": 7, "current_season": 1, "current_episode": 2}
+    assert asyncio.run(season_plan(CATALOG, entry, 6)) == [
+        (1, 2, 45, "Second"),
+        (1, 3, 42, DEFAULT_OVERVIEW),
+        (2, 1, 60, "Premiere"),
+        (2, 2, 44, "Twist"),
+        (3, 1, 45, DEFAULT_OVERVIEW),
+        (3, 2, 45, DEFAULT_OVERVIEW),
+    ]
+
+
+def test_season_plan_stops_at_the_last_season():
+    catalog = FakeCatalog({1: [[1, 30, "Only"], [2, None, None]]}, seasons=1)
+    entry = {"tmdb_id": 7, "current_season": 1, "current_episode": 1}
+    assert asyncio.run(season_plan(catalog, entry, 5)) == [(1, 1, 30, "Only"), (1, 2, 45, DEFAULT_OVERVIEW)]
+
+
+def test_season_plan_without_season_data_uses_defaults():
+    entry = {"tmdb_id": 7, "current_season": 2, "current_episode": 1}
+    assert asyncio.run(season_plan(FakeCatalog({}), entry, 2)) == [
+        (2, 1, DEFAULT_RUNTIME, DEFAULT_OVERVIEW),
+        (2, 2, DEFAULT_RUNTIME, DEFAULT_OVERVIEW),
+    ]
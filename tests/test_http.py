@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+import pytest
+
+from services.http import SingleFlight, TokenBucket, Upstream, UpstreamUnavailable
+
+
+def test_token_bucket_allows_burst_then_paces():
+    async def main():
+        bucket = TokenBucket(rate=50, burst=3)
+        start = time.monotonic()
+        for _ in range(3):
+            await bucket.acquire()
+        burst = time.monotonic() - start
+        for _ in range(5):
+            await bucket.acquire()
+        return burst, time.monotonic() - start
+
+    burst, total = asyncio.run(main())
+    assert burst < 0.05
+    assert total >= 5 / 50 * 0.9
+
+
+def test_token_bucket_pause_and_disabled():
+    async def main():
+        await TokenBucket(rate=0, burst=0).acquire()  # disabled: never waits
+        bucket = TokenBucket(rate=1000, burst=10)
+        bucket.pause(0.1)
+        start = time.monotonic()
+        await bucket.acquire()
+        return time.monotonic() - start
+
+    assert asyncio.run(main()) >= 0.09
+
+
+def test_breaker_opens_probes_and_closes():
+    upstream = Upstream(None, "TMDB", rate=0, burst=0, breaker_threshold=2, breaker_cooldown=0.05)
+    upstream._record(False)
+    upstream._check_breaker()  # one failure is below the threshold
+    upstream._record(False)
+    with pytest.raises(UpstreamUnavailable):
+        upstream._check_breaker()
+    assert upstream.stats()["circuit_open"] == 1
+
+    time.sleep(0.06)
+    upstream._check_breaker()  # half-open: one probe goes through
+    with pytest.raises(UpstreamUnavailable):
+        upstream._check_breaker()  # ...and only one
+    upstream._record(False)  # failed probe re-opens straight away
+    with pytest.raises(UpstreamUnavailable):
+        upstream._check_breaker()
+
+    time.sleep(0.06)
+    upstream._check_breaker()
+    upstream._record(True)
+    upstream._check_breaker()
+    assert upstream.stats() == {"coalesced": 0, "retried": 0, "rejected": 3, "circuit_open": 0}
+
+
+def test_single_flight_shares_calls_and_survives_cancellation():
+    calls = []
+
+    async def fetch(key):
+        calls.append(key)
+        await asyncio.sleep(0.05)
+        return key.upper()
+
+    async def main():
+        flights = SingleFlight()
+        first = asyncio.create_task(flights.run("a", fetch, "a"))
+        second = asyncio.create_task(flights.run("a", fetch, "a"))
+        other = asyncio.create_task(flights.run("b", fetch, "b"))
+        await asyncio.sleep(0)
+        first.cancel()  # the other caller still gets the result
+        return await second, await other, flights
+
+    second, other, flights = asyncio.run(main())
+    assert (second, other) == ("A", "B")
+    assert calls == ["a", "b"]
+    assert flights.coalesced == 1
+    assert flights.calls == {}
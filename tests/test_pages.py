@@ -0,0 +1,38 @@
+from services.pages import PAGE_SIZE, cached_pages, render_pages
+from services.watchlists import GuildWatchlist
+
+
+def watchlist(entries):
+    return GuildWatchlist(1, entries, {})
+
+
+def titles(pages):
+    return [line.split("**")[1] for page in pages for line in page.description.splitlines()]
+
+
+def test_next_sort_uses_each_sessions_timezone():
+    pages = render_pages(watchlist({
+        "Later UK": {"next_session": "2026-01-01T19:30:00", "timezone": "UK"},
+        "Earlier NL": {"next_session": "2026-01-01T20:00:00", "timezone": "NL"},
+        "Unscheduled": {},
+        "Also unscheduled": {},
+    }), sort="next")
+    assert titles(pages) == ["Earlier NL", "Later UK", "Also unscheduled", "Unscheduled"]
+
+
+def test_filters_and_paging():
+    entries = {f"Show {n:02}": {"type": "tv"} for n in range(PAGE_SIZE + 1)}
+    entries["Film"] = {"type": "movie"}
+    pages = render_pages(watchlist(entries), show="tv")
+    assert len(pages) == 2
+    assert titles(pages) == sorted(title for title in entries if title != "Film")
+    assert pages[1].footer.text == f"Page 2 of 2 · {PAGE_SIZE + 1} titles"
+    assert render_pages(watchlist(entries), show="scheduled") == []
+
+
+def test_cached_pages_rerender_after_changes():
+    partition = watchlist({"A": {}})
+    first = cached_pages(partition)
+    assert cached_pages(partition) is first
+    partition.version += 1
+    assert cached_pages(partition) is not first
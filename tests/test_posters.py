@@ -0,0 +1,71 @@
+import asyncio
+import os
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from services import posters
+from services.posters import PosterService
+
+JPEG = b"\xff\xd8\xff\xe0" + b"\0" * 8
+
+
+async def serve(handler):
+    app = web.Application()
+    app.router.add_get("/{path:.*}", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, f"http://127.0.0.1:{runner.addresses[0][1]}"
+
+
+def download(monkeypatch, tmp_path, body_size):
+    async def chunked(request):
+        response = web.StreamResponse()
+        response.enable_chunked_encoding()  # no Content-Length to go by
+        await response.prepare(request)
+        await response.write(JPEG)
+        for _ in range(body_size // 1024):
+            await response.write(b"\0" * 1024)
+        await response.write_eof()
+        return response
+
+    async def main():
+        runner, url = await serve(chunked)
+        monkeypatch.setattr(posters, "POSTER_BASE_URL", url)
+        try:
+            async with aiohttp.ClientSession() as session:
+                return await PosterService(session, cache_dir=str(tmp_path))._download("/poster.jpg")
+        finally:
+            await runner.cleanup()
+
+    return asyncio.run(main())
+
+
+def test_chunked_download_within_cap(monkeypatch, tmp_path):
+    monkeypatch.setattr(posters, "POSTER_MAX_DOWNLOAD", 64 * 1024)
+    assert len(download(monkeypatch, tmp_path, 32 * 1024)) == len(JPEG) + 32 * 1024
+
+
+def test_chunked_download_over_cap_is_rejected(monkeypatch, tmp_path):
+    monkeypatch.setattr(posters, "POSTER_MAX_DOWNLOAD", 64 * 1024)
+    with pytest.raises(ValueError, match="too large"):
+        download(monkeypatch, tmp_path, 128 * 1024)
+
+
+def test_eviction_drops_the_least_recently_used_files(tmp_path):
+    (tmp_path / "old.jpg").write_bytes(b"\0" * 100)  # left by an earlier run
+    service = PosterService(None, cache_dir=str(tmp_path), max_bytes=250)
+    try:
+        service._scan()
+        service._write("a.jpg", b"\0" * 100)
+        os.utime(tmp_path / "old.jpg", (1000, 1000))
+        os.utime(tmp_path / "a.jpg", (2000, 2000))
+        assert service._read("old.jpg") is not None  # a read counts as a use
+        service._write("b.jpg", b"\0" * 100)
+    finally:
+        service.close()
+    assert sorted(service.sizes) == ["b.jpg", "old.jpg"]
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["b.jpg", "old.jpg"]
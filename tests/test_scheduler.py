@@ -0,0 +1,76 @@
+import asyncio
+import time
+
+from services.scheduler import SessionScheduler
+
+
+def run_scheduler(plan, wait=0.2):
+    """Runs a scheduler, lets `plan(scheduler)` set it up, and returns the reminders that fired."""
+    fired = []
+
+    async def remind(guild_id, title, minutes):
+        fired.append((guild_id, title, minutes))
+
+    async def main():
+        scheduler = SessionScheduler(remind)
+        scheduler.start()
+        plan(scheduler)
+        await asyncio.sleep(wait)
+        scheduler.stop()
+        return scheduler
+
+    return fired, asyncio.run(main())
+
+
+def test_fires_every_offset_once():
+    start = time.time() + 0.1
+    fired, scheduler = run_scheduler(lambda s: s.schedule(1, "Show", start, [0.001, 0.0005]))
+    assert sorted(fired) == [(1, "Show", 0.0005), (1, "Show", 0.001)]
+    assert len(scheduler) == 0
+
+
+def test_replan_with_unchanged_start_does_not_duplicate():
+    start = time.time() + 0.1
+
+    def plan(scheduler):
+        for _ in range(3):
+            scheduler.schedule(1, "Show", start, [0.001])
+
+    fired, _ = run_scheduler(plan)
+    assert fired == [(1, "Show", 0.001)]
+
+
+def test_replan_drops_old_reminders():
+    now = time.time()
+
+    def plan(scheduler):
+        scheduler.schedule(1, "Show", now + 0.05, [0])
+        scheduler.schedule(1, "Show", now + 3600, [0])
+
+    fired, scheduler = run_scheduler(plan)
+    assert fired == []
+    assert len(scheduler) == 1
+
+
+def test_cancel_and_past_offsets():
+    now = time.time()
+
+    def plan(scheduler):
+        scheduler.schedule(1, "Gone", now + 0.05, [0])
+        scheduler.cancel(1, "Gone")
+        scheduler.schedule(2, "Late", now + 0.05, [60, 0])  # an hour before has already passed
+
+    fired, _ = run_scheduler(plan)
+    assert fired == [(2, "Late", 0)]
+
+
+def test_compacts_stale_entries():
+    async def remind(guild_id, title, minutes):
+        pass
+
+    scheduler = SessionScheduler(remind)
+    start = time.time() + 7200
+    for _ in range(500):
+        scheduler.schedule(1, "Show", start, [60, 30, 10])
+    assert scheduler.live == 3
+    assert len(scheduler.heap) <= 2 * scheduler.live + 64 + 3
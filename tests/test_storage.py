@@ -0,0 +1,136 @@
+import asyncio
+import sqlite3
+
+from services import storage
+from services.storage import Database, WatchlistStore, WelcomeStore
+
+
+def run(db_path, test):
+    """Runs `test(store)` against a fresh WatchlistStore, closing everything afterwards."""
+    async def main():
+        db = Database(db_path)
+        await db.open()
+        store = WatchlistStore(db)
+        await store.setup()
+        try:
+            return await test(store)
+        finally:
+            await store.close()
+            await db.close()
+
+    return asyncio.run(main())
+
+
+def rows(store):
+    return store.db.run(lambda conn: conn.execute("SELECT guild_id, title FROM watchlists ORDER BY 1, 2").fetchall())
+
+
+def test_pending_writes_overlay_loads_until_flushed(db_path):
+    async def test(store):
+        store.put(1, "Lost", {"type": "tv"})
+        store.put(1, "Heat", {"type": "movie"})
+        store.put(2, "Lost", {"type": "tv", "current_episode": 3})
+        store.put_settings(1, {"reminder_channel_id": 5})
+        before = await store.load(1), await rows(store)
+        await store.flush()
+        store.delete(1, "Heat")
+        after = await store.load(1)
+        await store.flush()
+        return before, after, await rows(store), await store.load(2)
+
+    (loaded, stored), after, final, other = run(db_path, test)
+    assert loaded == ({"Lost": {"type": "tv"}, "Heat": {"type": "movie"}}, {"reminder_channel_id": 5})
+    assert stored == []
+    assert after == ({"Lost": {"type": "tv"}}, {"reminder_channel_id": 5})
+    assert final == [(1, "Lost"), (2, "Lost")]
+    assert other == ({"Lost": {"type": "tv", "current_episode": 3}}, {})
+
+
+def test_failed_flush_keeps_the_batch_and_newer_writes_win(db_path, monkeypatch):
+    async def test(store):
+        write = store._write
+        failures = [sqlite3.OperationalError("database is locked")]
+
+        def flaky(conn, batch, settings):
+            if failures:
+                raise failures.pop()
+            return write(conn, batch, settings)
+
+        monkeypatch.setattr(store, "_write", flaky)
+        store.put(1, "Lost", {"current_episode": 1})
+        store.put(1, "Heat", {"type": "movie"})
+        await store.flush()
+        kept = dict(store.pending)
+        store.put(1, "Lost", {"current_episode": 2})  # newer than the failed batch
+        await store.flush()
+        return kept, store.pending, await store.db.run(store._load, 1, None)
+
+    kept, pending, (entries, _) = run(db_path, test)
+    assert set(kept) == {(1, "Lost"), (1, "Heat")}
+    assert pending == {}
+    assert entries == {"Lost": {"current_episode": 2}, "Heat": {"type": "movie"}}
+
+
+def test_scheduled_lists_sessions_across_guilds(db_path):
+    async def test(store):
+        store.put(1, "Lost", {"next_session": "2026-10-20T20:00:00"})
+        store.put(2, "Heat", {"next_session": None})
+        store.put(3, "Dune", {"next_session": "2026-10-21T20:00:00"})
+        store.put_settings(3, {"reminder_channel_id": 7})
+        return await store.scheduled()  # flushes first
+
+    assert sorted(run(db_path, test)) == [
+        (1, "Lost", {"next_session": "2026-10-20T20:00:00"}, {}),
+        (3, "Dune", {"next_session": "2026-10-21T20:00:00"}, {"reminder_channel_id": 7}),
+    ]
+
+
+def run_welcome(db_path, test, **kwargs):
+    async def main():
+        db = Database(db_path)
+        await db.open()
+        store = WelcomeStore(db, **kwargs)
+        await store.setup()
+        try:
+            return await test(store)
+        finally:
+            await db.close()
+
+    return asyncio.run(main())
+
+
+def test_shared_welcome_counts_the_members_still_on_it(db_path):
+    async def test(store):
+        await store.add(1, [10, 11, 12], 5, 100)
+        return [await store.pop(1, member) for member in (11, 11, 10, 12)]
+
+    assert run_welcome(db_path, test) == [(5, 100, 2), None, (5, 100, 1), (5, 100, 0)]
+
+
+def test_expired_welcomes_are_not_returned_or_kept(db_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(storage.time, "time", lambda: clock[0])
+
+    async def test(store):
+        await store.add(1, [10, 11], 5, 100)
+        clock[0] += 61
+        await store.add(1, [12], 5, 101)
+        expired = await store.pop(1, 10)
+        await store.prune()
+        return expired, await store.pop(1, 11), await store.pop(1, 12)
+
+    assert run_welcome(db_path, test, ttl=60) == (None, None, (5, 101, 0))
+
+
+def test_prune_keeps_only_the_newest_rows(db_path, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(storage.time, "time", lambda: clock[0])
+
+    async def test(store):
+        for member in range(5):
+            clock[0] += 1
+            await store.add(1, [member], 5, 100 + member)
+        await store.prune()
+        return [await store.pop(1, member) for member in range(5)]
+
+    assert run_welcome(db_path, test, max_rows=2) == [None, None, None, (5, 103, 0), (5, 104, 0)]
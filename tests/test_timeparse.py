@@ -0,0 +1,49 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+
+from services.timeparse import _fallback, fast_spec, localize, normalize, resolve_spec, to_utc
+
+NOW = datetime(2026, 10, 14, 18, 0)  # a Wednesday
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("2026-10-20 20:30", datetime(2026, 10, 20, 20, 30)),
+    ("tonight 9pm", datetime(2026, 10, 14, 21, 0)),
+    ("tomorrow at 8:15", datetime(2026, 10, 15, 8, 15)),
+    ("8pm friday", datetime(2026, 10, 16, 20, 0)),
+    ("wed 20:00", datetime(2026, 10, 14, 20, 0)),  # later today
+    ("wed 17:00", datetime(2026, 10, 21, 17, 0)),  # already passed, so next week
+    ("next wednesday 20:00", datetime(2026, 10, 21, 20, 0)),
+])
+def test_fast_path(text, expected):
+    spec = fast_spec(normalize(text))
+    assert spec is not None
+    assert resolve_spec(spec, NOW) == expected
+
+
+@pytest.mark.parametrize("text", ["friday 8", "13pm today", "next today 8pm", "in two hours", "25:00 tomorrow"])
+def test_left_to_dateparser(text):
+    assert fast_spec(normalize(text)) is None
+
+
+def test_invalid_date():
+    assert resolve_spec(fast_spec("2026-02-30 20:00"), NOW) is None
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("monday 8 p.m.", datetime(2026, 10, 19, 20, 0)),
+    ("wed at 8:30 p.m.", datetime(2026, 10, 21, 20, 30)),
+])
+def test_fallback_prefers_future_dates(text, expected):
+    sunday = datetime(2026, 10, 18, 12, 0)
+    assert fast_spec(normalize(text)) is None
+    assert asyncio.run(_fallback(normalize(text), "UK", sunday)) == expected
+
+
+def test_localize_and_to_utc_round_trip_across_dst():
+    summer, winter = datetime(2026, 7, 1, 20, 0), datetime(2026, 12, 1, 20, 0)
+    assert to_utc(summer, "UK").hour == 19
+    assert to_utc(winter, "nl").hour == 19
+    assert localize(to_utc(summer, "NL"), "UK") == datetime(2026, 7, 1, 19, 0)
@@ -0,0 +1,86 @@
+import asyncio
+
+from services import tmdb
+from services.http import UpstreamResponse
+from services.storage import Database, TMDBCacheStore
+from services.tmdb import TMDBClient
+
+
+class FakeUpstream:
+    """Answers like TMDB: 200 with an ETag, or 304 when the client already has that ETag."""
+
+    def __init__(self):
+        self.requests = []
+        self.version = 1
+
+    async def get(self, url, params=None, headers=None):
+        self.requests.append(headers or {})
+        etag = f'"v{self.version}"'
+        if (headers or {}).get("If-None-Match") == etag:
+            return UpstreamResponse(304, {}, None)
+        return UpstreamResponse(200, {"ETag": etag}, {"name": "Lost", "version": self.version})
+
+
+def client(store=None, cache_size=8):
+    tmdb_client = TMDBClient(None, store, cache_size=cache_size)
+    tmdb_client.upstream = FakeUpstream()
+    return tmdb_client
+
+
+def test_serves_from_cache_until_expired_then_revalidates(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(tmdb.time, "time", lambda: now[0])
+
+    async def main():
+        tmdb_client = client()
+        assert (await tmdb_client.get("tv/1"))["version"] == 1
+        assert (await tmdb_client.get("tv/1"))["version"] == 1
+        assert len(tmdb_client.upstream.requests) == 1
+
+        now[0] += tmdb.TMDB_TTLS["tv"] + 1
+        assert (await tmdb_client.get("tv/1"))["version"] == 1  # 304: kept data, new freshness window
+        assert tmdb_client.upstream.requests[-1] == {"If-None-Match": '"v1"'}
+        assert tmdb_client.cache["tv/1?"]["expires"] == now[0] + tmdb.TMDB_TTLS["tv"]
+
+        now[0] += tmdb.TMDB_TTLS["tv"] + 1
+        tmdb_client.upstream.version = 2
+        assert (await tmdb_client.get("tv/1"))["version"] == 2  # changed upstream: new body
+        return tmdb_client.stats()
+
+    assert asyncio.run(main()) == {"hits": 1, "misses": 3, "revalidated": 1, "entries": 1}
+
+
+def test_lru_keeps_cache_size_entries():
+    async def main():
+        tmdb_client = client(cache_size=2)
+        for show in (1, 2, 1, 3):
+            await tmdb_client.get(f"tv/{show}")
+        return list(tmdb_client.cache)
+
+    assert asyncio.run(main()) == ["tv/1?", "tv/3?"]
+
+
+def test_persists_changed_entries_row_by_row(tmp_path):
+    async def main():
+        db = Database(str(tmp_path / "cache.db"))
+        await db.open()
+        try:
+            first = client(TMDBCacheStore(db), cache_size=2)
+            await first.load()
+            for show in (1, 2, 3):
+                await first.get(f"tv/{show}")
+            await first.close()
+
+            second = client(TMDBCacheStore(db), cache_size=2)
+            await second.load()
+            await second.get("tv/3")
+            rows = await db.run(lambda conn: conn.execute("SELECT COUNT(*) FROM tmdb_cache").fetchone()[0])
+            return list(second.cache), second.stats()["hits"], second.dirty, rows
+        finally:
+            await db.close()
+
+    keys, hits, dirty, rows = asyncio.run(main())
+    assert keys == ["tv/2?", "tv/3?"]
+    assert hits == 1
+    assert dirty == set()
+    assert rows == 2
@@ -0,0 +1,74 @@
+import asyncio
+import json
+import os
+
+from services import storage
+from services.storage import Database, WatchlistStore
+from services.watchlists import WatchlistManager
+
+
+class CountingStore:
+    """Stands in for WatchlistStore; counts loads and yields so concurrent callers overlap."""
+
+    def __init__(self):
+        self.loads = 0
+
+    async def load(self, guild_id):
+        self.loads += 1
+        await asyncio.sleep(0.01)
+        return {"Lost": {"type": "tv"}}, {}
+
+
+def test_concurrent_first_commands_share_one_load():
+    async def main():
+        manager = WatchlistManager(CountingStore())
+        partitions = await asyncio.gather(*(manager.get(1) for _ in range(5)))
+        return manager, partitions
+
+    manager, partitions = asyncio.run(main())
+    assert manager.store.loads == 1
+    assert all(partition is partitions[0] for partition in partitions)
+    assert manager._loading == {}
+
+
+def test_idle_partitions_are_evicted_and_reloaded():
+    async def main():
+        manager = WatchlistManager(CountingStore(), idle_timeout=60)
+        idle, active = await manager.get(1), await manager.get(2)
+        idle.last_used -= 120
+        manager.evict_idle()
+        evicted = set(manager.partitions)
+        reloaded = await manager.get(1)
+        return evicted, reloaded is idle, manager.store.loads
+
+    evicted, same, loads = asyncio.run(main())
+    assert evicted == {2}
+    assert not same
+    assert loads == 3
+
+
+def test_legacy_file_is_imported_as_guild_zero_and_claimed(db_path):
+    with open(storage.LEGACY_WATCHLIST_FILE, "w") as f:
+        json.dump({"Lost": {"type": "tv"}, "Heat": {"type": "movie"}}, f)
+
+    async def main():
+        db = Database(db_path)
+        await db.open()
+        store = WatchlistStore(db)
+        store.legacy_guild = None
+        await store.setup()
+        try:
+            unclaimed = await store.load(1)
+            claimed = await store.claim_legacy(1)
+            return unclaimed, claimed, await store.load(1), await store.load(0)
+        finally:
+            await store.close()
+            await db.close()
+
+    unclaimed, claimed, loaded, leftover = asyncio.run(main())
+    assert unclaimed == ({}, {})
+    assert claimed == 2
+    assert loaded == ({"Lost": {"type": "tv"}, "Heat": {"type": "movie"}}, {})
+    assert leftover == ({}, {})
+    assert not os.path.exists(storage.LEGACY_WATCHLIST_FILE)
+    assert os.path.exists(f"{storage.LEGACY_WATCHLIST_FILE}.migrated")